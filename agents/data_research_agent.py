@@ -3,51 +3,48 @@ from typing import List, Dict, Any
 from datetime import datetime
 import logging
 
-# --- LLM / LangChain imports (try multiple paths and give helpful errors) ---
-try:
-    # Google Gemini via the langchain-google-genai integration
-    from langchain_google_genai import ChatGoogleGenerativeAI
-except Exception as e:
-    raise ImportError(
-        "Could not import 'langchain_google_genai'. Install with: "
-        "'pip install -U langchain-google-genai'\n"
-        "Original error: " + str(e)
-    ) from e
-
-# Agent imports - different LangChain releases expose agent helpers in slightly
-# different submodules, so try a couple of likely locations and bubble up a clear error.
-try:
-    from langchain.agents import create_react_agent, AgentExecutor
-except Exception:
-    try:
-        # alternate import paths used in some versions
-        from langchain.agents.react.agent import create_react_agent
-        from langchain.agents.agent import AgentExecutor
-    except Exception as e:
-        raise ImportError(
-            "Could not import create_react_agent / AgentExecutor from langchain. "
-            "Make sure 'langchain' is installed and up-to-date: "
-            "'pip install -U langchain'.\nOriginal error: " + str(e)
-        ) from e
-
-# PromptTemplate import (langchain_core.prompts or fallback)
-try:
-    from langchain_core.prompts import PromptTemplate
-except Exception:
-    try:
-        from langchain_core.prompts.prompt import PromptTemplate
-    except Exception:
-        # final fallback for older installs
-        from langchain.prompts import PromptTemplate
-
 # Your project imports (these should exist in your repo)
-from config.settings import ResearchConfig
+from utils.llm_cache import create_chat_model, track_usage
+from utils.tracing import traced
 from tools.financial_data_tool import create_financial_data_tool
 from tools.research_search_tool import create_research_search_tool
+from tools.research_corpus import create_research_corpus_tool
 
 logger = logging.getLogger(__name__)
 
 
+def _load_agent_runtime():
+    """Import the LangChain agent helpers (slow to import, so only when an agent is built)
+
+    Different LangChain releases expose agent helpers in slightly different submodules, so try
+    a couple of likely locations and bubble up a clear error.
+    """
+    try:
+        from langchain.agents import create_react_agent, AgentExecutor
+    except Exception:
+        try:
+            # alternate import paths used in some versions
+            from langchain.agents.react.agent import create_react_agent
+            from langchain.agents.agent import AgentExecutor
+        except Exception as e:
+            raise ImportError(
+                "Could not import create_react_agent / AgentExecutor from langchain. "
+                "Make sure 'langchain' is installed and up-to-date: "
+                "'pip install -U langchain'.\nOriginal error: " + str(e)
+            ) from e
+
+    # PromptTemplate import (langchain_core.prompts or fallback)
+    try:
+        from langchain_core.prompts import PromptTemplate
+    except Exception:
+        try:
+            from langchain_core.prompts.prompt import PromptTemplate
+        except Exception:
+            # final fallback for older installs
+            from langchain.prompts import PromptTemplate
+    return create_react_agent, AgentExecutor, PromptTemplate
+
+
 # Fallback timestamp util — if you move this to a shared utils module, import it instead
 try:
     # if you have a shared util, prefer importing that
@@ -61,17 +58,17 @@ except Exception:
 class DataResearchAgent:
     """Agent responsible for comprehensive financial data research."""
 
-    def __init__(self, model_name: str = "gemini-2.5-flash", temperature: float = 0.1):
-        # instantiate the Gemini chat model via langchain-google-genai
-        self.llm = ChatGoogleGenerativeAI(
-            model=model_name,
-            google_api_key=ResearchConfig.GOOGLE_API_KEY,
-            temperature=temperature,
-        )
+    def __init__(self, model_name: str = "gemini-2.5-flash", temperature: float = 0.1, llm=None):
+        # instantiate the Gemini chat model via langchain-google-genai, sharing the response cache;
+        # any LangChain chat model can be injected instead (e.g. a fake for offline runs)
+        self.llm = track_usage(llm or create_chat_model(model_name, temperature))
+        create_react_agent, AgentExecutor, PromptTemplate = _load_agent_runtime()
 
         # create tools (these factory functions should return LangChain BaseTool objects)
+        # the offline corpus is listed ahead of web search so the agent tries it first
         self.tools = [
             create_financial_data_tool(),
+            create_research_corpus_tool(),
             create_research_search_tool()
         ]
 
@@ -112,8 +109,11 @@ Thought: {agent_scratchpad}
             max_iterations=6,
             return_intermediate_steps=True,
             handle_parsing_errors=True,
+            # non-streaming calls go through the chat model's response cache; .stream() bypasses it
+            stream_runnable=False,
         )
 
+    @traced("agent.data_research")
     def conduct_research(self, symbols: List[str], research_focus: str = "") -> Dict[str, Any]:
         """Conduct comprehensive financial research.
 
@@ -128,7 +128,7 @@ Research Focus: {research_focus}
 
 Required analysis:
 1. Fetch detailed financial data and risk metrics for each symbol
-2. Search for recent market research and analysis
+2. Check the local research corpus, then search for recent market research and analysis
 3. Identify key risk factors and market conditions
 4. Gather relevant academic or industry research
 
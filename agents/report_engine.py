@@ -0,0 +1,230 @@
+import os
+import json
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable, Iterable, Awaitable, Union
+from config.settings import ResearchConfig
+from agents.report_sections import (
+    REPORT_SECTIONS, FINDINGS_SECTIONS, build_section_prompt, build_profile_prompt
+)
+from utils.research_digest import format_symbol_list, truncate_to_tokens
+from utils.service_limits import ServiceLimiter
+from utils.sqlite_cache import SQLiteKVCache
+from utils.tracing import span, bind_context, record_cache_lookup
+
+_shared_section_cache: Optional[SQLiteKVCache] = None
+
+
+def get_section_cache() -> Optional[SQLiteKVCache]:
+    """Process-wide cache of generated report sections, or None when REPORT_SECTION_CACHE_ENABLED is off"""
+    global _shared_section_cache
+    if not ResearchConfig.REPORT_SECTION_CACHE_ENABLED:
+        return None
+    if _shared_section_cache is None:
+        ttl_hours = ResearchConfig.REPORT_SECTION_CACHE_TTL_HOURS
+        _shared_section_cache = SQLiteKVCache(
+            os.path.join(ResearchConfig.CACHE_DIR, "report_sections.sqlite"),
+            ttl_seconds=ttl_hours * 3600 if ttl_hours else None,
+        )
+    return _shared_section_cache
+
+
+def select_profile_symbols(records: Dict[str, Dict], limit: int = None) -> List[str]:
+    """Symbols to profile individually, riskiest (highest annualized volatility) first"""
+    limit = limit or ResearchConfig.REPORT_MAX_PROFILED_SYMBOLS
+
+    def volatility(symbol: str) -> float:
+        value = records[symbol].get("risk_metrics", {}).get("annualized_volatility")
+        return value if isinstance(value, (int, float)) else float("-inf")
+
+    return sorted(records, key=volatility, reverse=True)[:limit]
+
+
+async def _untimed(name: str, awaitable):
+    return await awaitable
+
+
+class ReportEngine:
+    """Map-reduce report generation over the report section graph
+
+    Map: per-symbol risk profiles are written in batches of REPORT_PROFILE_BATCH_SIZE symbols,
+    in parallel. Reduce: each cross-asset section starts once its inputs (digest, literature,
+    analysis, the compact profiles, or the core findings) are ready. Every LLM call runs under
+    the limiter's "llm" semaphore, and each generated section or profile batch is cached on its
+    prompt, so regenerating one section (``refresh``) reuses all the others.
+    """
+
+    def __init__(self, report_agent, limiter: ServiceLimiter = None, cache: Optional[SQLiteKVCache] = None,
+                 refresh: Iterable[str] = ()):
+        self.agent = report_agent
+        self.limiter = limiter or ServiceLimiter()
+        self.cache = cache if cache is not None else get_section_cache()
+        self.refresh = set(refresh)
+        self.cached_sections: List[str] = []
+        self.profiled_symbols: List[str] = []
+
+    def generate(self, context: Dict[str, str], records: Dict[str, Dict], symbols: List[str],
+                 research_focus: str = "", references: str = "", report_id: str = None,
+                 on_chunk: Callable[[str, str], None] = None) -> Dict[str, Any]:
+        """Blocking entry point for inputs that are already computed
+
+        Callable from code that is itself inside an event loop (Jupyter, async callers): the
+        engine then runs its own loop on a worker thread, where on_chunk is called too.
+        """
+        def run_report():
+            return asyncio.run(self.run(context, records, symbols, research_focus, references, report_id, on_chunk))
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return run_report()
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(bind_context(run_report)).result()
+
+    async def run(self, inputs: Dict[str, Union[str, Awaitable[str]]], records: Union[Dict, Awaitable[Dict]],
+                  symbols: List[str], research_focus: str = "", references: Union[str, Awaitable[str]] = "",
+                  report_id: str = None, on_chunk: Callable[[str, str], None] = None,
+                  timed: Callable = None) -> Dict[str, Any]:
+        """Generate, assemble and save the report; inputs and records may still be pending
+
+        inputs holds the digest / literature / analysis context; records maps each symbol to its
+        research record plus a "value_at_risk" entry. With on_chunk, sections are streamed and
+        on_chunk(section_key, text_so_far) runs on the event loop's thread.
+        """
+        timed = timed or _untimed
+        loop = asyncio.get_running_loop()
+        symbols_label = format_symbol_list(symbols)
+        report_stream = None
+        if on_chunk is not None:
+            report_stream = self.agent.open_report_stream(symbols, report_id)
+
+        tasks = {name: asyncio.ensure_future(_resolve(value)) for name, value in inputs.items()}
+        profiles_task = asyncio.ensure_future(self._profiles(records, research_focus, timed))
+        tasks["profiles"] = asyncio.ensure_future(self._compact_profiles(profiles_task))
+        section_tasks: Dict[str, asyncio.Future] = {}
+
+        async def findings() -> str:
+            texts = await asyncio.gather(*(section_tasks[key] for key in FINDINGS_SECTIONS))
+            return truncate_to_tokens("\n\n".join(texts), ResearchConfig.ANALYSIS_TOKEN_BUDGET)
+
+        def emit(key: str, text: str):
+            report_stream.stream_section(key, text)
+            on_chunk(key, text)
+
+        async def write_section(section: Dict[str, Any]) -> str:
+            if section.get("source") == "profiles":
+                body = await profiles_task
+                text = f"{section['heading']}\n\n{body}" if body else ""
+            else:
+                # Inputs the caller doesn't have (e.g. no literature search) are left out of the prompt
+                context = {name: await tasks[name] for name in section["requires"] if name in tasks}
+                stream = None
+                if on_chunk is not None:
+                    # Chunks arrive on executor threads; hop back to the loop thread for the callbacks
+                    stream = lambda text, key=section["key"]: loop.call_soon_threadsafe(emit, key, text)
+                text = await timed(f"section:{section['key']}",
+                                   self._section(section, context, symbols, symbols_label, research_focus, stream))
+            if report_stream is not None:
+                report_stream.add_section(section["key"], text)
+            return text
+
+        for section in REPORT_SECTIONS:
+            section_tasks[section["key"]] = asyncio.ensure_future(write_section(section))
+        tasks["findings"] = asyncio.ensure_future(findings())
+        pending = [*tasks.values(), profiles_task, *section_tasks.values()]
+
+        try:
+            section_texts = dict(zip(section_tasks, await asyncio.gather(*section_tasks.values())))
+            references = await _resolve(references)
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if report_stream is not None:
+                report_stream.abort()
+            raise
+
+        extra = {
+            "generation_mode": "map_reduce",
+            "profiled_symbols": len(self.profiled_symbols),
+            "cached_sections": list(self.cached_sections),
+        }
+        if report_stream is not None:
+            metadata = report_stream.finish(references, extra)
+            report_content = report_stream.content
+        else:
+            report_content = self.agent.assemble_report(section_texts, references)
+            metadata = self.agent._save_report(report_content, symbols, extra, report_id=report_id)
+        return {"report_content": report_content, "metadata": metadata, "sections": section_texts, "success": True}
+
+    async def _section(self, section: Dict[str, Any], context: Dict[str, str], symbols: List[str],
+                       symbols_label: str, research_focus: str, on_chunk: Optional[Callable[[str], None]]) -> str:
+        with span("report.section", section=section["key"]) as current:
+            prompt = build_section_prompt(section, context, symbols_label, research_focus)
+            key = self._cache_key(section["key"], prompt)
+            cached = self._cached(section["key"], key)
+            if cached is not None:
+                if on_chunk is not None:
+                    on_chunk(cached)
+                return cached
+            text = await self.limiter.run("llm", self.agent.generate_section, section, context, symbols,
+                                          research_focus, on_chunk)
+            current.set(streamed=on_chunk is not None)
+            self._store(key, text)
+            return text
+
+    async def _profiles(self, records: Union[Dict, Awaitable[Dict]], research_focus: str, timed: Callable) -> str:
+        """Map step: profile the riskiest symbols in parallel batches"""
+        records = await _resolve(records)
+        selected = select_profile_symbols(records)
+        self.profiled_symbols = selected
+        size = ResearchConfig.REPORT_PROFILE_BATCH_SIZE
+        batches = [{s: records[s] for s in selected[i:i + size]} for i in range(0, len(selected), size)]
+        texts = await timed("report_profiles", self._profile_batches(batches, research_focus))
+        body = "\n\n".join(text for text in texts if text)
+        omitted = len(records) - len(selected)
+        if body and omitted > 0:
+            body += f"\n\n_{omitted} further symbols are covered by the study's data tables only._"
+        return body
+
+    async def _profile_batches(self, batches: List[Dict[str, Dict]], research_focus: str) -> List[str]:
+        # The batch tasks are created here, inside the caller's span, so their spans nest under it
+        return await asyncio.gather(*(self._profile_batch(batch, research_focus) for batch in batches))
+
+    async def _profile_batch(self, batch: Dict[str, Dict], research_focus: str) -> str:
+        with span("report.profile_batch", symbols=len(batch)):
+            key = self._cache_key("asset_profiles", build_profile_prompt(batch, research_focus))
+            cached = self._cached("asset_profiles", key)
+            if cached is not None:
+                return cached
+            text = await self.limiter.run("llm", self.agent.generate_profiles, batch, research_focus)
+            self._store(key, text)
+            return text
+
+    @staticmethod
+    async def _compact_profiles(profiles_task: Awaitable[str]) -> str:
+        return truncate_to_tokens(await profiles_task, ResearchConfig.REPORT_PROFILE_TOKEN_BUDGET)
+
+    def _cache_key(self, section_key: str, prompt: str) -> str:
+        llm = self.agent.llm
+        model = getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+        payload = json.dumps({"section": section_key, "model": str(model), "prompt": prompt}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _cached(self, section_key: str, key: str) -> Optional[str]:
+        if self.cache is None or section_key in self.refresh:
+            return None
+        text = self.cache.get(key)
+        record_cache_lookup("report_section", "hit" if text is not None else "miss")
+        if text is not None and section_key not in self.cached_sections:
+            self.cached_sections.append(section_key)
+        return text
+
+    def _store(self, key: str, text: str):
+        if self.cache is not None and text:
+            self.cache.set(key, text)
+
+
+async def _resolve(value):
+    return await value if asyncio.isfuture(value) or asyncio.iscoroutine(value) else value
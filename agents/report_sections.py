@@ -0,0 +1,159 @@
+from typing import Dict, List
+
+REPORT_TITLE = "# FINANCIAL RISK MANAGEMENT RESEARCH REPORT"
+
+# Inputs a section may depend on; sections start as soon as theirs are available:
+#   digest     - numeric research digest (after market data)
+#   literature - research search results (after web search)
+#   analysis   - RiskAnalysisAgent output (after the data research agent and analysis)
+#   findings   - the generated core sections (for the summary and conclusion)
+#   profiles   - per-symbol risk profiles from the map step (after market data and VaR)
+# Sections with a "source" are copied from an input instead of being generated.
+REPORT_SECTIONS: List[Dict] = [
+    {
+        "key": "executive_summary",
+        "heading": "## EXECUTIVE SUMMARY",
+        "guidance": "Brief overview of research objectives, methodology, and key findings",
+        "requires": ["digest", "findings"],
+    },
+    {
+        "key": "introduction",
+        "heading": "## 1. INTRODUCTION",
+        "guidance": "- Research background and motivation\n- Problem statement and objectives\n- Scope and limitations",
+        "requires": ["digest", "literature"],
+    },
+    {
+        "key": "literature_review",
+        "heading": "## 2. LITERATURE REVIEW",
+        "guidance": "- Relevant financial risk management theories\n- Current market context and research",
+        "requires": ["literature"],
+    },
+    {
+        "key": "methodology",
+        "heading": "## 3. METHODOLOGY",
+        "guidance": "- Data collection approach\n- Risk assessment framework\n- Analysis techniques employed",
+        "requires": ["digest"],
+    },
+    {
+        "key": "data_analysis",
+        "heading": "## 4. DATA ANALYSIS AND FINDINGS",
+        "guidance": "- Descriptive statistics\n- Risk metrics and calculations\n- Comparative analysis results",
+        "requires": ["digest"],
+    },
+    {
+        "key": "risk_assessment",
+        "heading": "## 5. RISK ASSESSMENT RESULTS",
+        "guidance": "- Individual asset risk profiles\n- Portfolio implications\n- Key risk factors identified",
+        "requires": ["digest", "profiles", "analysis"],
+    },
+    {
+        "key": "discussion",
+        "heading": "## 6. DISCUSSION",
+        "guidance": "- Interpretation of results\n- Practical implications\n- Theoretical contributions",
+        "requires": ["analysis", "literature"],
+    },
+    {
+        "key": "recommendations",
+        "heading": "## 7. RECOMMENDATIONS",
+        "guidance": "- Risk management strategies\n- Portfolio optimization suggestions\n- Future research directions",
+        "requires": ["digest", "analysis"],
+    },
+    {
+        "key": "conclusion",
+        "heading": "## 8. CONCLUSION",
+        "guidance": "Summary of key findings and their significance",
+        "requires": ["findings"],
+    },
+    {
+        "key": "asset_profiles",
+        "heading": "## APPENDIX: ASSET RISK PROFILES",
+        "guidance": "",
+        "requires": ["profiles"],
+        "source": "profiles",
+    },
+]
+
+# Core sections whose text feeds the summary and conclusion
+FINDINGS_SECTIONS = ["data_analysis", "risk_assessment", "discussion", "recommendations"]
+
+SECTION_CONTEXT_LABELS = {
+    "digest": "Research Digest",
+    "literature": "Research Literature",
+    "analysis": "Risk Analysis",
+    "findings": "Report Findings So Far",
+    "profiles": "Asset Risk Profiles",
+}
+
+
+def get_section(key: str) -> Dict:
+    for section in REPORT_SECTIONS:
+        if section["key"] == key:
+            return section
+    raise KeyError(f"Unknown report section: {key}")
+
+
+def build_section_prompt(section: Dict, context: Dict[str, str], symbols_label: str, research_focus: str = "") -> str:
+    """Prompt for a single report section given the inputs it requires"""
+    blocks = "\n\n".join(
+        f"{SECTION_CONTEXT_LABELS[name]}:\n{context[name]}" for name in section["requires"] if context.get(name)
+    )
+    return f"""
+        You are writing one section of an academic Financial Risk Management Research Report.
+
+        Symbols Studied: {symbols_label}
+        Research Focus: {research_focus or "General financial risk assessment"}
+
+        {blocks}
+
+        Write only the following section, in Markdown, starting with the heading "{section['heading']}":
+        {section['guidance']}
+
+        Ensure academic rigor and evidence-based statements grounded in the data above.
+        """
+
+
+def format_profile_record(symbol: str, record: Dict) -> str:
+    """One compact line of a symbol's numbers for the profile prompt"""
+    info = record.get("basic_info", {})
+    risk = record.get("risk_metrics", {})
+    performance = record.get("performance_metrics", {})
+    var = record.get("value_at_risk", {})
+    fields = [
+        ("annualized volatility", risk.get("annualized_volatility")),
+        ("Sharpe", risk.get("sharpe_ratio")),
+        ("beta", risk.get("beta")),
+        ("max drawdown", risk.get("max_drawdown")),
+        ("2y return %", performance.get("total_return_2y")),
+        ("VaR 95% (hist)", var.get("VaR_95%_historical")),
+        ("CVaR 95%", var.get("CVaR_95%")),
+        ("VaR 99% (hist)", var.get("VaR_99%_historical")),
+    ]
+    values = ", ".join(f"{name} {value}" for name, value in fields if value not in (None, "N/A"))
+    return f"{symbol} ({info.get('company_name', symbol)}, {info.get('sector', 'Unknown')}): {values}"
+
+
+def build_profile_prompt(records: Dict[str, Dict], research_focus: str = "") -> str:
+    """Map-step prompt: short risk profiles for a batch of symbols from their numbers only"""
+    lines = "\n".join(format_profile_record(symbol, record) for symbol, record in records.items())
+    return f"""
+        You are writing the asset risk profiles appendix of an academic Financial Risk Management Research Report.
+
+        Research Focus: {research_focus or "General financial risk assessment"}
+
+        Asset Data:
+        {lines}
+
+        For each asset, in the order given, write a Markdown subsection headed "### <SYMBOL>" with at most
+        80 words on its volatility, tail risk (VaR/CVaR), drawdown and market sensitivity. Use only the
+        numbers above.
+        """
+
+
+def format_references(literature_results: List[Dict]) -> str:
+    """References section assembled directly from the search results"""
+    lines = ["## REFERENCES"]
+    for i, result in enumerate(literature_results, 1):
+        lines.append(f"{i}. {result.get('title', 'Untitled')}. {result.get('source', '')}".rstrip())
+    if len(lines) == 1:
+        lines.append("[Note: In actual implementation, this would include proper citations]")
+    return "\n".join(lines)
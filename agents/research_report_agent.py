@@ -1,27 +1,44 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from config.settings import ResearchConfig
+from utils.llm_cache import create_chat_model, track_usage
+from utils.tracing import traced
 from utils.helpers import get_research_timestamp, ensure_directories
-from typing import Dict, Any, List
+from utils.research_digest import build_research_digest, format_symbol_list, truncate_to_tokens
+from agents.report_sections import REPORT_SECTIONS, REPORT_TITLE, build_section_prompt, build_profile_prompt
+from typing import Dict, Any, List, Optional, Callable, Tuple
+import json
+import os
+import time
 
 class ResearchReportAgent:
     """Agent for generating academic-quality research reports"""
     
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=ResearchConfig.GOOGLE_API_KEY,
-            temperature=0.1
-        )
+    def __init__(self, llm=None):
+        # Any LangChain chat model can be injected (e.g. a fake for offline runs)
+        self.llm = track_usage(llm or create_chat_model())
     
-    def generate_research_report(self, research_data: Dict, analysis_data: Dict, symbols: List[str]) -> Dict[str, Any]:
+    @traced("agent.research_report")
+    def generate_research_report(self, research_data: Dict, analysis_data: Dict, symbols: List[str],
+                                 market_data: Optional[Dict[str, Any]] = None,
+                                 research_digest: Optional[str] = None,
+                                 report_id: Optional[str] = None) -> Dict[str, Any]:
         """Generate comprehensive academic research report"""
         
+        if research_digest is None:
+            research_digest = build_research_digest(research_data, symbols, market_data)
+        risk_analysis = truncate_to_tokens(
+            str(analysis_data.get("risk_analysis", analysis_data)), ResearchConfig.ANALYSIS_TOKEN_BUDGET
+        )
+        
         report_prompt = f"""
         Generate a comprehensive Financial Risk Management Research Report following academic standards.
         
-        Research Data: {research_data}
-        Risk Analysis: {analysis_data}
-        Symbols Studied: {', '.join(symbols)}
+        Research Digest:
+        {research_digest}
+        
+        Risk Analysis:
+        {risk_analysis}
+        
+        Symbols Studied: {format_symbol_list(symbols)}
         
         Structure the report as follows:
         
@@ -76,32 +93,7 @@ class ResearchReportAgent:
         try:
             response = self.llm.invoke(report_prompt)
             report_content = response.content
-            
-            # Save the report
-            ensure_directories()
-            timestamp = get_research_timestamp()
-            filename = f"financial_risk_research_report_{timestamp}.md"
-            filepath = f"outputs/research_reports/{filename}"
-            
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(report_content)
-            
-            # Create metadata
-            metadata = {
-                "report_title": "Financial Risk Management Research Report",
-                "symbols_analyzed": symbols,
-                "timestamp": timestamp,
-                "filename": filename,
-                "filepath": filepath,
-                "analysis_period": ResearchConfig.ANALYSIS_PERIOD,
-                "research_type": "Academic Financial Risk Assessment"
-            }
-            
-            # Save metadata
-            metadata_file = f"outputs/research_reports/metadata_{timestamp}.json"
-            import json
-            with open(metadata_file, 'w') as f:
-                json.dump(metadata, f, indent=2)
+            metadata = self._save_report(report_content, symbols, report_id=report_id)
             
             return {
                 "report_content": report_content,
@@ -111,3 +103,181 @@ class ResearchReportAgent:
             
         except Exception as e:
             return {"error": f"Report generation error: {str(e)}", "success": False}
+    
+    def generate_section(self, section: Dict, context: Dict[str, str], symbols: List[str],
+                         research_focus: str = "", on_chunk: Optional[Callable[[str], None]] = None) -> str:
+        """Generate one report section from only the inputs it depends on
+        
+        With on_chunk the section is streamed and on_chunk(text_so_far) is called per chunk.
+        """
+        prompt = build_section_prompt(section, context, format_symbol_list(symbols), research_focus)
+        if on_chunk is None:
+            content = self.llm.invoke(prompt).content.strip()
+        else:
+            content = ""
+            for chunk in self.llm.stream(prompt):
+                content += chunk_text(chunk)
+                on_chunk(content)
+            content = content.strip()
+        if not content.startswith(section["heading"]):
+            content = f"{section['heading']}\n\n{content}"
+        return content
+    
+    def generate_profiles(self, records: Dict[str, Dict], research_focus: str = "") -> str:
+        """Short per-symbol risk profiles (### SYMBOL subsections) for one batch of symbols"""
+        return self.llm.invoke(build_profile_prompt(records, research_focus)).content.strip()
+    
+    @staticmethod
+    def assemble_report(section_texts: Dict[str, str], references: str = "", title: str = REPORT_TITLE) -> str:
+        """Join generated sections in report order"""
+        parts = [title]
+        parts.extend(section_texts[s["key"]] for s in REPORT_SECTIONS if section_texts.get(s["key"]))
+        if references:
+            parts.append(references)
+        return "\n\n".join(parts) + "\n"
+    
+    def open_report_stream(self, symbols: List[str], report_id: Optional[str] = None) -> "ReportStream":
+        """Report file to be written incrementally; see ReportStream"""
+        timestamp, filename, filepath = self._report_paths(report_id)
+        return ReportStream(self, timestamp, filename, filepath, symbols)
+    
+    @staticmethod
+    def _report_paths(report_id: Optional[str] = None) -> Tuple[str, str, str]:
+        ensure_directories()
+        # Concurrent studies pass their own id so reports finishing in the same second don't collide
+        timestamp = report_id or get_research_timestamp()
+        filename = f"financial_risk_research_report_{timestamp}.md"
+        return timestamp, filename, f"outputs/research_reports/{filename}"
+    
+    def _save_report(self, report_content: str, symbols: List[str],
+                     extra_metadata: Optional[Dict[str, Any]] = None,
+                     report_id: Optional[str] = None) -> Dict[str, Any]:
+        """Write the report and its metadata under outputs/research_reports"""
+        timestamp, filename, filepath = self._report_paths(report_id)
+        
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(report_content)
+        
+        return self._write_metadata(timestamp, filename, filepath, symbols, extra_metadata)
+    
+    @staticmethod
+    def _write_metadata(timestamp: str, filename: str, filepath: str, symbols: List[str],
+                        extra_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        metadata = {
+            "report_title": "Financial Risk Management Research Report",
+            "symbols_analyzed": symbols,
+            "timestamp": timestamp,
+            "filename": filename,
+            "filepath": filepath,
+            "analysis_period": ResearchConfig.ANALYSIS_PERIOD,
+            "research_type": "Academic Financial Risk Assessment"
+        }
+        metadata.update(extra_metadata or {})
+        
+        metadata_file = f"outputs/research_reports/metadata_{timestamp}.json"
+        with open(metadata_file, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        
+        return metadata
+
+
+def chunk_text(chunk) -> str:
+    """Text of a streamed message chunk (content may be a string or a list of content blocks)"""
+    content = chunk.content
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+
+
+class ReportStream:
+    """Report file written as content arrives
+    
+    Text goes to <report>.md.partial and is flushed on every write, so the file can be tailed
+    while the model is still generating. One streaming section at a time holds the end of the
+    file and has its tokens written as they arrive (stream_section); sections that finish
+    meanwhile are appended whole once it is done (add_section). finish() rewrites the file with
+    the sections in report order, renames it and writes the metadata.
+    """
+    
+    def __init__(self, agent: ResearchReportAgent, timestamp: str, filename: str, filepath: str,
+                 symbols: List[str], title: str = REPORT_TITLE):
+        self.agent = agent
+        self.timestamp = timestamp
+        self.filename = filename
+        self.filepath = filepath
+        self.partial_path = filepath + ".partial"
+        self.symbols = symbols
+        self.title = title
+        self.started = time.time()
+        self.first_chunk_seconds = None
+        self._sections: Dict[str, str] = {}
+        self._queued: List[str] = []
+        self._live: Optional[str] = None
+        self._live_written = 0
+        self._file = open(self.partial_path, "w", encoding="utf-8")
+        # Written up front, so it doesn't count as the first generated chunk
+        self._file.write(title)
+        self._file.flush()
+        self.content = title
+    
+    def write(self, text: str):
+        if not text:
+            return
+        if self.first_chunk_seconds is None:
+            self.first_chunk_seconds = round(time.time() - self.started, 3)
+        self._file.write(text)
+        self._file.flush()
+        self.content += text
+    
+    def stream_section(self, key: str, text_so_far: str):
+        """Write a section's new tokens if it holds the end of the file (or can take it)"""
+        if key in self._sections:
+            return
+        if self._live is None:
+            self._live, self._live_written = key, 0
+            self.write(f"\n\n{_SECTION_HEADINGS[key]}\n\n")
+        if key != self._live:
+            return
+        body = _section_body(text_so_far, _SECTION_HEADINGS[key])
+        if body is not None and len(body) > self._live_written:
+            self.write(body[self._live_written:])
+            self._live_written = len(body)
+    
+    def add_section(self, key: str, text: str):
+        """Record a finished section; appended now unless another section is streaming into the file"""
+        self._sections[key] = text
+        if key == self._live:
+            # Already in the file token by token; finish() places the final text
+            self._live = None
+        elif text:
+            self._queued.append(key)
+        if self._live is None:
+            for queued in self._queued:
+                self.write("\n\n" + self._sections[queued])
+            self._queued.clear()
+    
+    def finish(self, references: str = "", extra_metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Publish the report with its sections in report order, followed by references"""
+        self._file.close()
+        self.content = self.agent.assemble_report(self._sections, references, self.title)
+        with open(self.partial_path, "w", encoding="utf-8") as f:
+            f.write(self.content)
+        os.replace(self.partial_path, self.filepath)
+        metadata = {"streamed": True, "first_chunk_seconds": self.first_chunk_seconds}
+        metadata.update(extra_metadata or {})
+        return self.agent._write_metadata(self.timestamp, self.filename, self.filepath, self.symbols, metadata)
+    
+    def abort(self):
+        """Close without publishing; the .partial file is left for inspection"""
+        self._file.close()
+
+
+_SECTION_HEADINGS = {section["key"]: section["heading"] for section in REPORT_SECTIONS}
+
+
+def _section_body(text: str, heading: str) -> Optional[str]:
+    """Streamed section text without the heading the model may repeat; None while that is undecided"""
+    draft = text.lstrip()
+    if heading.startswith(draft):
+        return None
+    return draft[len(heading):].lstrip() if draft.startswith(heading) else draft
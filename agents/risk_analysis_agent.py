@@ -1,27 +1,47 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from config.settings import ResearchConfig
+from utils.llm_cache import create_chat_model, track_usage
+from utils.tracing import traced
 from utils.helpers import get_research_timestamp
-from typing import Dict, Any, List
+from utils.research_digest import build_research_digest, format_symbol_list, estimate_tokens
+from tools.return_panel import ReturnPanel
+from typing import Dict, Any, List, Optional
 
 class RiskAnalysisAgent:
     """Agent for quantitative risk analysis and academic assessment"""
     
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=ResearchConfig.GOOGLE_API_KEY,
-            temperature=0.1
-        )
+    def __init__(self, llm=None):
+        # Any LangChain chat model can be injected (e.g. a fake for offline runs)
+        self.llm = track_usage(llm or create_chat_model())
     
-    def analyze_financial_risk(self, research_data: Dict[str, Any], symbols: List[str]) -> Dict[str, Any]:
-        """Perform academic-level financial risk analysis"""
+    @traced("agent.risk_analysis")
+    def analyze_financial_risk(self, research_data: Dict[str, Any], symbols: List[str],
+                               market_data: Optional[Dict[str, Any]] = None,
+                               returns: Optional[ReturnPanel] = None,
+                               digest: Optional[str] = None) -> Dict[str, Any]:
+        """Perform academic-level financial risk analysis
         
-        # Optional: Summarize research_data if very large to avoid token overflow
+        Pass the study's digest when it is already built; otherwise it is built here.
+        """
+        
+        try:
+            # Pre-computed, budgeted digest instead of the raw research data keeps the prompt size flat
+            if digest is None:
+                digest = build_research_digest(research_data, symbols, market_data, returns)
+            return self._analyze(digest, symbols)
+        
+        except Exception as e:
+            return {
+                "error": f"Risk analysis error: {str(e)}",
+                "success": False
+            }
+    
+    def _analyze(self, digest: str, symbols: List[str]) -> Dict[str, Any]:
         analysis_prompt = f"""
         As a Financial Risk Management Researcher, perform a comprehensive quantitative and qualitative risk analysis.
         
-        Research Data: {research_data}
-        Assets Under Study: {', '.join(symbols)}
+        Research Digest:
+        {digest}
+        
+        Assets Under Study: {format_symbol_list(symbols)}
         
         Conduct analysis on:
         
@@ -50,21 +70,15 @@ class RiskAnalysisAgent:
         Provide a structured academic analysis with clear methodology and findings.
         """
         
-        try:
-            # Use predict() for safer single-prompt invocation
-            analysis_result = self.llm.predict(analysis_prompt)
-            
-            return {
-                "risk_analysis": analysis_result,
-                "analysis_timestamp": get_research_timestamp(),
-                "methodology": "Multi-factor risk analysis with quantitative and qualitative assessment",
-                "symbols_analyzed": symbols,
-                "analysis_type": "Academic Financial Risk Assessment",
-                "success": True
-            }
-            
-        except Exception as e:
-            return {
-                "error": f"Risk analysis error: {str(e)}",
-                "success": False
-            }
+        # Use predict() for safer single-prompt invocation
+        analysis_result = self.llm.predict(analysis_prompt)
+        
+        return {
+            "risk_analysis": analysis_result,
+            "analysis_timestamp": get_research_timestamp(),
+            "methodology": "Multi-factor risk analysis with quantitative and qualitative assessment",
+            "symbols_analyzed": symbols,
+            "analysis_type": "Academic Financial Risk Assessment",
+            "prompt_tokens_estimate": estimate_tokens(analysis_prompt),
+            "success": True
+        }
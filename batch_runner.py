@@ -0,0 +1,150 @@
+import argparse
+import csv
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any
+from config.settings import ResearchConfig
+from main import FinancialRiskResearchOrchestrator
+from tools.batch_fetcher import BatchFetcher
+from tools.market_data_source import MemoizedDataSource, get_default_data_source, set_default_data_source
+from utils.helpers import save_research_data, get_research_timestamp, log_error
+
+_SYMBOL_SEPARATORS = re.compile(r"[,;\s]+")
+
+
+def _parse_symbols(value) -> List[str]:
+    if isinstance(value, str):
+        value = _SYMBOL_SEPARATORS.split(value)
+    return list(dict.fromkeys(s.strip().upper() for s in value or [] if s and s.strip()))
+
+
+def load_study_specs(path: str) -> List[Dict[str, Any]]:
+    """Read study specs (study_name, symbols, research_focus) from a JSON or CSV file
+
+    JSON may be a list of specs or {"studies": [...]}; symbols may be a list or a
+    comma/semicolon/space separated string. CSV files need a header row with the same columns.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            raw_specs = list(csv.DictReader(f))
+    else:
+        with open(path, encoding="utf-8") as f:
+            raw_specs = json.load(f)
+        if isinstance(raw_specs, dict):
+            raw_specs = raw_specs.get("studies", [])
+
+    specs = []
+    for i, raw in enumerate(raw_specs, 1):
+        symbols = _parse_symbols(raw.get("symbols"))
+        if not symbols:
+            raise ValueError(f"Study #{i} in {path} has no symbols")
+        specs.append({
+            "study_name": (raw.get("study_name") or f"Study {i}").strip(),
+            "symbols": symbols,
+            "research_focus": (raw.get("research_focus") or "").strip(),
+        })
+    return specs
+
+
+class BatchStudyRunner:
+    """Run many studies on a worker pool with one shared orchestrator and deduplicated market data"""
+
+    def __init__(self, orchestrator: FinancialRiskResearchOrchestrator = None, max_workers: int = None,
+                 concurrent_pipeline: bool = False):
+        # Agents, LLM clients, tools and their HTTP sessions are created once and shared by all studies
+        self.orchestrator = orchestrator or FinancialRiskResearchOrchestrator()
+        self.max_workers = max_workers or ResearchConfig.BATCH_MAX_WORKERS
+        self.concurrent_pipeline = concurrent_pipeline
+
+    def run(self, specs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        batch_id = get_research_timestamp()
+        batch_start = time.time()
+        universe = list(dict.fromkeys(s for spec in specs for s in spec["symbols"]))
+        requested = sum(len(spec["symbols"]) for spec in specs)
+        print(f"\n🗂️ Batch {batch_id}: {len(specs)} studies, {len(universe)} unique of {requested} symbols, "
+              f"{self.max_workers} workers")
+
+        previous_source = get_default_data_source()
+        shared_source = MemoizedDataSource(previous_source)
+        set_default_data_source(shared_source)
+        try:
+            # One fetch for the union of symbols; every study's tools then read from memory
+            prefetch = BatchFetcher(shared_source).fetch(universe)
+            prefetch_seconds = time.time() - batch_start
+            print(f"📥 Prefetched {prefetch.stats['symbols_fetched']}/{len(universe)} symbols "
+                  f"in {prefetch_seconds:.1f} seconds")
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                study_ids = [f"{batch_id}_{i:03d}" for i in range(1, len(specs) + 1)]
+                entries = list(pool.map(self._run_study, specs, study_ids))
+        finally:
+            set_default_data_source(previous_source)
+
+        succeeded = sum(1 for entry in entries if entry["status"] == "success")
+        manifest = {
+            "batch_id": batch_id,
+            "execution_mode": "concurrent" if self.concurrent_pipeline else "sequential",
+            "workers": self.max_workers,
+            "studies_total": len(specs),
+            "studies_succeeded": succeeded,
+            "studies_failed": len(specs) - succeeded,
+            "symbols_requested": requested,
+            "unique_symbols": len(universe),
+            "prefetch_seconds": round(prefetch_seconds, 3),
+            "prefetch_stats": prefetch.stats,
+            "market_data_memo": shared_source.stats(),
+            "total_seconds": round(time.time() - batch_start, 3),
+            "studies": entries,
+        }
+        manifest["manifest_path"] = save_research_data(manifest, f"batch_manifest_{batch_id}")
+        print(f"🧾 Batch manifest saved: {manifest['manifest_path']}")
+        print(f"✅ {succeeded}/{len(specs)} studies succeeded in {manifest['total_seconds']:.1f} seconds")
+        return manifest
+
+    def _run_study(self, spec: Dict[str, Any], study_id: str) -> Dict[str, Any]:
+        start = time.time()
+        run_study = (self.orchestrator.conduct_comprehensive_study_concurrent if self.concurrent_pipeline
+                     else self.orchestrator.conduct_comprehensive_study)
+        try:
+            results = run_study(symbols=spec["symbols"], research_focus=spec["research_focus"],
+                                study_name=spec["study_name"], study_id=study_id)
+        except Exception as e:
+            results = {"error": f"Research study failed: {str(e)}"}
+            log_error(results["error"])
+
+        entry = {
+            "study_id": study_id,
+            "study_name": spec["study_name"],
+            "symbols": spec["symbols"],
+            "research_focus": spec["research_focus"],
+            "status": "failed" if "error" in results else "success",
+            "seconds": round(time.time() - start, 3),
+        }
+        if "error" in results:
+            entry["error"] = results["error"]
+        else:
+            entry["report_path"] = results["research_report"]["metadata"]["filepath"]
+            entry["data_research_path"] = results.get("data_research_path")
+        return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a batch of financial risk research studies")
+    parser.add_argument("specs", help="JSON or CSV file of studies (study_name, symbols, research_focus)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"Studies run concurrently (default {ResearchConfig.BATCH_MAX_WORKERS})")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="Use the asyncio pipeline with parallel report sections inside each study")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.specs):
+        parser.error(f"Study spec file not found: {args.specs}")
+    specs = load_study_specs(args.specs)
+    BatchStudyRunner(max_workers=args.workers, concurrent_pipeline=args.concurrent).run(specs)
+
+
+if __name__ == "__main__":
+    main()
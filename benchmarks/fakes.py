@@ -0,0 +1,204 @@
+"""Offline stand-ins for yfinance, Serper and Gemini, plus synthetic market data
+
+Everything here is deterministic for a given seed, so benchmark runs are comparable:
+
+- synthetic_returns: a one-factor return panel with configurable length, width, fat tails
+  (Student-t shocks) and pairwise correlation
+- SyntheticDataSource: a MarketDataSource serving OHLCV histories and company info built from it
+- FakeSerperServer: a local HTTP server speaking Serper's search API, so the real pooled HTTP
+  client, rate limiter and result parsing are exercised
+- FakeGeminiChatModel: a LangChain chat model that follows the data research agent's ReAct
+  protocol (fetch data, search, answer) and writes fixed-length prose everywhere else
+"""
+import re
+import json
+import time
+import zlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List, Optional
+import numpy as np
+import pandas as pd
+from tools.market_data_source import MarketDataSource
+
+SECTORS = ["Technology", "Financial Services", "Healthcare", "Energy", "Industrials",
+           "Consumer Cyclical", "Utilities", "Real Estate", "Basic Materials", "Communication Services"]
+
+
+def synthetic_symbols(count: int) -> List[str]:
+    return [f"SYN{i:05d}" for i in range(count)]
+
+
+def synthetic_returns(n_symbols: int, n_days: int = 504, correlation: float = 0.3, tail_df: Optional[float] = 4.0,
+                      daily_volatility: float = 0.02, seed: int = 0) -> np.ndarray:
+    """(n_days, n_symbols) simple daily returns from a one-factor model
+
+    Every pair of symbols has the given correlation; with tail_df the market and idiosyncratic
+    shocks are Student-t with that many degrees of freedom (rescaled to unit variance), otherwise
+    normal. Per-symbol volatility is spread log-normally around daily_volatility.
+    """
+    rng = np.random.default_rng(seed)
+
+    def shocks(shape):
+        if tail_df is None:
+            return rng.standard_normal(shape)
+        return rng.standard_t(tail_df, shape) * np.sqrt((tail_df - 2) / tail_df)
+
+    market = shocks((n_days, 1))
+    idiosyncratic = shocks((n_days, n_symbols))
+    standardized = np.sqrt(correlation) * market + np.sqrt(1 - correlation) * idiosyncratic
+    volatility = daily_volatility * rng.lognormal(0.0, 0.35, n_symbols)
+    drift = rng.normal(0.0003, 0.0003, n_symbols)
+    # Keep simple returns above -95% so prices stay positive even in the fattest tails
+    return np.maximum(drift + standardized * volatility, -0.95)
+
+
+class SyntheticDataSource(MarketDataSource):
+    """Local replacement for the Yahoo Finance provider backed by a synthetic return panel
+
+    Histories are built once up front so timings measure the tools rather than the fake.
+    Unknown symbols are omitted from fetch_history, like symbols Yahoo has no data for.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, symbols: List[str], n_days: int = 504, correlation: float = 0.3,
+                 tail_df: Optional[float] = 4.0, seed: int = 0, end: str = "2025-06-30"):
+        returns = synthetic_returns(len(symbols), n_days, correlation, tail_df, seed=seed)
+        self.symbols = list(symbols)
+        self.returns = returns
+        close = 100.0 * np.cumprod(1.0 + returns, axis=0)
+        rng = np.random.default_rng(seed + 1)
+        spread = np.abs(returns) + 0.002
+        index = pd.bdate_range(end=end, periods=n_days, name="Date")
+        volume = rng.lognormal(14.0, 1.0, (n_days, len(symbols))).round()
+
+        self.histories: Dict[str, pd.DataFrame] = {}
+        for i, symbol in enumerate(symbols):
+            self.histories[symbol] = pd.DataFrame({
+                "Open": close[:, i] / (1.0 + returns[:, i]),
+                "High": close[:, i] * (1.0 + spread[:, i]),
+                "Low": close[:, i] * (1.0 - spread[:, i]),
+                "Close": close[:, i],
+                "Volume": volume[:, i],
+            }, index=index)
+        self.infos = {
+            symbol: {
+                "longName": f"Synthetic Holdings {symbol}",
+                "sector": SECTORS[i % len(SECTORS)],
+                "marketCap": int(1e9 * (1 + i % 500)),
+                "beta": round(0.5 + (i % 16) / 10, 2),
+            }
+            for i, symbol in enumerate(symbols)
+        }
+
+    def fetch_history(self, symbols: List[str], period: Optional[str] = None,
+                      start: Optional[str] = None, interval: str = "1d") -> Dict[str, pd.DataFrame]:
+        return {s: self.histories[s] for s in symbols if s in self.histories}
+
+    def fetch_info(self, symbol: str) -> Dict[str, Any]:
+        return dict(self.infos.get(symbol, {}))
+
+
+class _SerperHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API behind the pooled client
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        query = payload.get("q", "")
+        organic = [
+            {
+                "title": f"{query[:60]} - risk study {i + 1}",
+                "snippet": f"Academic research on portfolio volatility and financial risk for {query[:40]}.",
+                "link": f"https://research.example.org/{zlib.crc32(f'{query}:{i}'.encode()):08x}",
+                "position": i + 1,
+            }
+            for i in range(payload.get("num", 8))
+        ]
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = json.dumps({"searchParameters": payload, "organic": organic}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeSerperServer:
+    """Serper-compatible search endpoint on 127.0.0.1; use as a context manager and point
+    ResearchConfig.SERPER_BASE_URL at .url"""
+
+    def __init__(self, latency: float = 0.0):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _SerperHandler)
+        self.server.daemon_threads = True
+        self.server.latency = latency
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/search"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "FakeSerperServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+_FILLER = ("Volatility clustering and fat-tailed return distributions dominate the risk profile of "
+           "this universe, with drawdowns concentrated in periods of elevated market correlation. ")
+_RESEARCH_SYMBOLS = re.compile(r"financial risk research for: (.+)")
+
+
+def fake_gemini_chat_model(latency: float = 0.0, reply_words: int = 300, chunk_latency: float = 0.0):
+    """Build a FakeGeminiChatModel (LangChain is imported here, as the agents do, to keep imports light)"""
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, AIMessageChunk
+    from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+    class FakeGeminiChatModel(BaseChatModel):
+        """Deterministic offline chat model with optional per-call (and per streamed chunk) latency
+        and Gemini-like usage metadata"""
+
+        model: str = "fake-gemini"
+        latency: float = 0.0
+        reply_words: int = 300
+        chunk_latency: float = 0.0
+
+        @property
+        def _llm_type(self) -> str:
+            return "fake-gemini"
+
+        def _reply(self, prompt: str) -> str:
+            if "Tool names:" in prompt:
+                # ReAct turns: fetch the requested symbols, search once, then answer
+                if "Observation:" not in prompt:
+                    match = _RESEARCH_SYMBOLS.search(prompt)
+                    symbols = match.group(1).strip() if match else "SPY"
+                    return f"Thought: I need market data first.\nAction: financial_data_research\nAction Input: {symbols}"
+                if prompt.count("Observation:") == 1:
+                    return "Thought: Now recent research.\nAction: research_search\nAction Input: equity volatility risk"
+                return "Thought: I now know the final answer.\nFinal Answer: " + _FILLER
+            words = (_FILLER * (self.reply_words // len(_FILLER.split()) + 1)).split()[:self.reply_words]
+            return " ".join(words)
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+            prompt = "\n".join(str(m.content) for m in messages)
+            if self.latency:
+                time.sleep(self.latency)
+            text = self._reply(prompt)
+            usage = {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4,
+                     "total_tokens": (len(prompt) + len(text)) // 4}
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+        def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+            text = self._generate(messages, stop, run_manager, **kwargs).generations[0].message.content
+            for start in range(0, len(text), 80):
+                if self.chunk_latency:
+                    time.sleep(self.chunk_latency)
+                yield ChatGenerationChunk(message=AIMessageChunk(content=text[start:start + 80]))
+
+    return FakeGeminiChatModel(latency=latency, reply_words=reply_words, chunk_latency=chunk_latency)
@@ -0,0 +1,85 @@
+"""Import-time benchmark for the entry points
+
+Each module is imported in a fresh interpreter (so nothing is already in sys.modules) and the
+median of several runs is reported. With --max-seconds the exit status is 1 when any module
+is slower, so the check can run in CI:
+
+    python -m benchmarks.import_time --max-seconds 1.5
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Dict, Any, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ["config.settings", "utils.study_catalog", "main", "batch_runner", "research_app"]
+# Dependencies that each cost from a few hundred ms to over a second to import
+HEAVY_MODULES = ("langchain", "langchain_core", "langchain_google_genai", "scipy", "streamlit", "yfinance", "pyarrow")
+
+_TIMER = (
+    "import time, importlib; start = time.perf_counter(); importlib.import_module({module!r}); "
+    "print(time.perf_counter() - start)"
+)
+
+
+def _run(code: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+
+
+def time_import(module: str, runs: int = 5) -> Dict[str, Any]:
+    """Median, min and max wall time of ``import module`` in a clean interpreter"""
+    samples = []
+    for _ in range(runs):
+        completed = _run(_TIMER.format(module=module))
+        if completed.returncode != 0:
+            return {"module": module, "error": completed.stderr.strip().splitlines()[-1:]}
+        samples.append(float(completed.stdout.strip().splitlines()[-1]))
+    return {"module": module, "median_seconds": round(statistics.median(samples), 4),
+            "min_seconds": round(min(samples), 4), "max_seconds": round(max(samples), 4), "runs": runs}
+
+
+def heavy_modules(module: str) -> List[str]:
+    """Which of the known slow dependencies ``import module`` drags in"""
+    completed = _run(f"import sys, importlib; importlib.import_module({module!r}); "
+                     f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    return completed.stdout.split() if completed.returncode == 0 else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time of the entry points")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, help="Fail if any median exceeds this")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for module in args.modules:
+        result = time_import(module, args.runs)
+        if "error" not in result:
+            result["heavy_imports"] = heavy_modules(module)
+        results.append(result)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            if "error" in result:
+                print(f"{result['module']:<22} failed: {' '.join(result['error'])}")
+            else:
+                heavy = ", ".join(result["heavy_imports"]) or "-"
+                print(f"{result['module']:<22} {result['median_seconds']:>7.3f}s "
+                      f"(min {result['min_seconds']:.3f}, max {result['max_seconds']:.3f})  heavy: {heavy}")
+
+    failed = [r for r in results if "error" in r]
+    if args.max_seconds is not None:
+        failed += [r for r in results if r.get("median_seconds", 0.0) > args.max_seconds]
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
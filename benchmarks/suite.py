@@ -0,0 +1,329 @@
+"""Offline scaling benchmarks for the hot paths
+
+Times FinancialDataTool.fetch_stock_data, RiskCalculator.calculate_value_at_risk (once per
+symbol), RiskCalculator.calculate_portfolio_metrics and full studies (sequential and concurrent)
+at several universe sizes. Market data is synthetic and Yahoo, Serper and Gemini are replaced by
+the local fakes in benchmarks.fakes, so runs need no network or API keys and are repeatable.
+
+Each case reports the median wall time, throughput in symbols per second and the peak traced
+memory (tracemalloc, in a separate untimed run). Results are compared with a stored baseline and
+the exit status is 1 when a case fails or is slower / larger than the baseline by more than
+--tolerance, so the check can run in CI:
+
+    python -m benchmarks.suite                             # 10/100/1000/5000 symbols
+    python -m benchmarks.suite --sizes 10,100 --cases fetch_stock_data,value_at_risk
+    python -m benchmarks.suite --save-baseline             # record benchmarks/baseline.json
+"""
+import io
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import tracemalloc
+import contextlib
+from typing import Dict, Any, List, Callable, Optional
+import numpy as np
+
+from config.settings import ResearchConfig
+from benchmarks.fakes import SyntheticDataSource, FakeSerperServer, fake_gemini_chat_model, synthetic_symbols
+from tools.financial_data_tool import FinancialDataTool
+from tools.market_data_source import set_default_data_source
+from tools.risk_calculator import RiskCalculator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [10, 100, 1000, 5000]
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+MIN_SAMPLE_SECONDS = 0.05   # Fast cases are looped until one sample takes at least this long
+SLOW_SAMPLE_SECONDS = 10.0  # Cases slower than this (large full studies) are timed once
+MEMORY_NOISE_MB = 1.0       # Peak memory growth below this never counts as a regression
+
+
+class BenchmarkWorld:
+    """Synthetic universe, fake services and (lazily) one orchestrator shared by all cases"""
+
+    def __init__(self, max_symbols: int, n_days: int, correlation: float, tail_df: Optional[float],
+                 seed: int, llm_latency: float):
+        self.source = SyntheticDataSource(synthetic_symbols(max_symbols), n_days, correlation, tail_df, seed)
+        self.llm_latency = llm_latency
+        self._orchestrator = None
+
+    def symbols(self, count: int) -> List[str]:
+        return self.source.symbols[:count]
+
+    def returns(self, count: int) -> np.ndarray:
+        return self.source.returns[:, :count]
+
+    @property
+    def orchestrator(self):
+        if self._orchestrator is None:
+            from main import FinancialRiskResearchOrchestrator
+            with contextlib.redirect_stdout(io.StringIO()):
+                self._orchestrator = FinancialRiskResearchOrchestrator(llm=fake_gemini_chat_model(self.llm_latency))
+        return self._orchestrator
+
+
+def _fetch_stock_data(world: BenchmarkWorld, count: int) -> Callable[[], Any]:
+    symbols = world.symbols(count)
+    return lambda: FinancialDataTool.fetch_stock_data(symbols, data_source=world.source)
+
+
+def _value_at_risk(world: BenchmarkWorld, count: int) -> Callable[[], Any]:
+    columns = list(world.returns(count).T)
+    return lambda: [RiskCalculator.calculate_value_at_risk(column) for column in columns]
+
+
+def _portfolio_metrics(world: BenchmarkWorld, count: int) -> Callable[[], Any]:
+    returns = np.ascontiguousarray(world.returns(count))
+    weights = [1.0 / count] * count
+    return lambda: RiskCalculator.calculate_portfolio_metrics(weights, returns)
+
+
+def _study(world: BenchmarkWorld, count: int, concurrent: bool = False) -> Callable[[], Any]:
+    symbols = world.symbols(count)
+    orchestrator = world.orchestrator
+    run_study = (orchestrator.conduct_comprehensive_study_concurrent if concurrent
+                 else orchestrator.conduct_comprehensive_study)
+    runs = iter(range(1_000_000))
+
+    def run():
+        # Fresh study ids so runs don't overwrite each other's files mid-benchmark
+        study_id = f"bench_{'concurrent' if concurrent else 'sequential'}_{count}_{next(runs)}"
+        with contextlib.redirect_stdout(io.StringIO()):
+            return run_study(symbols, "Synthetic universe risk benchmark", study_id=study_id)
+    return run
+
+
+CASES: Dict[str, Callable[[BenchmarkWorld, int], Callable[[], Any]]] = {
+    "fetch_stock_data": _fetch_stock_data,
+    "value_at_risk": _value_at_risk,
+    "portfolio_metrics": _portfolio_metrics,
+    "study": _study,
+    "study_concurrent": lambda world, count: _study(world, count, concurrent=True),
+}
+
+
+def _check(result: Any):
+    if isinstance(result, dict) and "error" in result:
+        raise RuntimeError(result["error"])
+    if isinstance(result, list):
+        for item in result:
+            _check(item)
+
+
+def measure(func: Callable[[], Any], repeat: int = 3) -> Dict[str, Any]:
+    """Median / min seconds per call over ``repeat`` samples, then peak traced memory of one call
+
+    The first call is a warm-up (lazy imports, first-touch allocations) unless it takes longer
+    than SLOW_SAMPLE_SECONDS, in which case it is the only sample.
+    """
+    start = time.perf_counter()
+    _check(func())
+    first = time.perf_counter() - start
+    loops = max(1, math.ceil(MIN_SAMPLE_SECONDS / first)) if first < MIN_SAMPLE_SECONDS else 1
+
+    samples = [first] if first >= SLOW_SAMPLE_SECONDS else []
+    for _ in range(repeat - len(samples)):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append((time.perf_counter() - start) / loops)
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"median_seconds": round(statistics.median(samples), 6), "min_seconds": round(min(samples), 6), "loops": loops,
+            "repeat": len(samples), "peak_memory_mb": round(peak / 2 ** 20, 3)}
+
+
+@contextlib.contextmanager
+def offline_environment(search_latency: float = 0.0, workdir: str = None):
+    """Point the config at the fake Serper server and a scratch output tree, with caches off
+
+    Config paths are relative, so the benchmark runs from a temporary directory and nothing it
+    writes (reports, studies, catalog, traces) lands in the real outputs/.
+    """
+    overrides = {
+        "GOOGLE_API_KEY": ResearchConfig.GOOGLE_API_KEY or "offline",
+        "SERPER_API_KEY": ResearchConfig.SERPER_API_KEY or "offline",
+        # Cold paths are what we want to time; warm caches would turn repeats into lookups
+        "PRICE_CACHE_ENABLED": False,
+        "SEARCH_CACHE_ENABLED": False,
+        "LLM_CACHE_ENABLED": False,
+        "REPORT_SECTION_CACHE_ENABLED": False,
+        "TRACE_PROFILE": "",
+    }
+    previous = {name: getattr(ResearchConfig, name) for name in [*overrides, "SERPER_BASE_URL"]}
+    cwd = os.getcwd()
+    scratch = workdir or tempfile.mkdtemp(prefix="risk_bench_")
+    with FakeSerperServer(search_latency) as serper:
+        try:
+            for name, value in {**overrides, "SERPER_BASE_URL": serper.url}.items():
+                setattr(ResearchConfig, name, value)
+            os.makedirs(scratch, exist_ok=True)
+            os.chdir(scratch)
+            yield scratch
+        finally:
+            os.chdir(cwd)
+            for name, value in previous.items():
+                setattr(ResearchConfig, name, value)
+            if workdir is None:
+                shutil.rmtree(scratch, ignore_errors=True)
+
+
+def run_suite(sizes: List[int], cases: List[str], repeat: int = 3, n_days: int = 504, correlation: float = 0.3,
+              tail_df: Optional[float] = 4.0, seed: int = 0, llm_latency: float = 0.0,
+              search_latency: float = 0.0, progress: Callable[[Dict[str, Any]], None] = None) -> List[Dict[str, Any]]:
+    """Run every case at every size and return one result dict per (case, size)"""
+    results = []
+    with offline_environment(search_latency):
+        world = BenchmarkWorld(max(sizes), n_days, correlation, tail_df, seed, llm_latency)
+        set_default_data_source(world.source)
+        try:
+            for case in cases:
+                for count in sizes:
+                    result = {"case": case, "symbols": count}
+                    try:
+                        result.update(measure(CASES[case](world, count), repeat))
+                        result["symbols_per_second"] = round(count / result["median_seconds"], 2)
+                    except Exception as e:
+                        result["error"] = f"{type(e).__name__}: {e}"
+                    results.append(result)
+                    if progress is not None:
+                        progress(result)
+        finally:
+            set_default_data_source(None)
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    return {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine(),
+            "cpu_count": os.cpu_count(), "numpy": np.__version__}
+
+
+def _key(result: Dict[str, Any]) -> str:
+    return f"{result['case']}[{result['symbols']}]"
+
+
+def load_baseline(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float = 0.25) -> List[Dict[str, Any]]:
+    """Annotate results with their change versus the baseline; returns the regressed ones
+
+    A case regresses when its median time or peak memory exceeds the baseline's by more than
+    ``tolerance`` (a fraction); memory growth must also exceed MEMORY_NOISE_MB.
+    """
+    reference = baseline.get("results", {})
+    regressions = []
+    for result in results:
+        base = reference.get(_key(result))
+        if base is None or "error" in result:
+            continue
+        result["time_change"] = round(result["median_seconds"] / base["median_seconds"] - 1, 4)
+        result["memory_change"] = (round(result["peak_memory_mb"] / base["peak_memory_mb"] - 1, 4)
+                                   if base.get("peak_memory_mb") else 0.0)
+        memory_growth = result["peak_memory_mb"] - base.get("peak_memory_mb", 0.0)
+        if result["time_change"] > tolerance or (result["memory_change"] > tolerance and memory_growth > MEMORY_NOISE_MB):
+            result["regression"] = True
+            regressions.append(result)
+    return regressions
+
+
+def save_baseline(path: str, results: List[Dict[str, Any]], settings: Dict[str, Any]):
+    """Write (or update) the baseline; results for cases not run this time are kept"""
+    baseline = load_baseline(path) or {}
+    entries = baseline.get("results", {})
+    for result in results:
+        if "error" not in result:
+            entries[_key(result)] = {k: result[k] for k in ("median_seconds", "peak_memory_mb", "symbols_per_second")}
+    baseline.update({"environment": environment(), "settings": settings, "results": entries})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
+
+
+def _format(result: Dict[str, Any]) -> str:
+    label = f"{result['case']:<18} {result['symbols']:>6}"
+    if "error" in result:
+        return f"{label}  failed: {result['error']}"
+    line = (f"{label}  {result['median_seconds'] * 1000:>11.2f} ms  {result['symbols_per_second']:>12,.0f} sym/s  "
+            f"{result['peak_memory_mb']:>9.1f} MB")
+    if "time_change" in result:
+        line += f"  time {result['time_change']:+.0%}  mem {result['memory_change']:+.0%}"
+        line += "  REGRESSION" if result.get("regression") else ""
+    return line
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline scaling benchmarks with synthetic data and fake services")
+    parser.add_argument("--sizes", type=_int_list, default=DEFAULT_SIZES, help="Comma-separated symbol counts")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"Comma-separated subset of: {', '.join(CASES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed samples per case (median reported)")
+    parser.add_argument("--days", type=int, default=504, help="Trading days of synthetic history")
+    parser.add_argument("--correlation", type=float, default=0.3, help="Pairwise return correlation")
+    parser.add_argument("--tail-df", type=float, default=4.0,
+                        help="Student-t degrees of freedom for fat tails (0 for normal returns)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the fake Gemini waits per call")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="Seconds the fake Serper waits per query")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown / memory growth versus the baseline, as a fraction")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+    settings = {"days": args.days, "correlation": args.correlation, "tail_df": args.tail_df or None,
+                "seed": args.seed, "llm_latency": args.llm_latency, "search_latency": args.search_latency}
+
+    progress = None if args.json else lambda result: print(_format(result), flush=True)
+    results = run_suite(args.sizes, cases, args.repeat, args.days, args.correlation, args.tail_df or None,
+                        args.seed, args.llm_latency, args.search_latency, progress)
+
+    baseline = load_baseline(args.baseline)
+    regressions = []
+    if baseline is not None and not args.save_baseline:
+        if baseline.get("settings", settings) != settings:
+            print("warning: baseline was recorded with different synthetic data settings", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+    if args.save_baseline:
+        save_baseline(args.baseline, results, settings)
+
+    failed = [r for r in results if "error" in r]
+    if args.json:
+        print(json.dumps({"environment": environment(), "settings": settings, "results": results}, indent=2))
+    else:
+        if baseline is not None and not args.save_baseline:
+            print("\nversus baseline:")
+            for result in results:
+                print(_format(result))
+        elif args.save_baseline:
+            print(f"\nbaseline saved to {args.baseline}")
+        print(f"\n{len(results)} cases, {len(failed)} failed, {len(regressions)} regressed "
+              f"(tolerance {args.tolerance:.0%})")
+    sys.exit(1 if failed or regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
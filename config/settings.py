@@ -8,22 +8,135 @@ class ResearchConfig:
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
     SERPER_API_KEY = os.getenv("SERPER_API_KEY")
     
-    if not GOOGLE_API_KEY:
-        raise ValueError("Missing GOOGLE_API_KEY in .env file")
-    if not SERPER_API_KEY:
-        raise ValueError("Missing SERPER_API_KEY in .env file")
-    
     # Research Parameters
     ANALYSIS_PERIOD = "2y"  # 2 years of data for research
     RISK_FREE_RATE = 0.05   # 5% risk-free rate
     CONFIDENCE_LEVELS = [0.95, 0.99]  # 95% and 99% confidence intervals
     
+    # Market data fetching
+    FETCH_BATCH_SIZE = 100       # Symbols per bulk history request
+    FETCH_MAX_WORKERS = 8        # Parallel info / fallback history lookups
+    FETCH_MAX_PER_HOST = 8       # Concurrent connections allowed per data host
+    
+    # Local price history cache (memory-mapped NumPy columns under DATASET_DIR)
+    PRICE_CACHE_ENABLED = os.getenv("PRICE_CACHE_ENABLED", "1") != "0"
+    PRICE_CACHE_MAX_MB = 512                  # LRU eviction above this size
+    PRICE_CACHE_EOD_TTL_HOURS = 12            # Daily/weekly bars
+    PRICE_CACHE_INTRADAY_TTL_SECONDS = 300    # Minute/hour bars
+    PRICE_CACHE_OVERLAP_SESSIONS = 3          # Tail refreshes re-fetch this many sessions before the last bar
+    PRICE_CACHE_REBASE_TOLERANCE = 1e-4       # Relative close change on overlapping bars that forces a full refetch
+    
+    # Return panels (float32 values, float64 reductions) handed to the risk calculator by handle
+    RETURN_PANEL_MAX_PUBLISHED = 8      # Panels kept by publish_panel (oldest dropped first)
+    # Cross-process sharing: "shared_memory" blocks, or "memmap" files under DATASET_DIR/panels
+    RETURN_PANEL_SHARE_MODE = os.getenv("RETURN_PANEL_SHARE_MODE", "shared_memory")
+    RETURN_PANEL_MAX_SHARED = 4         # Shared panels kept alive by share_panel (oldest released first)
+    RISK_JOB_MAX_WORKERS = os.cpu_count() or 1  # Processes for fanned-out portfolio VaR / optimization jobs
+    
+    # Covariance engine
+    COVARIANCE_METHOD = "ledoit_wolf"   # "sample", "ewma" or "ledoit_wolf"
+    COVARIANCE_WINDOW = 252             # Trailing observations used (None = all aligned history)
+    EWMA_LAMBDA = 0.94                  # RiskMetrics daily decay
+    COVARIANCE_CACHE_SIZE = 32          # Matrices kept per engine (LRU)
+    
+    # Portfolio optimizer (long-only problems use batched accelerated projected gradient)
+    OPTIMIZER_FRONTIER_POINTS = 100
+    OPTIMIZER_MAX_ITER = 5000
+    OPTIMIZER_TOLERANCE = 1e-10         # Max weight change per iteration at convergence
+    
+    # Rolling-window analytics
+    ROLLING_WINDOWS = [21, 63, 252]  # ~1 month, 1 quarter, 1 year of trading days
+    ROLLING_BENCHMARK = "SPY"        # Market proxy for rolling beta
+    
+    # Research digest handed to the LLM agents
+    DIGEST_TOKEN_BUDGET = 2000       # Approximate prompt tokens for the whole digest
+    DIGEST_TOP_K = 5                 # Entries per ranked outlier list
+    DIGEST_MAX_SECTORS = 8
+    DIGEST_MAX_CLUSTERS = 5
+    DIGEST_CORRELATION_THRESHOLD = 0.7
+    ANALYSIS_TOKEN_BUDGET = 3000     # Risk analysis text carried into the report prompt
+    
+    # Map-reduce report engine: per-symbol profiles (map) feed the cross-asset sections (reduce)
+    REPORT_PROFILE_BATCH_SIZE = 5        # Symbols per profile call
+    REPORT_MAX_PROFILED_SYMBOLS = 50     # Riskiest symbols profiled individually
+    REPORT_PROFILE_TOKEN_BUDGET = 1500   # Profile text carried into the reduce prompts
+    REPORT_SECTION_CACHE_ENABLED = os.getenv("REPORT_SECTION_CACHE_ENABLED", "1") != "0"
+    REPORT_SECTION_CACHE_TTL_HOURS = 24 * 7
+    
+    # LLM response cache (SQLite under CACHE_DIR)
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+    LLM_CACHE_TTL_HOURS = 24 * 7
+    LLM_CACHE_MAX_ENTRIES = 5000
+    
+    # Monte Carlo VaR simulation
+    MC_DEFAULT_PATHS = 100_000
+    MC_CHUNK_SIZE = 50_000           # Scenarios generated per chunk
+    MC_MAX_CHUNK_MB = 16             # Upper bound on one chunk's scenario matrix
+    MC_MAX_WORKERS = os.cpu_count() or 1   # Chunks simulated in parallel per run
+    MC_T_DEGREES_OF_FREEDOM = 5      # Student-t scenarios
+    
+    # Shared CPU worker pool (forkserver/spawn) for Monte Carlo chunks and risk job fan-out
+    PROCESS_POOL_WORKERS = os.cpu_count() or 1
+    
+    # Async orchestrator: max in-flight calls per external service
+    SERVICE_CONCURRENCY = {"llm": 4, "market_data": 2, "search": 4}
+    
+    # Pooled HTTP client for research search (Serper)
+    SERPER_BASE_URL = os.getenv("SERPER_BASE_URL", "https://google.serper.dev/search")
+    HTTP_POOL_SIZE = 16              # Keep-alive connections per host
+    HTTP_TIMEOUT_SECONDS = 15
+    HTTP_MAX_RETRIES = 3             # Retries on connection errors, 429 and 5xx
+    HTTP_BACKOFF_BASE_SECONDS = 0.5  # Exponential backoff with full jitter
+    HTTP_BACKOFF_MAX_SECONDS = 8.0
+    SEARCH_RATE_PER_SECOND = 5.0     # Token bucket refill rate
+    SEARCH_BURST = 5                 # Token bucket capacity
+    
+    # Search result relevance scoring (keyword -> weight, per-field multipliers, BM25 parameters)
+    RELEVANCE_KEYWORDS = {
+        "study": 1, "analysis": 1, "research": 1, "journal": 1, "academic": 1, "university": 1,
+        "financial": 1, "risk": 1, "volatility": 1, "portfolio": 1, "investment": 1
+    }
+    RELEVANCE_FIELD_WEIGHTS = {"title": 3, "snippet": 2, "link": 1}
+    BM25_K1 = 1.5
+    BM25_B = 0.75
+    
+    # Research search result cache (SQLite under CACHE_DIR)
+    SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "1") != "0"
+    SEARCH_CACHE_TTL_HOURS = 24
+    SEARCH_CACHE_MAX_ENTRIES = 20000
+    
+    # Local research corpus (TF-IDF index over past search results and reports, under CACHE_DIR)
+    CORPUS_TOP_K = 5
+    CORPUS_PASSAGE_CHARS = 800       # Reports are split into passages of about this size
+    CORPUS_REFRESH_SECONDS = 60      # Minimum interval between index freshness checks
+    
+    # Batch study runner
+    BATCH_MAX_WORKERS = 4            # Studies executed concurrently
+    
+    # Study output: numeric tables as "parquet" (needs pyarrow) or memory-mapped "npy" columns
+    COLUMNAR_FORMAT = os.getenv("COLUMNAR_FORMAT", "parquet")
+    
+    # Tracing: spans as JSON lines under TRACE_DIR, metrics in an in-process Prometheus-style registry
+    TRACE_EXPORT_ENABLED = os.getenv("TRACE_EXPORT_ENABLED", "1") != "0"
+    TRACE_PROFILE = os.getenv("TRACE_PROFILE", "")  # Per-phase capture: "cpu" (cProfile), "memory" (tracemalloc) or "all"
+    TRACE_MAX_SPANS_IN_MEMORY = 10000
+    
     # Output settings
     OUTPUT_DIR = "outputs/research_reports"
     DATASET_DIR = "outputs/datasets"
     VISUALIZATION_DIR = "outputs/visualizations"
+    PRICE_CACHE_DIR = "outputs/datasets/price_cache"
+    CACHE_DIR = "outputs/cache"
+    TRACE_DIR = "outputs/traces"
+    
+    @classmethod
+    def validate(cls, required=("GOOGLE_API_KEY", "SERPER_API_KEY")):
+        """Check API keys when a client that needs them is built, rather than on import"""
+        for name in required:
+            if not getattr(cls, name):
+                raise ValueError(f"Missing {name} in .env file")
     
-    # Ensure directories exist
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    os.makedirs(DATASET_DIR, exist_ok=True)
-    os.makedirs(VISUALIZATION_DIR, exist_ok=True)
+    @classmethod
+    def ensure_directories(cls):
+        for directory in (cls.OUTPUT_DIR, cls.DATASET_DIR, cls.VISUALIZATION_DIR):
+            os.makedirs(directory, exist_ok=True)
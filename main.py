@@ -1,26 +1,61 @@
-from agents.data_research_agent import DataResearchAgent
-from agents.risk_analysis_agent import RiskAnalysisAgent
-from agents.research_report_agent import ResearchReportAgent
+from agents.report_sections import format_references
+from agents.report_engine import ReportEngine
+from config.settings import ResearchConfig
 from utils.helpers import ensure_directories, save_research_data, get_research_timestamp, log_error
-from typing import List, Dict, Any
+from utils.columnar_store import save_study
+from utils.study_catalog import get_study_catalog, key_metrics
+from utils.research_digest import build_research_digest, truncate_to_tokens
+from utils.service_limits import ServiceLimiter
+from utils.tracing import span, current_span, get_metrics, trace_totals
+from tools.financial_data_tool import FinancialDataTool
+from tools.market_data_source import memoized_study_source
+from tools.relevance import get_default_scorer
+from tools.research_search_tool import ResearchSearchTool
+from tools.search_cache import get_search_cache
+from tools.risk_calculator import RiskCalculator
+from typing import List, Dict, Any, Callable, Optional
+import os
+import asyncio
 import time
 
 class FinancialRiskResearchOrchestrator:
     """Main orchestrator for the Financial Risk Management Research System"""
     
-    def __init__(self):
+    def __init__(self, llm=None):
         print("🔬 Initializing Financial Risk Management Research System...")
-        self.data_research_agent = DataResearchAgent()
-        self.risk_analysis_agent = RiskAnalysisAgent()
-        self.research_report_agent = ResearchReportAgent()
+        # Any LangChain chat model can be shared by all agents (e.g. a fake for offline runs);
+        # only the default Gemini client needs GOOGLE_API_KEY
+        ResearchConfig.validate(("SERPER_API_KEY",) if llm is not None else ("GOOGLE_API_KEY", "SERPER_API_KEY"))
+        # The agents pull in LangChain and the Gemini client, which take seconds to import;
+        # load them when an orchestrator is built rather than whenever main is imported
+        from agents.data_research_agent import DataResearchAgent
+        from agents.risk_analysis_agent import RiskAnalysisAgent
+        from agents.research_report_agent import ResearchReportAgent
+        self.data_research_agent = DataResearchAgent(llm=llm)
+        self.risk_analysis_agent = RiskAnalysisAgent(llm=llm)
+        self.research_report_agent = ResearchReportAgent(llm=llm)
         ensure_directories()
         print("✅ Research system initialized successfully!")
     
     def conduct_comprehensive_study(self, 
                                   symbols: List[str], 
                                   research_focus: str = "",
-                                  study_name: str = "Financial Risk Analysis") -> Dict[str, Any]:
-        study_id = get_research_timestamp()
+                                  study_name: str = "Financial Risk Analysis",
+                                  study_id: str = None,
+                                  on_report_chunk: Callable[[str, str], None] = None,
+                                  refresh_sections: List[str] = None) -> Dict[str, Any]:
+        """Run the study phase by phase; with on_report_chunk the report is streamed as it is written"""
+        study_id = study_id or get_research_timestamp()
+        with span("study", study_id=study_id, execution_mode="sequential", symbols=len(symbols)) as study_span, \
+                memoized_study_source():
+            results = self._conduct_study(symbols, research_focus, study_name, study_id, on_report_chunk,
+                                          refresh_sections)
+            self._finish_trace(study_span, results)
+            return results
+    
+    def _conduct_study(self, symbols: List[str], research_focus: str, study_name: str, study_id: str,
+                       on_report_chunk: Optional[Callable[[str, str], None]],
+                       refresh_sections: Optional[List[str]]) -> Dict[str, Any]:
         total_start = time.time()
         
         print(f"\n📊 Starting Research Study: {study_name}")
@@ -44,10 +79,11 @@ class FinancialRiskResearchOrchestrator:
             print("📚 Phase 1: Conducting comprehensive data research...")
             start_time = time.time()
             
-            research_results = self.data_research_agent.conduct_research(
-                symbols=symbols, 
-                research_focus=research_focus
-            )
+            with span("phase:data_research", profile=True):
+                research_results = self.data_research_agent.conduct_research(
+                    symbols=symbols, 
+                    research_focus=research_focus
+                )
             
             if "error" in research_results:
                 return {"error": f"Research phase failed: {research_results['error']}"}
@@ -55,18 +91,28 @@ class FinancialRiskResearchOrchestrator:
             study_results["data_research"] = research_results
             print(f"✅ Phase 1 completed in {time.time() - start_time:.1f} seconds")
             
-            data_path = save_research_data(research_results, f"research_data_{study_id}.json")
+            data_path = save_research_data(research_results, f"research_data_{study_id}")
             study_results["data_research_path"] = data_path
             print(f"💾 Data saved: {data_path}")
             
+            # Deterministic numeric digest so the LLM prompts stay compact as the universe grows
+            with span("phase:market_data", profile=True):
+                market_data, returns_panel = FinancialDataTool.fetch_market_snapshot(symbols)
+                research_digest = build_research_digest(research_results, symbols, market_data, returns_panel)
+            study_results["research_digest"] = research_digest
+            
             # Phase 2: Risk Analysis
             print("\n🧮 Phase 2: Performing quantitative risk analysis...")
             start_time = time.time()
             
-            analysis_results = self.risk_analysis_agent.analyze_financial_risk(
-                research_data=research_results,
-                symbols=symbols
-            )
+            with span("phase:risk_analysis", profile=True):
+                analysis_results = self.risk_analysis_agent.analyze_financial_risk(
+                    research_data=research_results,
+                    symbols=symbols,
+                    market_data=market_data,
+                    returns=returns_panel,
+                    digest=research_digest
+                )
             
             if "error" in analysis_results:
                 return {"error": f"Analysis phase failed: {analysis_results['error']}"}
@@ -78,25 +124,50 @@ class FinancialRiskResearchOrchestrator:
             print("\n📝 Phase 3: Generating academic research report...")
             start_time = time.time()
             
-            report_results = self.research_report_agent.generate_research_report(
-                research_data=research_results,
-                analysis_data=analysis_results,
-                symbols=symbols
+            # Per-symbol profiles (map) in parallel, then the cross-asset sections (reduce)
+            with span("phase:per_symbol_analysis", profile=True):
+                per_symbol_risk = self._value_at_risk_profiles(returns_panel)
+            study_results["per_symbol_risk"] = per_symbol_risk
+            analysis_text = truncate_to_tokens(
+                str(analysis_results.get("risk_analysis", analysis_results)), ResearchConfig.ANALYSIS_TOKEN_BUDGET
             )
+            try:
+                with span("phase:report", profile=True):
+                    engine = ReportEngine(self.research_report_agent, refresh=refresh_sections or ())
+                    report_results = engine.generate(
+                        {"digest": research_digest, "analysis": analysis_text},
+                        self._profile_records(market_data, per_symbol_risk), symbols, research_focus,
+                        format_references([]), report_id=study_id, on_chunk=on_report_chunk
+                    )
+            except Exception as e:
+                report_results = {"error": f"Report generation error: {str(e)}", "success": False}
             
             if not report_results.get("success", False):
                 return {"error": f"Report generation failed: {report_results.get('error', 'Unknown error')}"}
             
-            study_results["research_report"] = report_results
+            study_results["research_report"] = {k: v for k, v in report_results.items() if k != "sections"}
             print(f"✅ Phase 3 completed in {time.time() - start_time:.1f} seconds")
             
-            complete_path = save_research_data(study_results, f"complete_study_{study_id}.json")
+            study_results["performance"] = {"total_seconds": round(time.time() - total_start, 3)}
+            self._attach_trace(study_results)
+            self._attach_cache_stats(study_results)
+            
+            with span("phase:save"):
+                complete_path = save_study(study_results, study_id, returns_panel, market_data)
+                self._register_study(study_results, complete_path, market_data)
             print(f"💾 Complete study saved: {complete_path}")
             
             print("\n" + "="*60)
             print("🎉 RESEARCH STUDY COMPLETED SUCCESSFULLY!")
             print(f"📁 Report saved: {report_results['metadata']['filepath']}")
             print(f"⏱️ Total Study Duration: {time.time() - total_start:.1f} seconds")
+            if "llm_cache_stats" in study_results:
+                cache_stats = study_results["llm_cache_stats"]
+                print(f"🗄️ LLM cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+            if "search_cache_stats" in study_results:
+                cache_stats = study_results["search_cache_stats"]
+                print(f"🔎 Search cache: {cache_stats['api_calls_saved']} API calls saved "
+                      f"({cache_stats['latency_saved_ms'] / 1000:.1f}s of latency)")
             print("="*60)
             
             return study_results
@@ -107,5 +178,274 @@ class FinancialRiskResearchOrchestrator:
             print(f"❌ {error_msg}")
             return {"error": error_msg}
 
+    def conduct_comprehensive_study_concurrent(self,
+                                               symbols: List[str],
+                                               research_focus: str = "",
+                                               study_name: str = "Financial Risk Analysis",
+                                               service_limits: Dict[str, int] = None,
+                                               study_id: str = None,
+                                               on_report_chunk: Callable[[str, str], None] = None,
+                                               refresh_sections: List[str] = None) -> Dict[str, Any]:
+        """Blocking entry point for the asyncio pipeline"""
+        return asyncio.run(self.conduct_comprehensive_study_async(
+            symbols, research_focus, study_name, service_limits, study_id, on_report_chunk, refresh_sections
+        ))
+    
+    async def conduct_comprehensive_study_async(self,
+                                                symbols: List[str],
+                                                research_focus: str = "",
+                                                study_name: str = "Financial Risk Analysis",
+                                                service_limits: Dict[str, int] = None,
+                                                study_id: str = None,
+                                                on_report_chunk: Callable[[str, str], None] = None,
+                                                refresh_sections: List[str] = None) -> Dict[str, Any]:
+        """Run the study as a dependency graph instead of sequential phases
+        
+        Market data, literature search and the data research agent start immediately; per-symbol
+        risk profiles follow the market data, and the ReportEngine starts each report section as
+        soon as its own inputs are ready, so total latency tracks the critical path rather than
+        the sum of phases.
+        
+        With on_report_chunk, sections are streamed: on_report_chunk(section_key, text_so_far) runs
+        on the calling thread (the event loop's), and the report's .partial file grows as tokens
+        and finished sections arrive (see ReportStream). refresh_sections lists report sections to
+        regenerate instead of taking them from the section cache.
+        """
+        study_id = study_id or get_research_timestamp()
+        # Stages overlap, so TRACE_PROFILE captures the whole study here rather than per stage: a
+        # stage's cProfile would record whichever stages the event loop ran meanwhile, and the
+        # process-wide tracemalloc peak can't be split between overlapping stages
+        with span("study", profile=True, study_id=study_id, execution_mode="concurrent",
+                  symbols=len(symbols)) as study_span, memoized_study_source():
+            results = await self._conduct_study_async(symbols, research_focus, study_name, service_limits, study_id,
+                                                      on_report_chunk, refresh_sections)
+            self._finish_trace(study_span, results)
+            return results
+    
+    async def _conduct_study_async(self, symbols: List[str], research_focus: str, study_name: str,
+                                   service_limits: Optional[Dict[str, int]], study_id: str,
+                                   on_report_chunk: Optional[Callable[[str, str], None]],
+                                   refresh_sections: Optional[List[str]]) -> Dict[str, Any]:
+        total_start = time.time()
+        limiter = ServiceLimiter(service_limits)
+        timings: Dict[str, float] = {}
+        first_content: List[float] = []
+        
+        def emit(key: str, text: str):
+            if not first_content:
+                first_content.append(round(time.time() - total_start, 3))
+            on_report_chunk(key, text)
+        
+        print(f"\n📊 Starting Research Study (concurrent): {study_name}")
+        print(f"🏷️  Study ID: {study_id}")
+        print(f"🎯 Symbols: {', '.join(symbols)}")
+        print(f"🔍 Focus: {research_focus}")
+        print("="*60)
+        
+        study_results = {
+            "study_metadata": {
+                "study_id": study_id,
+                "study_name": study_name,
+                "symbols": symbols,
+                "research_focus": research_focus,
+                "start_time": study_id,
+                "execution_mode": "concurrent"
+            }
+        }
+        
+        async def timed(name: str, awaitable):
+            # Measures the stage's own work; waiting on upstream stages happens before this is awaited
+            start = time.time()
+            with span(f"stage:{name}"):
+                result = await awaitable
+            timings[name] = round(time.time() - start, 3)
+            print(f"✅ {name} finished at +{time.time() - total_start:.1f}s")
+            return result
+        
+        async def data_research():
+            results = await limiter.run("llm", self.data_research_agent.conduct_research,
+                                        symbols=symbols, research_focus=research_focus)
+            if "error" in results:
+                raise RuntimeError(f"Research phase failed: {results['error']}")
+            return results
+        
+        async def research_digest():
+            # Built once per study (correlation clusters cover the whole universe) and shared by the
+            # risk analysis, the report sections and the saved results
+            research_results, (market_data, returns_panel) = await asyncio.gather(research_task, market_task)
+            return build_research_digest(research_results, symbols, market_data, returns_panel)
+        
+        async def risk_analysis():
+            research_results, (market_data, returns_panel), digest = await asyncio.gather(
+                research_task, market_task, digest_task
+            )
+            results = await timed("risk_analysis", limiter.run(
+                "llm", self.risk_analysis_agent.analyze_financial_risk, research_data=research_results,
+                symbols=symbols, market_data=market_data, returns=returns_panel, digest=digest
+            ))
+            if "error" in results:
+                raise RuntimeError(f"Analysis phase failed: {results['error']}")
+            return results
+        
+        async def analysis_text():
+            results = await analysis_task
+            return truncate_to_tokens(str(results.get("risk_analysis", results)), ResearchConfig.ANALYSIS_TOKEN_BUDGET)
+        
+        async def literature_text():
+            results = await literature_task
+            return "\n".join(f"- {r['title']}: {r['snippet']}" for r in results) or "No literature results available."
+        
+        async def references_text():
+            return format_references(await literature_task)
+        
+        async def profile_records():
+            (market_data, _), var_profiles = await asyncio.gather(market_task, profiles_task)
+            return self._profile_records(market_data, var_profiles)
+        
+        research_task = asyncio.ensure_future(timed("data_research", data_research()))
+        market_task = asyncio.ensure_future(timed("market_data", limiter.run(
+            "market_data", FinancialDataTool.fetch_market_snapshot, symbols
+        )))
+        literature_task = asyncio.ensure_future(timed("literature_search", self._search_literature(
+            limiter, symbols, research_focus
+        )))
+        profiles_task = asyncio.ensure_future(self._per_symbol_profiles(market_task, timed))
+        digest_task = asyncio.ensure_future(research_digest())
+        analysis_task = asyncio.ensure_future(risk_analysis())
+        
+        engine = ReportEngine(self.research_report_agent, limiter, refresh=refresh_sections or ())
+        report_task = asyncio.ensure_future(engine.run(
+            {"digest": digest_task, "literature": literature_text(), "analysis": analysis_text()},
+            profile_records(), symbols, research_focus, references_text(), report_id=study_id,
+            on_chunk=emit if on_report_chunk is not None else None, timed=timed
+        ))
+        
+        pending = [research_task, market_task, literature_task, profiles_task, digest_task, analysis_task, report_task]
+        
+        try:
+            report_results = await report_task
+            research_results = await research_task
+            market_data, returns_panel = await market_task
+            analysis_results = await analysis_task
+            
+            study_results["data_research"] = research_results
+            study_results["data_research_path"] = save_research_data(research_results, f"research_data_{study_id}")
+            study_results["research_digest"] = await digest_task
+            study_results["literature"] = await literature_task
+            study_results["per_symbol_risk"] = await profiles_task
+            study_results["risk_analysis"] = analysis_results
+            study_results["research_report"] = {k: v for k, v in report_results.items() if k != "sections"}
+            metadata = report_results["metadata"]
+            
+            total_seconds = time.time() - total_start
+            study_results["performance"] = {
+                "total_seconds": round(total_seconds, 3),
+                "sum_of_stage_seconds": round(sum(timings.values()), 3),
+                "stage_seconds": timings,
+                "peak_in_flight": limiter.peak_in_flight,
+            }
+            if first_content:
+                study_results["performance"]["first_content_seconds"] = first_content[0]
+            
+            self._attach_trace(study_results)
+            self._attach_cache_stats(study_results)
+            
+            with span("phase:save"):
+                complete_path = save_study(study_results, study_id, returns_panel, market_data)
+                self._register_study(study_results, complete_path, market_data)
+            print(f"💾 Complete study saved: {complete_path}")
+            
+            print("\n" + "="*60)
+            print("🎉 RESEARCH STUDY COMPLETED SUCCESSFULLY!")
+            print(f"📁 Report saved: {metadata['filepath']}")
+            print(f"⏱️ Total Study Duration: {total_seconds:.1f} seconds "
+                  f"(sequential stages would take {sum(timings.values()):.1f})")
+            print("="*60)
+            
+            return study_results
+            
+        except Exception as e:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            error_msg = f"Research study failed: {str(e)}"
+            log_error(error_msg)
+            print(f"❌ {error_msg}")
+            return {"error": error_msg}
+    
+    async def _search_literature(self, limiter: ServiceLimiter, symbols: List[str],
+                                 research_focus: str) -> List[Dict[str, Any]]:
+        """Run the focus query and per-symbol queries concurrently and merge the results by relevance"""
+        search_tool = ResearchSearchTool()
+        queries = [research_focus or "portfolio risk"]
+        queries += [f"{symbol} stock risk" for symbol in symbols[:ResearchConfig.DIGEST_TOP_K]]
+        # search_many fans the queries out over the pooled, rate-limited HTTP client
+        batch = await limiter.run("search", search_tool.search_many, queries)
+        
+        merged = {}
+        for response in batch["results"]:
+            for result in response.get("results", []):
+                merged.setdefault(result["source"] or result["title"], result)
+        # Rank the pooled hits against the study focus rather than per query
+        return get_default_scorer().rank(list(merged.values()), " ".join(queries), k=ResearchConfig.DIGEST_TOP_K * 2)
+    
+    @staticmethod
+    def _attach_trace(study_results: Dict[str, Any]):
+        """Trace id plus the tokens, bytes and cache counts recorded by the study's finished spans"""
+        trace_id = current_span().trace_id
+        study_results["performance"]["trace_id"] = trace_id
+        study_results["performance"]["trace_totals"] = trace_totals(trace_id)
+    
+    @staticmethod
+    def _finish_trace(study_span, results: Dict[str, Any]):
+        """Mark failed studies on their root span and refresh the metrics file next to the spans"""
+        if "error" in results:
+            study_span.status = "error"
+            study_span.set(error=results["error"])
+        if ResearchConfig.TRACE_EXPORT_ENABLED:
+            try:
+                get_metrics().write(os.path.join(ResearchConfig.TRACE_DIR, "metrics.prom"))
+            except OSError as e:
+                log_error(f"Could not write metrics: {str(e)}")
+    
+    @staticmethod
+    def _attach_cache_stats(study_results: Dict[str, Any]):
+        from utils.llm_cache import get_llm_cache  # LangChain-backed; imported once agents exist
+        llm_cache = get_llm_cache()
+        if llm_cache is not None:
+            study_results["llm_cache_stats"] = llm_cache.stats()
+        search_cache = get_search_cache()
+        if search_cache is not None:
+            study_results["search_cache_stats"] = search_cache.stats()
+    
+    @staticmethod
+    def _register_study(study_results: Dict[str, Any], study_path: str, market_data: Dict[str, Any]):
+        """Index the saved study in the catalog; a catalog failure must not fail a finished study"""
+        try:
+            metrics = key_metrics(market_data, study_results.get("per_symbol_risk"))
+            get_study_catalog().register(study_results, study_path, metrics)
+        except Exception as e:
+            log_error(f"Could not register study {study_results['study_metadata']['study_id']}: {str(e)}")
+    
+    @staticmethod
+    async def _per_symbol_profiles(market_task, timed) -> Dict[str, Any]:
+        """VaR/CVaR per symbol from the returns panel, off the event loop"""
+        _, returns_panel = await market_task
+        return await timed("per_symbol_analysis", asyncio.to_thread(
+            FinancialRiskResearchOrchestrator._value_at_risk_profiles, returns_panel
+        ))
+    
+    @staticmethod
+    def _value_at_risk_profiles(returns_panel) -> Dict[str, Any]:
+        return RiskCalculator.calculate_value_at_risk_panel(returns_panel)
+    
+    @staticmethod
+    def _profile_records(market_data: Dict[str, Any], var_profiles: Dict[str, Any]) -> Dict[str, Dict]:
+        """Per-symbol inputs for the report's map step: research record plus VaR/CVaR"""
+        return {
+            symbol: {**record, "value_at_risk": var_profiles.get(symbol, {})}
+            for symbol, record in market_data.items() if "error" not in record
+        }
+    
     def get_study_summary(self, study_results: Dict[str, Any]) -> str:
         ...
@@ -1,5 +1,7 @@
 import streamlit as st
 from main import FinancialRiskResearchOrchestrator
+from utils.study_catalog import get_study_catalog
+from agents.report_sections import REPORT_SECTIONS
 import os
 import json
 import time
@@ -39,6 +41,11 @@ def load_css():
     </style>
     """, unsafe_allow_html=True)
 
+@st.cache_resource(show_spinner="Loading research agents...")
+def get_orchestrator() -> FinancialRiskResearchOrchestrator:
+    """One orchestrator per server process; Streamlit reruns the script on every interaction"""
+    return FinancialRiskResearchOrchestrator()
+
 def main():
     st.set_page_config(
         page_title="Financial Risk Management Research System",
@@ -69,30 +76,71 @@ def main():
         symbols_input = st.text_input("Enter Stock Symbols (comma-separated)", value="AAPL,MSFT,GOOGL")
         research_focus = st.text_area("Research Focus", value="Technology sector risk analysis with focus on market volatility and systematic risk factors")
         study_name = st.text_input("Study Name", value="Tech Sector Financial Risk Assessment")
+        concurrent = st.checkbox("⚡ Concurrent pipeline", value=True,
+                                 help="Overlap data fetching, literature search and analysis, and write report sections in parallel")
+        stream_report = st.checkbox("📝 Stream report", value=True,
+                                    help="Show the report while the model is writing it")
         
         start_button = st.button("🚀 Start Research Study", type="primary")
+        
+        st.header("📚 Past Studies")
+        symbol_filter = st.text_input("Filter by symbol", value="")
+        past_studies = get_study_catalog().list(symbol=symbol_filter.strip() or None, limit=25)
+        if past_studies:
+            labels = {
+                entry["study_id"]: f"{entry['study_date']} · {entry['study_name']} ({entry['symbol_count']} symbols)"
+                for entry in past_studies
+            }
+            selected_study = st.selectbox("Study", list(labels), format_func=labels.get)
+            if st.button("📂 Open Study"):
+                st.session_state["open_study"] = selected_study
+        else:
+            st.caption("No past studies found.")
+    
+    if not start_button and st.session_state.get("open_study"):
+        show_past_study(st.session_state["open_study"])
+        return
     
     if start_button:
+        st.session_state.pop("open_study", None)
         symbols = [s.strip().upper() for s in symbols_input.split(",") if s.strip()]
         if not symbols:
             st.error("Please enter at least one stock symbol.")
             return
         
-        orchestrator = FinancialRiskResearchOrchestrator()
+        orchestrator = get_orchestrator()
         
         st.info("🔍 Starting research study... This may take a few minutes.")
         start_time = time.time()
         
+        # One placeholder per section, in report order, so parallel sections fill in where they belong
+        report_placeholders = {key: st.empty() for key in ["report"] + [s["key"] for s in REPORT_SECTIONS]}
+        last_render = {}
+        
+        def show_chunk(key: str, text: str):
+            # Re-rendering markdown on every token is wasteful; ~10 updates per second per section is plenty
+            now = time.time()
+            if now - last_render.get(key, 0.0) >= 0.1:
+                last_render[key] = now
+                report_placeholders[key].markdown(text)
+        
         with st.spinner("Running multi-agent research process..."):
-            results = orchestrator.conduct_comprehensive_study(
+            run_study = (orchestrator.conduct_comprehensive_study_concurrent if concurrent
+                         else orchestrator.conduct_comprehensive_study)
+            results = run_study(
                 symbols=symbols,
                 research_focus=research_focus,
-                study_name=study_name
+                study_name=study_name,
+                on_report_chunk=show_chunk if stream_report else None
             )
         
+        for placeholder in report_placeholders.values():
+            placeholder.empty()
         if "error" in results:
             st.error(f"❌ Research study failed: {results['error']}")
             return
+        if stream_report:
+            report_placeholders["report"].markdown(results["research_report"]["report_content"])
         
         total_time = time.time() - start_time
         st.markdown(f"""
@@ -119,5 +167,29 @@ def main():
         
         st.success("You can find the full academic report in the `outputs/research_reports/` folder.")
 
+def show_past_study(study_id: str):
+    """Render a catalogued study from its saved files without re-running anything"""
+    entry = get_study_catalog().get(study_id)
+    study = get_study_catalog().load(study_id)
+    if entry is None or study is None:
+        st.warning(f"Study {study_id} is no longer available on disk.")
+        return
+    
+    st.subheader(f"📂 {entry['study_name']}")
+    st.markdown(f"**Study ID:** {study_id}  \n**Symbols:** {', '.join(entry['symbols'])}  \n"
+                f"**Focus:** {entry['research_focus']}")
+    if entry["metrics"]:
+        columns = st.columns(len(entry["metrics"]))
+        for column, (name, value) in zip(columns, entry["metrics"].items()):
+            column.metric(name.replace("_", " ").title(), value)
+    
+    if entry["report_path"] and os.path.exists(entry["report_path"]):
+        with open(entry["report_path"], encoding="utf-8") as f:
+            st.markdown(f.read())
+    tables = study.get("tables", {})
+    if "market_metrics" in tables:
+        st.subheader("📊 Market Metrics")
+        st.dataframe(tables["market_metrics"].read())
+
 if __name__ == "__main__":
     main()
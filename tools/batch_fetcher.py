@@ -0,0 +1,90 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+import pandas as pd
+from config.settings import ResearchConfig
+from tools.market_data_source import MarketDataSource, get_default_data_source
+from utils.tracing import span, record_bytes, record_latency
+
+logger = logging.getLogger(__name__)
+
+
+class BatchFetchResult:
+    """Histories, info and per-symbol errors from one batch fetch"""
+
+    def __init__(self):
+        self.histories: Dict[str, pd.DataFrame] = {}
+        self.infos: Dict[str, Dict[str, Any]] = {}
+        self.errors: Dict[str, str] = {}
+        self.stats: Dict[str, Any] = {}
+
+
+class BatchFetcher:
+    """Fetch history in bulk and resolve info lookups in parallel for many symbols"""
+
+    def __init__(self, source: Optional[MarketDataSource] = None, max_workers: int = None):
+        self.source = source or get_default_data_source()
+        self.max_workers = max_workers or ResearchConfig.FETCH_MAX_WORKERS
+
+    def fetch(self, symbols: List[str], period: Optional[str] = None) -> BatchFetchResult:
+        symbols = list(dict.fromkeys(symbols))  # dedupe, keep order
+        with span("market_data.batch_fetch", source=self.source.name, symbols=len(symbols)) as current:
+            result = self._fetch(symbols, period or ResearchConfig.ANALYSIS_PERIOD)
+            current.set(**{k: v for k, v in result.stats.items() if k not in ("source", "symbols_requested")})
+            return result
+
+    def _fetch(self, symbols: List[str], period: str) -> BatchFetchResult:
+        result = BatchFetchResult()
+        start = time.perf_counter()
+        info_seconds: Dict[str, float] = {}
+
+        def fetch_info(symbol: str) -> Dict[str, Any]:
+            began = time.perf_counter()
+            try:
+                return self.source.fetch_info(symbol)
+            finally:
+                info_seconds[symbol] = time.perf_counter() - began
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            # Info lookups run in the background while the bulk history request is in flight
+            info_futures = {symbol: pool.submit(fetch_info, symbol) for symbol in symbols}
+
+            history_start = time.perf_counter()
+            try:
+                result.histories = self.source.fetch_history(symbols, period=period)
+            except Exception as e:
+                for symbol in symbols:
+                    result.errors[symbol] = f"Error fetching data for {symbol}: {str(e)}"
+            history_seconds = time.perf_counter() - history_start
+
+            for symbol, future in info_futures.items():
+                try:
+                    result.infos[symbol] = future.result() or {}
+                except Exception as e:
+                    result.errors.setdefault(symbol, f"Error fetching data for {symbol}: {str(e)}")
+
+        elapsed = time.perf_counter() - start
+        fetched = sum(1 for s in symbols if s in result.histories and s not in result.errors)
+        # OHLCV columns are 8-byte numbers; frame.memory_usage() costs ~0.7ms per frame at this scale
+        history_bytes = sum(frame.index.nbytes + 8 * frame.size for frame in result.histories.values())
+        record_bytes(f"market_data:{self.source.name}", history_bytes)
+        record_latency("market_data_history", history_seconds, source=self.source.name)
+        for seconds in info_seconds.values():
+            record_latency("market_data_info", seconds, source=self.source.name)
+        slowest = sorted(info_seconds.items(), key=lambda item: item[1], reverse=True)[:5]
+        result.stats = {
+            "source": self.source.name,
+            "symbols_requested": len(symbols),
+            "symbols_fetched": fetched,
+            "errors": len(result.errors),
+            "elapsed_seconds": round(elapsed, 3),
+            "symbols_per_second": round(len(symbols) / elapsed, 2) if elapsed > 0 else None,
+            "history_seconds": round(history_seconds, 3),
+            "history_bytes": history_bytes,
+            "slowest_info_ms": {symbol: round(seconds * 1000, 2) for symbol, seconds in slowest},
+        }
+        logger.info("Fetched %d/%d symbols from %s in %.2fs (%.1f symbols/s)",
+                    fetched, len(symbols), self.source.name, elapsed,
+                    result.stats["symbols_per_second"] or 0.0)
+        return result
@@ -0,0 +1,261 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from config.settings import ResearchConfig
+from tools.return_panel import ReturnPanel
+
+TRADING_DAYS = 252
+METHODS = ("sample", "ewma", "ledoit_wolf")
+
+
+def align_returns(returns: Union[ReturnPanel, pd.DataFrame],
+                  window: Optional[int] = None) -> Tuple[np.ndarray, List[str], Any]:
+    """Trailing window of dates on which every symbol has a return, as a float64 matrix (rows = days)
+
+    Symbols with no data in the window are dropped first so one short history doesn't empty
+    the whole matrix.
+    """
+    if isinstance(returns, ReturnPanel):
+        return returns.aligned(window)
+    if window:
+        returns = returns.iloc[-window:]
+    returns = returns.dropna(axis=1, how="all").dropna(axis=0, how="any")
+    end = returns.index[-1] if len(returns) else None
+    return returns.to_numpy(dtype=np.float64), [str(c) for c in returns.columns], end
+
+
+def sample_covariance(matrix: np.ndarray) -> np.ndarray:
+    centered = matrix - matrix.mean(axis=0)
+    return centered.T @ centered / (len(matrix) - 1)
+
+
+def ewma_covariance(matrix: np.ndarray, lam: float = None) -> np.ndarray:
+    """Exponentially weighted covariance (RiskMetrics-style decay, weights normalized to sum to 1)"""
+    lam = ResearchConfig.EWMA_LAMBDA if lam is None else lam
+    weights = lam ** np.arange(len(matrix) - 1, -1, -1, dtype=np.float64)
+    weights /= weights.sum()
+    centered = matrix - weights @ matrix
+    return (centered * weights[:, None]).T @ centered
+
+
+def ledoit_wolf_covariance(matrix: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Ledoit-Wolf (2004) shrinkage of the sample covariance toward a scaled identity
+
+    Returns the shrunk covariance and the shrinkage intensity in [0, 1].
+    """
+    n, p = matrix.shape
+    centered = matrix - matrix.mean(axis=0)
+    emp_cov = centered.T @ centered / n
+    mu = np.trace(emp_cov) / p
+
+    squared = centered ** 2
+    # pi: average squared deviation of x_t x_t' from the sample covariance, without the n x p x p tensor
+    pi = (squared.T @ squared).sum() / n - (emp_cov ** 2).sum()
+    gamma = ((emp_cov - mu * np.eye(p)) ** 2).sum()
+    shrinkage = 0.0 if gamma <= 0 else float(np.clip(pi / n / gamma, 0.0, 1.0))
+    return (1.0 - shrinkage) * emp_cov + shrinkage * mu * np.eye(p), shrinkage
+
+
+def correlation_from_covariance(cov: np.ndarray) -> np.ndarray:
+    std = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / np.outer(std, std)
+    corr[~np.isfinite(corr)] = 0.0
+    np.fill_diagonal(corr, 1.0)
+    return corr
+
+
+def portfolio_volatility(cov: np.ndarray, weights: np.ndarray, annualize: bool = True) -> np.ndarray:
+    """sqrt(w' Sigma w) for every row of a (portfolios x assets) weight matrix in one pass"""
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    variance = np.einsum("ij,jk,ik->i", weights, cov, weights)
+    vol = np.sqrt(np.clip(variance, 0.0, None))
+    return vol * np.sqrt(TRADING_DAYS) if annualize else vol
+
+
+class RollingCovariance:
+    """Windowed sample covariance maintained with rank-1 add/remove updates, O(n^2) per new day"""
+
+    def __init__(self, window: Optional[int], matrix: np.ndarray, resync_every: int = 256):
+        self.window = window
+        self.rows = deque(matrix)
+        self.total = matrix.sum(axis=0)
+        self.cross = matrix.T @ matrix
+        self.resync_every = resync_every
+        self.updates = 0
+
+    def push(self, row: np.ndarray):
+        self.rows.append(row)
+        self.total += row
+        self.cross += np.outer(row, row)
+        if self.window and len(self.rows) > self.window:
+            old = self.rows.popleft()
+            self.total -= old
+            self.cross -= np.outer(old, old)
+        self.updates += 1
+        if self.updates % self.resync_every == 0:
+            # Periodically rebuild the sums so floating-point drift can't accumulate
+            matrix = self.matrix()
+            self.total, self.cross = matrix.sum(axis=0), matrix.T @ matrix
+
+    @property
+    def observations(self) -> int:
+        return len(self.rows)
+
+    def matrix(self) -> np.ndarray:
+        return np.asarray(self.rows)
+
+    def covariance(self) -> np.ndarray:
+        n = len(self.rows)
+        return (self.cross - np.outer(self.total, self.total) / n) / (n - 1)
+
+
+class EWMACovarianceState:
+    """Recursive EWMA covariance: mean and covariance updated in O(n^2) per new day"""
+
+    def __init__(self, matrix: np.ndarray, lam: float = None):
+        self.lam = ResearchConfig.EWMA_LAMBDA if lam is None else lam
+        self.observations = len(matrix)
+        weights = self.lam ** np.arange(len(matrix) - 1, -1, -1, dtype=np.float64)
+        self.weight_sum = weights.sum()
+        self.mean = weights @ matrix / self.weight_sum
+        centered = matrix - self.mean
+        self.cov = (centered * weights[:, None]).T @ centered / self.weight_sum
+
+    def push(self, row: np.ndarray):
+        # Weighted (West) update of mean and covariance with old weights decayed by lambda
+        self.observations += 1
+        self.weight_sum = self.lam * self.weight_sum + 1.0
+        alpha = 1.0 / self.weight_sum
+        delta = row - self.mean
+        self.mean = self.mean + alpha * delta
+        self.cov = (1.0 - alpha) * (self.cov + alpha * np.outer(delta, delta))
+
+    def covariance(self) -> np.ndarray:
+        return self.cov
+
+
+class CovarianceEngine:
+    """Sample, EWMA and Ledoit-Wolf covariance of aligned returns with an LRU result cache
+
+    Results are cached on (symbols, window, last date, method). ``update`` advances every
+    tracked (symbols, window, method) state by one new day of returns without recomputing
+    from the full history. Only dated panels are tracked, and at most cache_size states are
+    kept (least recently used dropped first).
+    """
+
+    def __init__(self, cache_size: int = None):
+        self.cache_size = cache_size or ResearchConfig.COVARIANCE_CACHE_SIZE
+        self._cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._states: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def compute(self, returns: Union[ReturnPanel, pd.DataFrame], method: str = None, window: Optional[int] = -1,
+                as_of: Any = None) -> Dict[str, Any]:
+        """Covariance, correlation and metadata for a returns panel (columns = symbols)
+
+        window=-1 uses COVARIANCE_WINDOW; None uses the full aligned history. as_of replaces
+        the last date in the cache key, for panels without a meaningful date index.
+        """
+        method = method or ResearchConfig.COVARIANCE_METHOD
+        if method not in METHODS:
+            raise ValueError(f"Unknown covariance method '{method}', expected one of {METHODS}")
+        window = ResearchConfig.COVARIANCE_WINDOW if window == -1 else window
+
+        matrix, symbols, end = align_returns(returns, window)
+        if len(matrix) < 2:
+            raise ValueError("Need at least two aligned observations to estimate covariance")
+
+        end = end if as_of is None else as_of
+        key = (tuple(symbols), window, end, method)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+
+        result = self._estimate(matrix, symbols, end, method)
+        with self._lock:
+            self._store(key, result)
+        # Fingerprinted or undated panels can't be advanced by date, and must not replace a dated state
+        if as_of is None and isinstance(end, pd.Timestamp):
+            state = EWMACovarianceState(matrix) if method == "ewma" else RollingCovariance(window, matrix)
+            with self._lock:
+                state_key = (tuple(symbols), window, method)
+                self._states[state_key] = {"state": state, "end": end}
+                self._states.move_to_end(state_key)
+                while len(self._states) > self.cache_size:
+                    self._states.popitem(last=False)
+        return result
+
+    def update(self, row: pd.Series, date: Any) -> List[Dict[str, Any]]:
+        """Advance every tracked state whose symbols all appear in a new day of returns"""
+        updated = []
+        with self._lock:
+            states = list(self._states.items())
+        for (symbols, window, method), entry in states:
+            if entry["end"] is not None and date <= entry["end"]:
+                continue
+            values = row.reindex(list(symbols)).to_numpy(dtype=np.float64)
+            if not np.isfinite(values).all():
+                continue
+            state = entry["state"]
+            state.push(values)
+            entry["end"] = date
+            if method == "ledoit_wolf":
+                # Shrinkage intensity depends on fourth moments, so re-estimate it over the rolled window
+                result = self._estimate(state.matrix(), list(symbols), date, method)
+            else:
+                result = self._result(state.covariance(), list(symbols), date, method, state.observations)
+            with self._lock:
+                self._store((symbols, window, date, method), result)
+            updated.append(result)
+        return updated
+
+    def _estimate(self, matrix: np.ndarray, symbols: List[str], end: Any, method: str) -> Dict[str, Any]:
+        shrinkage = None
+        if method == "sample":
+            cov = sample_covariance(matrix)
+        elif method == "ewma":
+            cov = ewma_covariance(matrix)
+        else:
+            cov, shrinkage = ledoit_wolf_covariance(matrix)
+        return self._result(cov, symbols, end, method, len(matrix), shrinkage)
+
+    @staticmethod
+    def _result(cov: np.ndarray, symbols: List[str], end: Any, method: str,
+                observations: int, shrinkage: Optional[float] = None) -> Dict[str, Any]:
+        return {
+            "symbols": symbols,
+            "method": method,
+            "end_date": end,
+            "observations": observations,
+            "shrinkage": shrinkage,
+            "covariance": cov,
+            "correlation": correlation_from_covariance(cov),
+        }
+
+    def _store(self, key: tuple, result: Dict[str, Any]):
+        self._cache[key] = result
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._cache), "tracked": len(self._states), "hits": self.hits, "misses": self.misses}
+
+
+_shared_engine: Optional[CovarianceEngine] = None
+
+
+def get_covariance_engine() -> CovarianceEngine:
+    """Process-wide engine so repeated tool calls on the same panel reuse cached matrices"""
+    global _shared_engine
+    if _shared_engine is None:
+        _shared_engine = CovarianceEngine()
+    return _shared_engine
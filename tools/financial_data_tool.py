@@ -1,94 +1,161 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import json
-from langchain.tools import Tool
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from config.settings import ResearchConfig
+from tools.batch_fetcher import BatchFetcher, BatchFetchResult
+from tools.market_data_source import MarketDataSource
+from tools.metrics_engine import RiskMetricsEngine, MetricsTable, stack_columns
+from tools.return_panel import ReturnPanel, share_panel
+from tools.rolling_analytics import compute_rolling_metrics
+from utils.tracing import span, traced
 
 class FinancialDataTool:
     @staticmethod
-    def fetch_stock_data(symbols: List[str]) -> Dict[str, Any]:
+    @traced("tool.fetch_stock_data")
+    def fetch_stock_data(symbols: List[str], data_source: Optional[MarketDataSource] = None) -> Dict[str, Any]:
         """Fetch comprehensive stock data for research"""
+        batch = BatchFetcher(data_source).fetch(symbols)
+        return FinancialDataTool._research_data_from_batch(symbols, batch)
+    
+    @staticmethod
+    @traced("tool.fetch_market_snapshot")
+    def fetch_market_snapshot(symbols: List[str],
+                              data_source: Optional[MarketDataSource] = None) -> Tuple[Dict[str, Any], ReturnPanel]:
+        """Research data plus a date-aligned daily returns panel (float32, columns = symbols) from one batch fetch"""
+        batch = BatchFetcher(data_source).fetch(symbols)
+        research_data = FinancialDataTool._research_data_from_batch(symbols, batch)
+        histories = {s: batch.histories[s] for s in symbols if "error" not in research_data[s]}
+        return research_data, FinancialDataTool.build_returns_panel(histories)
+    
+    @staticmethod
+    def share_market_snapshot(symbols: List[str], data_source: Optional[MarketDataSource] = None,
+                              mode: str = None) -> Tuple[Dict[str, Any], str]:
+        """fetch_market_snapshot with the returns panel placed in shared memory (or a memmap file) for workers
+
+        Returns the research data and the panel handle, which RiskCalculator jobs and the risk
+        calculator tool attach to; release_panel(handle) frees the storage.
+        """
+        research_data, panel = FinancialDataTool.fetch_market_snapshot(symbols, data_source)
+        return research_data, share_panel(panel, mode)
+    
+    @staticmethod
+    def build_returns_panel(histories: Dict[str, pd.DataFrame]) -> ReturnPanel:
+        """Align close prices on calendar dates and convert them to simple daily returns"""
+        return ReturnPanel.from_histories(histories)
+    
+    @staticmethod
+    def _research_data_from_batch(symbols: List[str], batch: BatchFetchResult) -> Dict[str, Any]:
         research_data = {}
         
+        available = []
         for symbol in symbols:
+            hist_data = batch.histories.get(symbol)
+            if symbol in batch.errors:
+                research_data[symbol] = {"error": batch.errors[symbol]}
+            elif hist_data is None or hist_data.empty:
+                research_data[symbol] = {"error": f"No data available for {symbol}"}
+            else:
+                available.append(symbol)
+        
+        # Bad frames (missing or non-numeric Close/Volume) fail alone, as they did when each symbol
+        # was computed separately; the rest go through the engine in one vectorized pass
+        columns = {}
+        for symbol in list(available):
             try:
-                ticker = yf.Ticker(symbol)
-                
-                # Get historical data
-                hist_data = ticker.history(period=ResearchConfig.ANALYSIS_PERIOD)
-                info = ticker.info
-                
-                if hist_data.empty:
-                    research_data[symbol] = {"error": f"No data available for {symbol}"}
-                    continue
-                
-                # Calculate research metrics
-                returns = hist_data['Close'].pct_change().dropna()
-                
-                research_data[symbol] = {
-                    "basic_info": {
-                        "company_name": info.get('longName', symbol),
-                        "sector": info.get('sector', 'Unknown'),
-                        "market_cap": info.get('marketCap', 'N/A'),
-                        "current_price": round(hist_data['Close'].iloc[-1], 2)
-                    },
-                    "risk_metrics": {
-                        "daily_volatility": round(returns.std(), 6),
-                        "annualized_volatility": round(returns.std() * np.sqrt(252), 4),
-                        "beta": info.get('beta', 'N/A'),
-                        "sharpe_ratio": FinancialDataTool._calculate_sharpe_ratio(returns),
-                        "max_drawdown": FinancialDataTool._calculate_max_drawdown(hist_data['Close'])
-                    },
-                    "performance_metrics": {
-                        "total_return_2y": round(((hist_data['Close'].iloc[-1] / hist_data['Close'].iloc[0]) - 1) * 100, 2),
-                        "avg_daily_return": round(returns.mean(), 6),
-                        "avg_volume": int(hist_data['Volume'].mean()),
-                        "price_range_52w": {
-                            "high": round(hist_data['Close'].max(), 2),
-                            "low": round(hist_data['Close'].min(), 2)
-                        }
-                    },
-                    "statistical_data": {
-                        "skewness": round(returns.skew(), 4),
-                        "kurtosis": round(returns.kurtosis(), 4),
-                        "data_points": len(hist_data),
-                        "analysis_period": ResearchConfig.ANALYSIS_PERIOD
-                    }
-                }
-                
+                columns[symbol] = FinancialDataTool._price_columns(batch.histories[symbol])
+            except Exception as e:
+                research_data[symbol] = {"error": f"Error fetching data for {symbol}: {str(e)}"}
+                available.remove(symbol)
+        metrics = FinancialDataTool._metrics_from_columns(columns)
+        
+        for symbol in available:
+            try:
+                research_data[symbol] = FinancialDataTool._build_research_record(
+                    symbol, metrics.row(symbol), batch.infos.get(symbol, {}), len(batch.histories[symbol])
+                )
             except Exception as e:
                 research_data[symbol] = {"error": f"Error fetching data for {symbol}: {str(e)}"}
         
-        return research_data
+        return {symbol: research_data[symbol] for symbol in symbols}
     
     @staticmethod
-    def _calculate_sharpe_ratio(returns: pd.Series) -> float:
-        """Calculate Sharpe ratio for research"""
-        if len(returns) == 0:
-            return 0.0
+    def fetch_rolling_metrics(symbols: List[str], benchmark: Optional[str] = None,
+                              data_source: Optional[MarketDataSource] = None) -> Dict[str, pd.DataFrame]:
+        """Rolling volatility, Sharpe, beta, VaR and drawdown time series per symbol"""
+        benchmark = benchmark or ResearchConfig.ROLLING_BENCHMARK
+        batch = BatchFetcher(data_source).fetch(list(symbols) + [benchmark])
+        benchmark_hist = batch.histories.get(benchmark)
+        benchmark_close = benchmark_hist['Close'] if benchmark_hist is not None else None
         
-        excess_returns = returns - (ResearchConfig.RISK_FREE_RATE / 252)  # Daily risk-free rate
-        if excess_returns.std() == 0:
-            return 0.0
-        
-        sharpe = (excess_returns.mean() / excess_returns.std()) * np.sqrt(252)
-        return round(sharpe, 4)
+        rolling = {}
+        for symbol in symbols:
+            hist_data = batch.histories.get(symbol)
+            if hist_data is None or hist_data.empty:
+                continue
+            rolling[symbol] = compute_rolling_metrics(hist_data['Close'], benchmark_close)
+        return rolling
+    
+    @staticmethod
+    def compute_metrics_table(histories: Dict[str, pd.DataFrame]) -> MetricsTable:
+        """Risk and performance metrics for many OHLCV histories via RiskMetricsEngine"""
+        return FinancialDataTool._metrics_from_columns(
+            {symbol: FinancialDataTool._price_columns(hist) for symbol, hist in histories.items()}
+        )
+    
+    @staticmethod
+    def _price_columns(hist_data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Close and Volume as float64 arrays; raises for missing or non-numeric columns"""
+        return hist_data['Close'].to_numpy(dtype=np.float64), hist_data['Volume'].to_numpy(dtype=np.float64)
     
     @staticmethod
-    def _calculate_max_drawdown(prices: pd.Series) -> float:
-        """Calculate maximum drawdown"""
-        peak = prices.cummax()
-        drawdown = (prices - peak) / peak
-        max_drawdown = drawdown.min()
-        return round(max_drawdown, 4)
+    def _metrics_from_columns(columns: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> MetricsTable:
+        closes = stack_columns([close for close, _ in columns.values()])
+        volumes = stack_columns([volume for _, volume in columns.values()])
+        return RiskMetricsEngine.from_prices(closes, list(columns), volumes=volumes)
+    
+    @staticmethod
+    def _build_research_record(symbol: str, metrics: Dict[str, float], info: Dict[str, Any],
+                               data_points: int) -> Dict[str, Any]:
+        """Shape one symbol's engine metrics into the research data layout"""
+        return {
+            "basic_info": {
+                "company_name": info.get('longName', symbol),
+                "sector": info.get('sector', 'Unknown'),
+                "market_cap": info.get('marketCap', 'N/A'),
+                "current_price": round(metrics["current_price"], 2)
+            },
+            "risk_metrics": {
+                "daily_volatility": round(metrics["daily_volatility"], 6),
+                "annualized_volatility": round(metrics["annualized_volatility"], 4),
+                "beta": info.get('beta', 'N/A'),
+                "sharpe_ratio": round(metrics["sharpe_ratio"], 4),
+                "max_drawdown": round(metrics["max_drawdown"], 4)
+            },
+            "performance_metrics": {
+                "total_return_2y": round(metrics["total_return"] * 100, 2),
+                "avg_daily_return": round(metrics["avg_daily_return"], 6),
+                "avg_volume": int(metrics["avg_volume"]),
+                "price_range_52w": {
+                    "high": round(metrics["price_high"], 2),
+                    "low": round(metrics["price_low"], 2)
+                }
+            },
+            "statistical_data": {
+                "skewness": round(metrics["skewness"], 4),
+                "kurtosis": round(metrics["kurtosis"], 4),
+                "data_points": data_points,
+                "analysis_period": ResearchConfig.ANALYSIS_PERIOD
+            }
+        }
 
 def create_financial_data_tool():
+    from langchain.tools import Tool  # deferred: LangChain is slow to import and only agents need it
     def financial_data_wrapper(symbols_str: str) -> str:
         symbols = [s.strip().upper() for s in symbols_str.split(',')]
-        data = FinancialDataTool.fetch_stock_data(symbols)
-        return json.dumps(data, indent=2)  # LLM-friendly JSON output
+        with span("tool_call.financial_data_research", symbols=len(symbols)):
+            data = FinancialDataTool.fetch_stock_data(symbols)
+            return json.dumps(data, indent=2)  # LLM-friendly JSON output
     
     return Tool(
         name="financial_data_research",
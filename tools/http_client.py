@@ -0,0 +1,158 @@
+import time
+import random
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from config.settings import ResearchConfig
+from utils.tracing import record_bytes, record_latency
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: sustained `rate` requests per second with bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a token is available; returns the time spent waiting"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return waited
+                delay = (1.0 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class HTTPResponseError(Exception):
+    """Non-retryable HTTP status, or a retryable one that exhausted its retries"""
+
+    def __init__(self, status_code: int, body: str):
+        super().__init__(f"HTTP {status_code}: {body[:200]}")
+        self.status_code = status_code
+
+
+class PooledHTTPClient:
+    """Keep-alive requests.Session with rate limiting, retries with jittered backoff and latency stats"""
+
+    def __init__(self, pool_size: int = None, timeout: float = None, max_retries: int = None,
+                 rate_per_second: float = None, burst: int = None,
+                 backoff_base: float = None, backoff_max: float = None, latency_window: int = 1000):
+        self.timeout = timeout or ResearchConfig.HTTP_TIMEOUT_SECONDS
+        self.max_retries = ResearchConfig.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base or ResearchConfig.HTTP_BACKOFF_BASE_SECONDS
+        self.backoff_max = backoff_max or ResearchConfig.HTTP_BACKOFF_MAX_SECONDS
+        self.bucket = TokenBucket(rate_per_second or ResearchConfig.SEARCH_RATE_PER_SECOND,
+                                  burst or ResearchConfig.SEARCH_BURST)
+
+        pool_size = pool_size or ResearchConfig.HTTP_POOL_SIZE
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.latencies = deque(maxlen=latency_window)
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def post_json(self, url: str, payload: Dict[str, Any], headers: Dict[str, str] = None) -> Dict[str, Any]:
+        """POST a JSON payload and return the decoded body plus latency and attempt count
+
+        Connection errors, timeouts, 429 and 5xx responses are retried with exponential
+        backoff and full jitter (honouring Retry-After); other statuses raise immediately.
+        """
+        start = time.perf_counter()
+        rate_wait = 0.0
+        for attempt in range(self.max_retries + 1):
+            rate_wait += self.bucket.acquire()
+            try:
+                response = self.session.post(url, json=payload, headers=headers, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUSES:
+                    if response.status_code >= 400:
+                        raise HTTPResponseError(response.status_code, response.text)
+                    return self._record(start, attempt, rate_wait, response.json(), len(response.content))
+                error = HTTPResponseError(response.status_code, response.text)
+                retry_after = response.headers.get("Retry-After")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, retry_after = e, None
+            except HTTPResponseError:
+                self._record_failure(start, attempt)
+                raise
+
+            if attempt == self.max_retries:
+                break
+            with self._lock:
+                self.retries += 1
+            time.sleep(self._backoff(attempt, retry_after))
+
+        self._record_failure(start, self.max_retries)
+        raise error
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _record(self, start: float, attempt: int, rate_wait: float, body: Dict[str, Any],
+                size: int = 0) -> Dict[str, Any]:
+        latency = time.perf_counter() - start
+        record_bytes("http", size)
+        record_latency("http_post", latency, outcome="ok")
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(latency)
+        return {"body": body, "latency_ms": round(latency * 1000, 2), "attempts": attempt + 1,
+                "rate_limited_ms": round(rate_wait * 1000, 2)}
+
+    def _record_failure(self, start: float, attempt: int):
+        record_latency("http_post", time.perf_counter() - start, outcome="error")
+        with self._lock:
+            self.requests += 1
+            self.failures += 1
+            self.latencies.append(time.perf_counter() - start)
+
+    def latency_stats(self) -> Dict[str, Any]:
+        """Request counts and p50/p90/p99 latency over the recent window"""
+        with self._lock:
+            latencies = np.array(self.latencies, dtype=np.float64) * 1000
+            stats = {"requests": self.requests, "retries": self.retries, "failures": self.failures}
+        if latencies.size:
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            stats.update({"p50_ms": round(float(p50), 2), "p90_ms": round(float(p90), 2),
+                          "p99_ms": round(float(p99), 2), "max_ms": round(float(latencies.max()), 2)})
+        return stats
+
+    def close(self):
+        self.session.close()
+
+
+_shared_client: Optional[PooledHTTPClient] = None
+_shared_lock = threading.Lock()
+
+
+def get_http_client() -> PooledHTTPClient:
+    """Process-wide pooled client shared by every research search tool"""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = PooledHTTPClient()
+        return _shared_client
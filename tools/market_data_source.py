@@ -0,0 +1,202 @@
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+import pandas as pd
+from config.settings import ResearchConfig
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+class MarketDataSource:
+    """Pluggable provider of price history and company info for FinancialDataTool"""
+
+    name = "base"
+
+    def fetch_history(self, symbols: List[str], period: Optional[str] = None,
+                      start: Optional[str] = None, interval: str = "1d") -> Dict[str, pd.DataFrame]:
+        """Return OHLCV history per symbol; symbols without data may be omitted"""
+        raise NotImplementedError
+
+    def fetch_info(self, symbol: str) -> Dict[str, Any]:
+        """Return company info (longName, sector, marketCap, beta, ...) for one symbol"""
+        raise NotImplementedError
+
+
+class YFinanceDataSource(MarketDataSource):
+    """Yahoo Finance provider using bulk downloads with a bounded per-host connection limit"""
+
+    name = "yfinance"
+
+    def __init__(self, batch_size: int = None, max_per_host: int = None):
+        self.batch_size = batch_size or ResearchConfig.FETCH_BATCH_SIZE
+        self._host_slots = threading.BoundedSemaphore(max_per_host or ResearchConfig.FETCH_MAX_PER_HOST)
+
+    def fetch_history(self, symbols: List[str], period: Optional[str] = None,
+                      start: Optional[str] = None, interval: str = "1d") -> Dict[str, pd.DataFrame]:
+        histories = {}
+        for i in range(0, len(symbols), self.batch_size):
+            chunk = symbols[i:i + self.batch_size]
+            try:
+                histories.update(self._download_chunk(chunk, period, start, interval))
+            except Exception:
+                # Bulk request failed as a whole - fall back to isolated per-symbol requests
+                histories.update(self._fetch_individually(chunk, period, start, interval))
+        return histories
+
+    def fetch_info(self, symbol: str) -> Dict[str, Any]:
+        import yfinance as yf
+        with self._host_slots:
+            return yf.Ticker(symbol).info or {}
+
+    def _download_chunk(self, symbols: List[str], period: Optional[str], start: Optional[str],
+                        interval: str) -> Dict[str, pd.DataFrame]:
+        import yfinance as yf
+        kwargs = {"start": start} if start else {"period": period or ResearchConfig.ANALYSIS_PERIOD}
+        with self._host_slots:
+            frame = yf.download(
+                symbols, interval=interval, group_by="ticker", auto_adjust=True,
+                threads=True, progress=False, **kwargs
+            )
+
+        histories = {}
+        if frame is None or frame.empty:
+            return histories
+
+        for symbol in symbols:
+            if isinstance(frame.columns, pd.MultiIndex):
+                if symbol not in frame.columns.get_level_values(0):
+                    continue
+                hist = frame[symbol]
+            else:
+                hist = frame
+            hist = hist[[c for c in OHLCV_COLUMNS if c in hist.columns]].dropna(how="all")
+            if not hist.empty:
+                histories[symbol] = hist
+        return histories
+
+    def _fetch_individually(self, symbols: List[str], period: Optional[str], start: Optional[str],
+                            interval: str) -> Dict[str, pd.DataFrame]:
+        import yfinance as yf
+        kwargs = {"start": start} if start else {"period": period or ResearchConfig.ANALYSIS_PERIOD}
+
+        def fetch_one(symbol: str) -> pd.DataFrame:
+            with self._host_slots:
+                return yf.Ticker(symbol).history(interval=interval, **kwargs)
+
+        histories = {}
+        with ThreadPoolExecutor(max_workers=ResearchConfig.FETCH_MAX_WORKERS) as pool:
+            futures = {symbol: pool.submit(fetch_one, symbol) for symbol in symbols}
+            for symbol, future in futures.items():
+                try:
+                    hist = future.result()
+                except Exception:
+                    continue
+                if hist is not None and not hist.empty:
+                    histories[symbol] = hist
+        return histories
+
+
+class MemoizedDataSource(MarketDataSource):
+    """Thread-safe in-memory memo over another source so overlapping requests fetch each symbol once
+
+    Used by batch runs: the union of all studies' symbols is prefetched once and every later
+    request for those symbols (from any study or worker) is served from memory.
+    """
+
+    def __init__(self, source: MarketDataSource):
+        self.source = source
+        self.name = f"memoized:{source.name}"
+        self._histories: Dict[tuple, Optional[pd.DataFrame]] = {}
+        self._infos: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def fetch_history(self, symbols: List[str], period: Optional[str] = None,
+                      start: Optional[str] = None, interval: str = "1d") -> Dict[str, pd.DataFrame]:
+        window = (period or ResearchConfig.ANALYSIS_PERIOD, start, interval)
+        symbols = list(dict.fromkeys(symbols))
+        with self._lock:
+            missing = [s for s in symbols if (s,) + window not in self._histories]
+            self.hits += len(symbols) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            fetched = self.source.fetch_history(missing, period=period, start=start, interval=interval)
+            with self._lock:
+                for symbol in missing:
+                    # None records "no data" so failed symbols are not refetched either
+                    self._histories[(symbol,) + window] = fetched.get(symbol)
+
+        with self._lock:
+            entries = {s: self._histories.get((s,) + window) for s in symbols}
+        return {s: hist for s, hist in entries.items() if hist is not None}
+
+    def fetch_info(self, symbol: str) -> Dict[str, Any]:
+        with self._lock:
+            if symbol in self._infos:
+                self.hits += 1
+                return self._infos[symbol]
+            self.misses += 1
+        info = self.source.fetch_info(symbol)
+        with self._lock:
+            self._infos[symbol] = info
+        return info
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_default_source: Optional[MarketDataSource] = None
+# Per-study memo installed by memoized_study_source; a context variable, so concurrent studies
+# (batch threads, app sessions) each see their own
+_study_source: contextvars.ContextVar = contextvars.ContextVar("study_data_source", default=None)
+
+
+def get_default_data_source() -> MarketDataSource:
+    """Return the data source used when none is passed explicitly: the current study's memo, if
+    one is active, else the process-wide source"""
+    global _default_source
+    study_source = _study_source.get()
+    if study_source is not None:
+        return study_source
+    if _default_source is None:
+        _default_source = YFinanceDataSource()
+        if ResearchConfig.PRICE_CACHE_ENABLED:
+            from tools.price_cache import CachedDataSource
+            _default_source = CachedDataSource(_default_source)
+    return _default_source
+
+
+def set_default_data_source(source: Optional[MarketDataSource]):
+    """Swap the process-wide data source (e.g. a local fake provider for offline runs)"""
+    global _default_source
+    _default_source = source
+
+
+@contextmanager
+def memoized_study_source():
+    """Serve every default-source request in this context from one MemoizedDataSource
+
+    A study fetches its universe more than once (the agent's data tool, then the market
+    snapshot); the price cache only covers histories, so without the memo each fetch repeats
+    every company info lookup. Work handed to threads with the context (asyncio tasks,
+    bind_context) shares the memo. Already-memoized sources (batch runs) are used as they are.
+    """
+    source = get_default_data_source()
+    if isinstance(source, MemoizedDataSource):
+        yield source
+        return
+    memo = MemoizedDataSource(source)
+    token = _study_source.set(memo)
+    try:
+        yield memo
+    finally:
+        _study_source.reset(token)
@@ -0,0 +1,155 @@
+import warnings
+import numpy as np
+from typing import Dict, List, Optional
+from config.settings import ResearchConfig
+
+TRADING_DAYS = 252
+
+
+class MetricsTable:
+    """Columnar risk metrics: one float64 array per metric, aligned with symbols"""
+
+    def __init__(self, symbols: List[str], columns: Dict[str, np.ndarray]):
+        self.symbols = list(symbols)
+        self.columns = columns
+        self._positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __getitem__(self, metric: str) -> np.ndarray:
+        return self.columns[metric]
+
+    def row(self, symbol: str) -> Dict[str, float]:
+        i = self._positions[symbol]
+        return {metric: float(values[i]) for metric, values in self.columns.items()}
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        return {symbol: self.row(symbol) for symbol in self.symbols}
+
+
+def stack_columns(series: List[np.ndarray]) -> np.ndarray:
+    """Stack 1-D histories of different lengths into a T x N matrix, bottom-aligned and NaN-padded
+
+    Each column keeps its own consecutive bars, so per-column statistics match the per-Series
+    results exactly; use a date-aligned panel instead for cross-sectional work.
+    """
+    length = max((len(s) for s in series), default=0)
+    matrix = np.full((length, len(series)), np.nan)
+    for j, values in enumerate(series):
+        if len(values):
+            matrix[length - len(values):, j] = values
+    return matrix
+
+
+class RiskMetricsEngine:
+    """Vectorized per-column risk metrics over a T x N price or returns matrix (NaN = missing)"""
+
+    @staticmethod
+    def from_prices(prices: np.ndarray, symbols: List[str],
+                    volumes: Optional[np.ndarray] = None,
+                    risk_free_rate: float = None) -> MetricsTable:
+        prices = np.asarray(prices, dtype=np.float64)
+        if prices.ndim == 1:
+            prices = prices[:, None]
+
+        returns = prices[1:] / prices[:-1] - 1.0
+        columns = RiskMetricsEngine._return_stats(returns, risk_free_rate)
+
+        valid = ~np.isnan(prices)
+        counts = valid.sum(axis=0)
+        first_price = RiskMetricsEngine._edge_values(prices, valid, counts, last=False)
+        last_price = RiskMetricsEngine._edge_values(prices, valid, counts, last=True)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            peak = np.fmax.accumulate(prices, axis=0)
+            drawdown = prices / peak - 1.0
+            columns["max_drawdown"] = RiskMetricsEngine._nan_reduce(np.nanmin, drawdown)
+            columns["current_price"] = last_price
+            columns["total_return"] = last_price / first_price - 1.0
+            columns["price_high"] = RiskMetricsEngine._nan_reduce(np.nanmax, prices)
+            columns["price_low"] = RiskMetricsEngine._nan_reduce(np.nanmin, prices)
+            columns["data_points"] = counts.astype(np.float64)
+            if volumes is not None:
+                columns["avg_volume"] = RiskMetricsEngine._nan_reduce(np.nanmean, np.asarray(volumes, dtype=np.float64))
+
+        return MetricsTable(symbols, columns)
+
+    @staticmethod
+    def from_returns(returns: np.ndarray, symbols: List[str],
+                     risk_free_rate: float = None) -> MetricsTable:
+        returns = np.asarray(returns, dtype=np.float64)
+        if returns.ndim == 1:
+            returns = returns[:, None]
+
+        columns = RiskMetricsEngine._return_stats(returns, risk_free_rate)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            wealth = np.cumprod(np.where(np.isnan(returns), 0.0, returns) + 1.0, axis=0)
+            wealth[np.isnan(returns)] = np.nan
+            drawdown = wealth / np.fmax.accumulate(wealth, axis=0) - 1.0
+            # Losses on the first bar count against the starting wealth of 1
+            drawdown = np.minimum(drawdown, wealth - 1.0)
+            columns["max_drawdown"] = RiskMetricsEngine._nan_reduce(np.nanmin, drawdown)
+            columns["total_return"] = RiskMetricsEngine._nan_reduce(np.nanprod, returns + 1.0) - 1.0
+        return MetricsTable(symbols, columns)
+
+    @staticmethod
+    def _return_stats(returns: np.ndarray, risk_free_rate: float = None) -> Dict[str, np.ndarray]:
+        """Mean, volatility, Sharpe, skewness and excess kurtosis with pandas' bias corrections"""
+        if risk_free_rate is None:
+            risk_free_rate = ResearchConfig.RISK_FREE_RATE
+
+        valid = ~np.isnan(returns)
+        n = valid.sum(axis=0).astype(np.float64)
+        filled = np.where(valid, returns, 0.0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = filled.sum(axis=0) / n
+            centered = np.where(valid, returns - mean, 0.0)
+            sq = centered * centered
+            m2 = sq.sum(axis=0)
+            m3 = (sq * centered).sum(axis=0)
+            m4 = (sq * sq).sum(axis=0)
+
+            std = np.where(n > 1, np.sqrt(m2 / (n - 1)), np.nan)
+            excess_mean = mean - risk_free_rate / TRADING_DAYS
+            sharpe = np.where((n > 0) & (std > 0), excess_mean / std * np.sqrt(TRADING_DAYS), 0.0)
+
+            biased_var = m2 / n
+            skew = np.sqrt(n * (n - 1)) / (n - 2) * (m3 / n) / biased_var ** 1.5
+            skew = np.where(n < 3, np.nan, np.where(biased_var > 0, skew, 0.0))
+
+            kurt = ((n + 1) * n * (n - 1) * m4) / ((n - 2) * (n - 3) * m2 * m2) \
+                - 3.0 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+            kurt = np.where(n < 4, np.nan, np.where(m2 > 0, kurt, 0.0))
+
+        return {
+            "observations": n,
+            "avg_daily_return": mean,
+            "daily_volatility": std,
+            "annualized_volatility": std * np.sqrt(TRADING_DAYS),
+            "sharpe_ratio": sharpe,
+            "skewness": skew,
+            "kurtosis": kurt,
+        }
+
+    @staticmethod
+    def _edge_values(matrix: np.ndarray, valid: np.ndarray, counts: np.ndarray, last: bool) -> np.ndarray:
+        """First or last non-missing value of every column"""
+        if matrix.shape[0] == 0:
+            return np.full(matrix.shape[1], np.nan)
+        if last:
+            idx = matrix.shape[0] - 1 - np.argmax(valid[::-1], axis=0)
+        else:
+            idx = np.argmax(valid, axis=0)
+        values = matrix[idx, np.arange(matrix.shape[1])]
+        return np.where(counts > 0, values, np.nan)
+
+    @staticmethod
+    def _nan_reduce(func, matrix: np.ndarray) -> np.ndarray:
+        """Column reduction that yields NaN for all-missing columns without warnings"""
+        if matrix.shape[0] == 0:
+            return np.full(matrix.shape[1], np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return func(matrix, axis=0)
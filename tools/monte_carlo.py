@@ -0,0 +1,166 @@
+import math
+import time
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from config.settings import ResearchConfig
+from utils.process_pool import pool_map
+
+METHODS = ("normal", "student_t", "bootstrap")
+
+
+def _simulate_chunks(task: Tuple[Dict[str, Any], List[Tuple[int, np.random.SeedSequence]]]) -> List[Tuple]:
+    """Simulate a contiguous group of chunks; the state is shipped once per group, not per chunk"""
+    state, chunks = task
+    return [_simulate_chunk(state, size, seed_seq) for size, seed_seq in chunks]
+
+
+def _simulate_chunk(state: Dict[str, Any], size: int,
+                    seed_seq: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Generate one chunk of asset scenarios and reduce it to each portfolio's worst outcomes and moments"""
+    rng = np.random.default_rng(seed_seq)
+    weights = state["weights"]  # assets x portfolios
+    method = state["method"]
+
+    if method == "bootstrap":
+        history = state["returns"]
+        scenarios = history[rng.integers(0, history.shape[0], size=size)]
+    else:
+        scenarios = rng.standard_normal((size, state["chol"].shape[0]))
+        scenarios = scenarios @ state["chol"].T
+        if method == "student_t":
+            dof = state["dof"]
+            scenarios *= np.sqrt((dof - 2.0) / rng.chisquare(dof, size=size))[:, None]
+        scenarios += state["mean"]
+
+    outcomes = scenarios @ weights  # paths x portfolios
+    del scenarios
+
+    tail_size = min(state["tail_size"], size)
+    tail = np.partition(outcomes, tail_size - 1, axis=0)[:tail_size]
+    return tail, outcomes.sum(axis=0), np.square(outcomes).sum(axis=0)
+
+
+class MonteCarloVaR:
+    """Chunked, seeded Monte Carlo VaR/CVaR for portfolios of assets described by a returns matrix
+
+    Scenarios are streamed in fixed-size chunks; each chunk is reduced to the worst outcomes
+    needed for the lowest confidence level plus running moments, so memory stays bounded by
+    the chunk size regardless of the number of paths. Chunk i always uses the i-th child of
+    the root seed, so results do not depend on the number of workers.
+    """
+
+    def __init__(self, returns_matrix: np.ndarray, weights: np.ndarray, method: str = "normal",
+                 dof: float = None):
+        if method not in METHODS:
+            raise ValueError(f"Unknown Monte Carlo method '{method}', expected one of {METHODS}")
+
+        returns_matrix = np.asarray(returns_matrix, dtype=np.float64)
+        if returns_matrix.ndim == 1:
+            returns_matrix = returns_matrix[:, None]
+        weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+        if weights.shape[1] != returns_matrix.shape[1]:
+            raise ValueError("Weights do not match the number of assets in the returns matrix")
+
+        self.method = method
+        self.returns_matrix = returns_matrix
+        self.weights = weights.T.copy()  # assets x portfolios
+        self.dof = dof or ResearchConfig.MC_T_DEGREES_OF_FREEDOM
+        if method == "student_t" and self.dof <= 2:
+            raise ValueError("Student-t scenarios need more than 2 degrees of freedom")
+
+    def _state(self, tail_size: int) -> Dict[str, Any]:
+        state = {"method": self.method, "weights": self.weights, "tail_size": tail_size, "dof": self.dof}
+        if self.method == "bootstrap":
+            state["returns"] = self.returns_matrix
+        else:
+            state["mean"] = self.returns_matrix.mean(axis=0)
+            state["chol"] = self._covariance_factor(np.atleast_2d(np.cov(self.returns_matrix, rowvar=False)))
+        return state
+
+    @staticmethod
+    def _covariance_factor(cov: np.ndarray) -> np.ndarray:
+        """Cholesky factor, falling back to an eigen-decomposition for singular covariance"""
+        try:
+            return np.linalg.cholesky(cov)
+        except np.linalg.LinAlgError:
+            eigvals, eigvecs = np.linalg.eigh(cov)
+            return eigvecs * np.sqrt(np.clip(eigvals, 0.0, None))
+
+    def _chunk_size(self, requested: Optional[int]) -> int:
+        assets = self.returns_matrix.shape[1]
+        byte_cap = ResearchConfig.MC_MAX_CHUNK_MB * 1024 * 1024 // (8 * max(assets, 1))
+        return max(1, min(requested or ResearchConfig.MC_CHUNK_SIZE, byte_cap))
+
+    def run(self, n_paths: int = None, confidence_levels: List[float] = None, seed: int = None,
+            chunk_size: int = None, workers: int = None) -> Dict[str, Any]:
+        n_paths = int(n_paths or ResearchConfig.MC_DEFAULT_PATHS)
+        confidence_levels = list(confidence_levels or ResearchConfig.CONFIDENCE_LEVELS)
+        workers = max(1, int(workers or ResearchConfig.MC_MAX_WORKERS))
+        chunk_size = self._chunk_size(chunk_size)
+        tail_probs = 1.0 - np.asarray(confidence_levels, dtype=np.float64)
+
+        # Enough order statistics to interpolate the deepest quantile requested
+        tail_size = min(n_paths, int(math.floor((n_paths - 1) * tail_probs.max())) + 2)
+
+        sizes = [chunk_size] * (n_paths // chunk_size)
+        if n_paths % chunk_size:
+            sizes.append(n_paths % chunk_size)
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        tasks = list(zip(sizes, seeds))
+        state = self._state(tail_size)
+
+        start = time.perf_counter()
+        portfolios = self.weights.shape[1]
+        tail = np.empty((0, portfolios))
+        total = np.zeros(portfolios)
+        total_sq = np.zeros(portfolios)
+
+        workers = min(workers, len(tasks))
+        if workers == 1:
+            results = (_simulate_chunk(state, size, seed_seq) for size, seed_seq in tasks)
+        else:
+            # Contiguous groups on the shared pool; results still arrive in chunk order
+            step = -(-len(tasks) // workers)
+            groups = [(state, tasks[i:i + step]) for i in range(0, len(tasks), step)]
+            results = (chunk for group in pool_map(_simulate_chunks, groups, workers) for chunk in group)
+
+        for chunk_tail, chunk_sum, chunk_sq in results:
+            tail = np.concatenate([tail, chunk_tail])
+            if tail.shape[0] > tail_size:
+                tail = np.partition(tail, tail_size - 1, axis=0)[:tail_size]
+            total += chunk_sum
+            total_sq += chunk_sq
+
+        elapsed = time.perf_counter() - start
+        tail.sort(axis=0)
+
+        position = (n_paths - 1) * tail_probs
+        lower = np.floor(position).astype(int)
+        upper = np.minimum(np.ceil(position).astype(int), tail.shape[0] - 1)
+        var = tail[lower] + (position - lower)[:, None] * (tail[upper] - tail[lower])  # levels x portfolios
+
+        cumulative = np.cumsum(tail, axis=0)
+        columns = np.arange(portfolios)
+        cvar = np.empty_like(var)
+        for i in range(len(tail_probs)):
+            tail_count = np.maximum((tail <= var[i]).sum(axis=0), 1)
+            cvar[i] = cumulative[tail_count - 1, columns] / tail_count
+
+        mean = total / n_paths
+        std = np.sqrt(np.maximum(total_sq / n_paths - mean ** 2, 0.0))
+
+        return {
+            "method": self.method,
+            "n_paths": n_paths,
+            "chunk_size": chunk_size,
+            "chunks": len(tasks),
+            "workers": workers,
+            "seed": seed,
+            "confidence_levels": confidence_levels,
+            "VaR_monte_carlo": var.T,
+            "CVaR_monte_carlo": cvar.T,
+            "simulated_mean": mean,
+            "simulated_std": std,
+            "elapsed_seconds": round(elapsed, 3),
+            "paths_per_second": round(n_paths / elapsed, 1) if elapsed > 0 else None,
+        }
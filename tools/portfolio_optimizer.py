@@ -0,0 +1,215 @@
+from typing import Dict, Any, List, Tuple
+import numpy as np
+from config.settings import ResearchConfig
+from tools.covariance import TRADING_DAYS
+
+OBJECTIVES = ("min_variance", "max_sharpe", "risk_parity", "frontier")
+
+
+def project_simplex(points: np.ndarray) -> np.ndarray:
+    """Euclidean projection of every row onto {w >= 0, sum(w) = 1} (sort-based, O(n log n) per row)"""
+    points = np.atleast_2d(points)
+    n = points.shape[1]
+    ordered = -np.sort(-points, axis=1)
+    cumulative = np.cumsum(ordered, axis=1) - 1.0
+    positions = np.arange(1, n + 1)
+    active = ordered - cumulative / positions > 0
+    # Last index where the condition holds (it holds on a prefix of the sorted row)
+    rho = n - 1 - np.argmax(active[:, ::-1], axis=1)
+    theta = cumulative[np.arange(len(points)), rho] / (rho + 1)
+    return np.maximum(points - theta[:, None], 0.0)
+
+
+def solve_simplex_qp(cov: np.ndarray, linear: np.ndarray, initial: np.ndarray = None,
+                     max_iter: int = None, tol: float = None) -> Tuple[np.ndarray, int]:
+    """Minimize 0.5 w'Σw - c'w over the long-only simplex for every row c of ``linear`` at once
+
+    Accelerated projected gradient (FISTA) with per-row adaptive restart, step 1/λmax(Σ). All
+    problems share one (k x n) @ (n x n) product per iteration, so sweeping a frontier costs
+    about as much as a single solve. Returns the weights and the iterations used.
+    """
+    max_iter = max_iter or ResearchConfig.OPTIMIZER_MAX_ITER
+    tol = ResearchConfig.OPTIMIZER_TOLERANCE if tol is None else tol
+    linear = np.atleast_2d(linear)
+    k, n = linear.shape
+    step = 1.0 / max(np.linalg.eigvalsh(cov)[-1], 1e-18)
+
+    weights = project_simplex(initial) if initial is not None else np.full((k, n), 1.0 / n)
+    momentum = weights.copy()
+    t = np.ones(k)
+    for iteration in range(1, max_iter + 1):
+        updated = project_simplex(momentum - step * (momentum @ cov - linear))
+        delta = updated - weights
+        # Restart rows whose momentum points uphill (O'Donoghue & Candès gradient scheme)
+        restart = np.einsum("ij,ij->i", momentum - updated, delta) > 0
+        t_next = (1.0 + np.sqrt(1.0 + 4.0 * t * t)) / 2.0
+        beta = np.where(restart, 0.0, (t - 1.0) / t_next)
+        t = np.where(restart, 1.0, t_next)
+        momentum = updated + beta[:, None] * delta
+        weights = updated
+        if np.abs(delta).max() < tol:
+            break
+    return weights, iteration
+
+
+class PortfolioOptimizer:
+    """Minimum-variance, max-Sharpe, risk-parity and efficient-frontier portfolios from one covariance
+
+    Takes a daily covariance (e.g. from CovarianceEngine) and daily expected returns; results
+    are annualized. Unconstrained problems use closed forms on a single Cholesky factorization;
+    long-only problems use the batched simplex solver above.
+    """
+
+    def __init__(self, cov: np.ndarray, expected_returns: np.ndarray, symbols: List[str] = None,
+                 risk_free_rate: float = None, long_only: bool = True):
+        self.cov = np.asarray(cov, dtype=np.float64) * TRADING_DAYS
+        self.mu = np.asarray(expected_returns, dtype=np.float64) * TRADING_DAYS
+        self.symbols = symbols or [f"asset_{i}" for i in range(len(self.mu))]
+        self.risk_free_rate = ResearchConfig.RISK_FREE_RATE if risk_free_rate is None else risk_free_rate
+        self.long_only = long_only
+        self.iterations = 0
+        self._factor = None
+
+    def _solve(self, rhs: np.ndarray) -> np.ndarray:
+        """Σ^-1 rhs via a cached Cholesky factor (tiny ridge if Σ is only semi-definite)"""
+        if self._factor is None:
+            try:
+                self._factor = np.linalg.cholesky(self.cov)
+            except np.linalg.LinAlgError:
+                ridge = 1e-10 * np.trace(self.cov) / len(self.cov)
+                self._factor = np.linalg.cholesky(self.cov + ridge * np.eye(len(self.cov)))
+        return np.linalg.solve(self._factor.T, np.linalg.solve(self._factor, rhs))
+
+    def _qp(self, linear: np.ndarray, initial: np.ndarray = None) -> np.ndarray:
+        weights, iterations = solve_simplex_qp(self.cov, linear, initial)
+        self.iterations += iterations
+        return weights
+
+    def statistics(self, weights: np.ndarray) -> Dict[str, np.ndarray]:
+        """Annualized return, volatility and Sharpe for each row of a weight matrix"""
+        weights = np.atleast_2d(weights)
+        expected = weights @ self.mu
+        volatility = np.sqrt(np.clip(np.einsum("ij,jk,ik->i", weights, self.cov, weights), 0.0, None))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = np.where(volatility > 0, (expected - self.risk_free_rate) / volatility, 0.0)
+        return {"expected_return": expected, "volatility": volatility, "sharpe_ratio": sharpe}
+
+    def min_variance(self) -> np.ndarray:
+        if self.long_only:
+            return self._qp(np.zeros((1, len(self.mu))))[0]
+        x = self._solve(np.ones(len(self.mu)))
+        return x / x.sum()
+
+    def max_sharpe(self, n_points: int = None) -> np.ndarray:
+        """Tangency portfolio; long-only is searched along the frontier, then refined around the best point"""
+        if not self.long_only:
+            x = self._solve(self.mu - self.risk_free_rate)
+            # Rescaling by a non-positive sum would flip (or blow up) the weights into the minimum-Sharpe portfolio
+            if x.sum() <= 1e-12 * np.abs(x).sum():
+                raise ValueError("No fully invested portfolio has a positive Sharpe ratio: expected excess "
+                                 "returns are too low (try min_variance or long_only)")
+            return x / x.sum()
+
+        tolerances = self._risk_tolerances(n_points or ResearchConfig.OPTIMIZER_FRONTIER_POINTS)
+        weights = self._qp(tolerances[:, None] * self.mu[None, :])
+        best = int(np.argmax(self.statistics(weights)["sharpe_ratio"]))
+        lo, hi = tolerances[max(best - 1, 0)], tolerances[min(best + 1, len(tolerances) - 1)]
+        fine = np.linspace(lo, hi, 33)
+        initial = np.repeat(weights[best:best + 1], len(fine), axis=0)
+        refined = self._qp(fine[:, None] * self.mu[None, :], initial)
+        return refined[int(np.argmax(self.statistics(refined)["sharpe_ratio"]))]
+
+    def risk_parity(self, budgets: np.ndarray = None, max_iter: int = 100, tol: float = 1e-12) -> np.ndarray:
+        """Equal (or budgeted) risk contributions via Newton's method on Spinu's convex formulation
+
+        Minimizes 0.5 y'Σy - Σ b_i log(y_i) over y > 0; w = y / sum(y) has risk contributions ∝ b.
+        """
+        n = len(self.mu)
+        budgets = np.full(n, 1.0 / n) if budgets is None else np.asarray(budgets, dtype=np.float64)
+        budgets = budgets / budgets.sum()
+        y = budgets / np.sqrt(np.clip(np.diag(self.cov), 1e-18, None))
+        for iteration in range(1, max_iter + 1):
+            gradient = self.cov @ y - budgets / y
+            hessian = self.cov + np.diag(budgets / y ** 2)
+            direction = np.linalg.solve(hessian, gradient)
+            # Damped step keeps every y strictly positive
+            ratio = np.max(direction / y)
+            y = y - (min(1.0, 0.9 / ratio) if ratio > 0 else 1.0) * direction
+            if gradient @ direction < tol:
+                break
+        self.iterations += iteration
+        return y / y.sum()
+
+    def frontier(self, n_points: int = None) -> np.ndarray:
+        """Weights of n_points efficient portfolios, from minimum variance toward maximum return"""
+        n_points = n_points or ResearchConfig.OPTIMIZER_FRONTIER_POINTS
+        if self.long_only:
+            return self._qp(self._risk_tolerances(n_points)[:, None] * self.mu[None, :])
+
+        # Two-fund theorem: every frontier portfolio is a mix of Σ^-1 1 and Σ^-1 μ
+        inverse = self._solve(np.column_stack([np.ones(len(self.mu)), self.mu]))
+        a, b = inverse[:, 0].sum(), inverse[:, 1].sum()
+        c = self.mu @ inverse[:, 1]
+        d = a * c - b * b
+        if d <= 0:
+            return np.repeat((inverse[:, 0] / a)[None, :], n_points, axis=0)
+        targets = np.linspace(b / a, self.mu.max(), n_points)
+        return np.outer((c - targets * b) / d, inverse[:, 0]) + np.outer((targets * a - b) / d, inverse[:, 1])
+
+    def _risk_tolerances(self, n_points: int) -> np.ndarray:
+        """Grid of t in min 0.5 w'Σw - t μ'w, from 0 (min variance) to the t where the top-return asset wins
+
+        The single-asset portfolio e_k is optimal once Σ_kk - t μ_k <= Σ_jk - t μ_j for every j.
+        """
+        k = int(np.argmax(self.mu))
+        gap = self.mu[k] - self.mu
+        lower = gap > 1e-12
+        t_max = np.max((self.cov[k, k] - self.cov[k, lower]) / gap[lower]) if lower.any() else 0.0
+        return np.linspace(0.0, max(t_max, 0.0), n_points)
+
+    def risk_contributions(self, weights: np.ndarray) -> np.ndarray:
+        """Share of portfolio variance from each asset, w_i (Σw)_i / w'Σw"""
+        marginal = self.cov @ weights
+        variance = weights @ marginal
+        return weights * marginal / variance if variance > 0 else np.zeros_like(weights)
+
+    def describe(self, weights: np.ndarray, include_weights: bool = True,
+                 contributions: bool = False) -> Dict[str, Any]:
+        """JSON-ready summary of one portfolio"""
+        stats = self.statistics(weights)
+        summary = {name: round(float(values[0]), 6) for name, values in stats.items()}
+        summary["holdings"] = int((weights > 1e-6).sum())
+        if include_weights:
+            summary["weights"] = {s: round(float(w), 6) for s, w in zip(self.symbols, weights)}
+        if contributions:
+            summary["risk_contributions"] = {
+                s: round(float(c), 6) for s, c in zip(self.symbols, self.risk_contributions(weights))
+            }
+        return summary
+
+    def optimize(self, objective: str, n_points: int = None, include_weights: bool = True) -> Dict[str, Any]:
+        """Run one objective and summarize it; 'frontier' returns per-point statistics"""
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective '{objective}', expected one of {OBJECTIVES}")
+        self.iterations = 0
+        result = {"objective": objective, "long_only": self.long_only, "number_of_assets": len(self.mu)}
+        if objective == "frontier":
+            weights = self.frontier(n_points)
+            stats = self.statistics(weights)
+            result["points"] = [
+                {name: round(float(values[i]), 6) for name, values in stats.items()}
+                for i in range(len(weights))
+            ]
+            best = int(np.argmax(stats["sharpe_ratio"]))
+            result["max_sharpe_point"] = best
+            if include_weights:
+                result["symbols"] = self.symbols
+                result["weights"] = np.round(weights, 6).tolist()
+        elif objective == "risk_parity":
+            result.update(self.describe(self.risk_parity(), include_weights, contributions=True))
+        elif objective == "max_sharpe":
+            result.update(self.describe(self.max_sharpe(n_points), include_weights))
+        else:
+            result.update(self.describe(self.min_variance(), include_weights))
+        result["iterations"] = self.iterations
+        return result
@@ -0,0 +1,299 @@
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import BDay
+from config.settings import ResearchConfig
+from tools.market_data_source import MarketDataSource, OHLCV_COLUMNS
+from utils.tracing import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+_PERIOD_OFFSETS = {
+    "d": lambda n: pd.DateOffset(days=n),
+    "wk": lambda n: pd.DateOffset(weeks=n),
+    "mo": lambda n: pd.DateOffset(months=n),
+    "y": lambda n: pd.DateOffset(years=n),
+}
+
+
+def period_start(period: str, now: Optional[pd.Timestamp] = None) -> Optional[pd.Timestamp]:
+    """Translate a yfinance period ('2y', '6mo', 'ytd', 'max') into a window start date"""
+    now = (now or pd.Timestamp.now()).normalize()
+    if period == "max":
+        return None
+    if period == "ytd":
+        return pd.Timestamp(year=now.year, month=1, day=1)
+    for suffix, offset in _PERIOD_OFFSETS.items():
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return now - offset(int(period[:-len(suffix)]))
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def is_intraday(interval: str) -> bool:
+    return interval.endswith("m") or interval.endswith("h")
+
+
+class PriceHistoryCache:
+    """Persistent per-symbol OHLCV store of memory-mapped NumPy columns with LRU eviction"""
+
+    CATALOG_FILE = "catalog.json"
+
+    def __init__(self, root: str = None, max_bytes: int = None):
+        self.root = root or ResearchConfig.PRICE_CACHE_DIR
+        self.max_bytes = max_bytes or ResearchConfig.PRICE_CACHE_MAX_MB * 1024 * 1024
+        self._lock = threading.RLock()
+        os.makedirs(self.root, exist_ok=True)
+        self._catalog = self._load_catalog()
+
+    @staticmethod
+    def _key(symbol: str, interval: str) -> str:
+        return f"{interval}/{symbol}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def entry(self, symbol: str, interval: str = "1d") -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._catalog.get(self._key(symbol, interval))
+
+    def is_fresh(self, symbol: str, interval: str = "1d", now: Optional[float] = None) -> bool:
+        """Apply the TTL rules for intraday vs. end-of-day bars"""
+        entry = self.entry(symbol, interval)
+        if entry is None:
+            return False
+
+        now = now or time.time()
+        age = now - entry["fetched_at"]
+        if is_intraday(interval):
+            return age < ResearchConfig.PRICE_CACHE_INTRADAY_TTL_SECONDS
+
+        if age < ResearchConfig.PRICE_CACHE_EOD_TTL_HOURS * 3600:
+            return True
+
+        # A daily bar fetched after its session day is final; nothing new can appear until the
+        # next session closes, so the entry stays valid over nights and weekends.
+        last_bar = pd.Timestamp(entry["last_bar"]).normalize()
+        fetched_day = pd.Timestamp(entry["fetched_at"], unit="s").normalize()
+        latest_complete_session = pd.Timestamp(now, unit="s").normalize() - BDay(1)
+        return fetched_day > last_bar and last_bar >= latest_complete_session
+
+    def covers(self, symbol: str, window_start: Optional[pd.Timestamp], interval: str = "1d") -> bool:
+        """Whether the cached bars reach back to window_start"""
+        entry = self.entry(symbol, interval)
+        if entry is None:
+            return False
+        if entry["coverage_start"] is None:
+            return True
+        return window_start is not None and pd.Timestamp(entry["coverage_start"]) <= window_start
+
+    def read(self, symbol: str, interval: str = "1d",
+             start: Optional[pd.Timestamp] = None) -> Optional[pd.DataFrame]:
+        """Load cached bars from start onwards; only the requested rows are copied out of the maps"""
+        key = self._key(symbol, interval)
+        with self._lock:
+            entry = self._catalog.get(key)
+            if entry is None:
+                return None
+            entry["last_access"] = time.time()
+
+        path = self._path(key)
+        try:
+            index = np.load(os.path.join(path, "index.npy"), mmap_mode="r")
+            first = int(np.searchsorted(index, start.value)) if start is not None else 0
+            data = {
+                column: np.array(np.load(os.path.join(path, f"{column}.npy"), mmap_mode="r")[first:])
+                for column in entry["columns"]
+            }
+            dates = pd.DatetimeIndex(np.array(index[first:]).astype("datetime64[ns]"), name="Date")
+        except (OSError, ValueError):
+            self._drop(key)
+            return None
+
+        if entry.get("tz"):
+            dates = dates.tz_localize(entry["tz"])
+        return pd.DataFrame(data, index=dates)
+
+    def write(self, symbol: str, frame: pd.DataFrame, interval: str = "1d",
+              coverage_start: Optional[pd.Timestamp] = None):
+        """Replace the cached bars for a symbol and record when they were fetched"""
+        if frame is None or frame.empty:
+            return
+
+        frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+        dates = frame.index
+        tz = str(dates.tz) if dates.tz is not None else None
+        if tz:
+            dates = dates.tz_localize(None)
+
+        key = self._key(symbol, interval)
+        path = self._path(key)
+        os.makedirs(path, exist_ok=True)
+
+        columns = [c for c in OHLCV_COLUMNS if c in frame.columns]
+        arrays = {"index": dates.values.astype("datetime64[ns]").astype(np.int64)}
+        arrays.update({c: frame[c].to_numpy(dtype=np.float64) for c in columns})
+
+        size = 0
+        for name, values in arrays.items():
+            target = os.path.join(path, f"{name}.npy")
+            tmp = target + ".tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, values)
+            os.replace(tmp, target)
+            size += os.path.getsize(target)
+
+        with self._lock:
+            now = time.time()
+            self._catalog[key] = {
+                "columns": columns,
+                "tz": tz,
+                "first_bar": str(dates[0]),
+                "last_bar": str(dates[-1]),
+                "coverage_start": str(coverage_start) if coverage_start is not None else None,
+                "fetched_at": now,
+                "last_access": now,
+                "bytes": size,
+            }
+            self._evict()
+            self._save_catalog()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(entry["bytes"] for entry in self._catalog.values())
+
+    def _evict(self):
+        """Drop least-recently-used symbols until the store fits under max_bytes"""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self._catalog.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            total -= entry["bytes"]
+            self._drop(key, save=False)
+            logger.info("Evicted %s from price cache", key)
+
+    def _drop(self, key: str, save: bool = True):
+        with self._lock:
+            self._catalog.pop(key, None)
+            shutil.rmtree(self._path(key), ignore_errors=True)
+            if save:
+                self._save_catalog()
+
+    def _load_catalog(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.root, self.CATALOG_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_catalog(self):
+        target = os.path.join(self.root, self.CATALOG_FILE)
+        tmp = target + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._catalog, f)
+        os.replace(tmp, target)
+
+
+class CachedDataSource(MarketDataSource):
+    """Serve history from PriceHistoryCache and only fetch the missing tail from the wrapped source"""
+
+    def __init__(self, source: MarketDataSource, cache: Optional[PriceHistoryCache] = None):
+        self.source = source
+        self.cache = cache or PriceHistoryCache()
+        self.name = f"cached:{source.name}"
+        self.last_refresh: Dict[str, int] = {}
+
+    def fetch_history(self, symbols: List[str], period: Optional[str] = None,
+                      start: Optional[str] = None, interval: str = "1d") -> Dict[str, pd.DataFrame]:
+        window_start = pd.Timestamp(start) if start else period_start(period or ResearchConfig.ANALYSIS_PERIOD)
+
+        full, tails, hits = [], {}, []
+        for symbol in symbols:
+            if not self.cache.covers(symbol, window_start, interval):
+                full.append(symbol)
+            elif self.cache.is_fresh(symbol, interval):
+                hits.append(symbol)
+            else:
+                # Re-fetch from a few sessions before the last cached bar: a partial last bar gets
+                # replaced, and the complete bars before it show whether past prices were re-based
+                last_bar = pd.Timestamp(self.cache.entry(symbol, interval)["last_bar"]).normalize()
+                tail_start = last_bar - BDay(ResearchConfig.PRICE_CACHE_OVERLAP_SESSIONS)
+                tails.setdefault(tail_start.strftime("%Y-%m-%d"), []).append(symbol)
+
+        self._fetch_window(full, period, start, interval, window_start)
+
+        rebased = []
+        for tail_start, group in tails.items():
+            try:
+                fetched = self.source.fetch_history(group, start=tail_start, interval=interval)
+            except Exception as e:
+                # Serve the stale bars rather than failing the symbols outright
+                logger.warning("Tail refresh from %s failed: %s", tail_start, e)
+                continue
+            for symbol in group:
+                cached = self.cache.read(symbol, interval)
+                frame = fetched.get(symbol)
+                if frame is not None and not frame.empty:
+                    if cached is not None and self._rebased(cached, frame):
+                        # A split or dividend re-based the adjusted history; splicing would leave a jump
+                        rebased.append(symbol)
+                        continue
+                    cached = pd.concat([cached, frame]) if cached is not None else frame
+                coverage = self.cache.entry(symbol, interval)["coverage_start"]
+                self.cache.write(symbol, cached, interval,
+                                 coverage_start=pd.Timestamp(coverage) if coverage else None)
+
+        if rebased:
+            logger.info("Re-fetching %d symbols whose adjusted history changed", len(rebased))
+            self._fetch_window(rebased, period, start, interval, window_start)
+
+        self.last_refresh = {"cache_hits": len(hits), "tail_refreshes": sum(map(len, tails.values())),
+                             "full_fetches": len(full), "rebased": len(rebased)}
+        record_cache_lookup("price", "hit", len(hits))
+        record_cache_lookup("price", "stale", self.last_refresh["tail_refreshes"])
+        record_cache_lookup("price", "miss", len(full))
+
+        # Stored indexes are naive local times
+        read_start = window_start.tz_localize(None) if window_start is not None and window_start.tz else window_start
+        histories = {}
+        for symbol in symbols:
+            frame = self.cache.read(symbol, interval, start=read_start)
+            if frame is not None and not frame.empty:
+                histories[symbol] = frame
+        return histories
+
+    def _fetch_window(self, symbols: List[str], period: Optional[str], start: Optional[str], interval: str,
+                      window_start: Optional[pd.Timestamp]):
+        """Fetch the whole window for symbols and replace their cached bars"""
+        if not symbols:
+            return
+        try:
+            fetched = self.source.fetch_history(symbols, period=period, start=start, interval=interval)
+        except Exception as e:
+            # Cached symbols are still served; the cold ones report no data
+            logger.warning("History fetch for %d symbols failed: %s", len(symbols), e)
+            fetched = {}
+        for symbol, frame in fetched.items():
+            self.cache.write(symbol, frame, interval, coverage_start=window_start)
+
+    @staticmethod
+    def _rebased(cached: pd.DataFrame, fresh: pd.DataFrame) -> bool:
+        """Whether closes of complete bars present in both frames moved (auto-adjusted prices were re-based)"""
+        fresh = fresh[~fresh.index.duplicated(keep="last")]
+        complete = cached.index[cached.index < cached.index[-1]]
+        overlap = complete.intersection(fresh.index)
+        if overlap.empty:
+            return False
+        old = cached.loc[overlap, "Close"].to_numpy(dtype=np.float64)
+        new = fresh.loc[overlap, "Close"].to_numpy(dtype=np.float64)
+        return not np.allclose(new, old, rtol=ResearchConfig.PRICE_CACHE_REBASE_TOLERANCE, atol=0.0, equal_nan=True)
+
+    def fetch_info(self, symbol: str) -> Dict[str, Any]:
+        return self.source.fetch_info(symbol)
@@ -0,0 +1,370 @@
+import os
+import re
+import glob
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+from typing import Dict, Any, List, Iterable, Optional
+import numpy as np
+from config.settings import ResearchConfig
+from utils.tracing import traced
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "which their they these those into than then also can may not but such".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+class ResearchCorpus:
+    """Persistent TF-IDF inverted index over research passages, queried through memory-mapped arrays
+
+    Each build writes a new version directory under the corpus root and then points the root's
+    CURRENT file at it. An instance reads the version that was current when it was created and
+    never changes, so searches need no locking while a rebuild runs; open a new instance to
+    read a newer build. Layout of a version directory:
+      vocab.json        term -> row in the postings CSR, plus idf per term
+      term_ptr.npy      int64 offsets into doc_ids/weights for each term (CSR indptr)
+      doc_ids.npy       int32 passage id per posting
+      weights.npy       float32 L2-normalized tf-idf weight per posting
+      passages.jsonl    one passage (title, text, source, kind) per line
+      offsets.npy       int64 byte offset of each passage line
+    A query touches only the postings of its own terms, so latency stays in the milliseconds
+    for a few hundred thousand passages.
+    """
+
+    def __init__(self, root: str = None):
+        self.root = root or os.path.join(ResearchConfig.CACHE_DIR, "research_corpus")
+        self.index_dir = _current_version(self.root)
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.index_dir, "vocab.json"))
+
+    def build(self, passages: Iterable[Dict[str, str]]) -> Dict[str, Any]:
+        """Write a new index version from passages with title/text/source/kind and make it current
+
+        Duplicate texts are dropped. This instance keeps reading its own version.
+        """
+        version_dir = os.path.join(self.root, f"v{time.time_ns()}")
+        os.makedirs(version_dir)
+        vocab: Dict[str, int] = {}
+        term_ids, counts, doc_lengths = [], [], []
+        seen = set()
+        n_docs = 0
+
+        offsets = []
+        with open(os.path.join(version_dir, "passages.jsonl"), "wb") as out:
+            for passage in passages:
+                text = (passage.get("text") or "").strip()
+                digest = hashlib.sha1(" ".join(text.lower().split()).encode("utf-8")).digest()
+                if not text or digest in seen:
+                    continue
+                seen.add(digest)
+                tokens = tokenize(f"{passage.get('title', '')} {text}")
+                if not tokens:
+                    continue
+
+                tf = Counter(tokens)
+                for term in [t for t in tf if t not in vocab]:
+                    vocab[term] = len(vocab)
+                term_ids.extend(map(vocab.__getitem__, tf))
+                counts.extend(tf.values())
+                doc_lengths.append(len(tf))
+
+                offsets.append(out.tell())
+                record = {k: passage.get(k, "") for k in ("title", "text", "source", "kind")}
+                out.write((json.dumps(record) + "\n").encode("utf-8"))
+                n_docs += 1
+
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        doc_ids = np.repeat(np.arange(n_docs, dtype=np.int32), doc_lengths)
+        tf = np.asarray(counts, dtype=np.float32)
+
+        df = np.bincount(term_ids, minlength=len(vocab))
+        idf = (np.log((n_docs + 1) / (df + 1)) + 1.0).astype(np.float32)
+        weights = (1.0 + np.log(tf)) * idf[term_ids]
+        norms = np.sqrt(np.bincount(doc_ids, weights=weights.astype(np.float64) ** 2, minlength=n_docs))
+        weights = (weights / np.maximum(norms[doc_ids], 1e-12)).astype(np.float32)
+
+        order = np.argsort(term_ids, kind="stable")
+        term_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=term_ptr[1:])
+
+        arrays = {"term_ptr": term_ptr, "doc_ids": doc_ids[order], "weights": weights[order],
+                  "offsets": np.asarray(offsets, dtype=np.int64)}
+        for name, array in arrays.items():
+            np.save(os.path.join(version_dir, f"{name}.npy"), array)
+        with open(os.path.join(version_dir, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump({"n_docs": n_docs, "terms": vocab, "idf": idf.tolist()}, f)
+
+        # The version is complete before CURRENT names it, so readers never see a half-built index
+        previous = _current_version(self.root)
+        current_file = os.path.join(self.root, "CURRENT")
+        with open(current_file + ".tmp", "w", encoding="utf-8") as f:
+            f.write(os.path.basename(version_dir))
+        os.replace(current_file + ".tmp", current_file)
+        if previous != self.root:
+            _prune_versions(self.root, keep_from=os.path.basename(previous))
+        return {"passages": n_docs, "terms": len(vocab), "postings": int(len(doc_ids)), "index_dir": version_dir}
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            with open(os.path.join(self.index_dir, "vocab.json"), encoding="utf-8") as f:
+                vocab = json.load(f)
+            self.n_docs = vocab["n_docs"]
+            self.terms = vocab["terms"]
+            self.idf = np.asarray(vocab["idf"], dtype=np.float32)
+            load = lambda name: np.load(os.path.join(self.index_dir, f"{name}.npy"), mmap_mode="r")
+            self.term_ptr, self.doc_ids, self.weights, self.offsets = (
+                load("term_ptr"), load("doc_ids"), load("weights"), load("offsets")
+            )
+            self._loaded = True
+
+    def search(self, query: str, k: int = None) -> List[Dict[str, Any]]:
+        """Top-k passages by cosine similarity between tf-idf vectors"""
+        k = k or ResearchConfig.CORPUS_TOP_K
+        if not self.exists:
+            return []
+        self._load()
+
+        query_terms, query_tf = np.unique(
+            [self.terms[t] for t in tokenize(query) if t in self.terms], return_counts=True
+        )
+        if not len(query_terms) or not self.n_docs:
+            return []
+        query_weights = (1.0 + np.log(query_tf)) * self.idf[query_terms]
+        query_weights /= np.linalg.norm(query_weights)
+
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term, weight in zip(query_terms, query_weights):
+            start, end = self.term_ptr[term], self.term_ptr[term + 1]
+            # Each passage appears at most once per term's postings, so fancy-index add is safe
+            scores[self.doc_ids[start:end]] += weight * self.weights[start:end]
+
+        k = min(k, self.n_docs)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [dict(self._passage(int(i)), score=round(float(scores[i]), 4)) for i in top if scores[i] > 0]
+
+    def _passage(self, doc_id: int) -> Dict[str, Any]:
+        with open(os.path.join(self.index_dir, "passages.jsonl"), "rb") as f:
+            f.seek(int(self.offsets[doc_id]))
+            return json.loads(f.readline())
+
+
+def _current_version(root: str) -> str:
+    """Directory of the current index version (the root itself for indexes built before versioning)"""
+    try:
+        with open(os.path.join(root, "CURRENT"), encoding="utf-8") as f:
+            return os.path.join(root, f.read().strip())
+    except OSError:
+        return root
+
+
+def _prune_versions(root: str, keep_from: str):
+    """Delete versions older than keep_from, the one replaced by the latest build
+
+    That version stays for searches still running on it; newer directories are the current
+    version and builds other processes may have in progress.
+    """
+    for name in os.listdir(root):
+        if name.startswith("v") and name < keep_from and os.path.isdir(os.path.join(root, name)):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def iter_search_cache_passages(path: str = None) -> Iterable[Dict[str, str]]:
+    """Search results stored in the SQLite search cache"""
+    path = path or os.path.join(ResearchConfig.CACHE_DIR, "search_cache.sqlite")
+    if not os.path.exists(path):
+        return
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        for (value,) in conn.execute("SELECT value FROM entries"):
+            try:
+                results = json.loads(value)["result"].get("results", [])
+            except (ValueError, KeyError, AttributeError):
+                continue
+            for result in results:
+                yield _search_passage(result)
+    finally:
+        conn.close()
+
+
+def _dataset_files(dataset_dir: str = None) -> List[str]:
+    """Saved research data and legacy complete study files, plus columnar study_*/study.json"""
+    dataset_dir = dataset_dir or ResearchConfig.DATASET_DIR
+    return (glob.glob(os.path.join(dataset_dir, "*.json*"))
+            + glob.glob(os.path.join(dataset_dir, "study_*", "study.json")))
+
+
+def iter_dataset_passages(dataset_dir: str = None) -> Iterable[Dict[str, str]]:
+    """Search results recorded in saved research data and study files"""
+    for path in sorted(_dataset_files(dataset_dir)):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not isinstance(data, dict):
+            continue
+        for result in data.get("literature", []) or []:
+            yield _search_passage(result)
+        research = data.get("data_research", data)
+        steps = research.get("intermediate_steps", []) if isinstance(research, dict) else []
+        for step in steps or []:
+            # Saved with default=str, so each step is [str(action), observation]
+            if not isinstance(step, (list, tuple)) or len(step) != 2 or not isinstance(step[1], str):
+                continue
+            try:
+                observation = json.loads(step[1])
+            except ValueError:
+                continue
+            if isinstance(observation, dict):
+                for result in observation.get("results", []) or []:
+                    if isinstance(result, dict) and "snippet" in result:
+                        yield _search_passage(result)
+
+
+def iter_report_passages(report_dir: str = None, passage_chars: int = None) -> Iterable[Dict[str, str]]:
+    """Generated Markdown reports split into heading-labelled passages of roughly passage_chars"""
+    passage_chars = passage_chars or ResearchConfig.CORPUS_PASSAGE_CHARS
+    for path in sorted(glob.glob(os.path.join(report_dir or ResearchConfig.OUTPUT_DIR, "*.md"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                content = f.read()
+        except OSError:
+            continue
+        name = os.path.basename(path)
+        heading, buffer = "", []
+        for block in re.split(r"\n\s*\n", content):
+            block = block.strip()
+            if not block:
+                continue
+            if block.startswith("#"):
+                if buffer:
+                    yield {"title": f"{name} - {heading}".strip(" -"), "text": " ".join(buffer), "source": path, "kind": "report"}
+                    buffer = []
+                heading = block.splitlines()[0].lstrip("# ").strip()
+                block = "\n".join(block.splitlines()[1:]).strip()
+                if not block:
+                    continue
+            buffer.append(block)
+            if sum(len(b) for b in buffer) >= passage_chars:
+                yield {"title": f"{name} - {heading}".strip(" -"), "text": " ".join(buffer), "source": path, "kind": "report"}
+                buffer = []
+        if buffer:
+            yield {"title": f"{name} - {heading}".strip(" -"), "text": " ".join(buffer), "source": path, "kind": "report"}
+
+
+def _search_passage(result: Dict[str, Any]) -> Dict[str, str]:
+    return {"title": result.get("title", ""), "text": result.get("snippet", ""),
+            "source": result.get("source") or result.get("link", ""), "kind": "search_result"}
+
+
+def corpus_sources() -> List[str]:
+    """Files the corpus is built from"""
+    paths = _dataset_files()
+    paths += glob.glob(os.path.join(ResearchConfig.OUTPUT_DIR, "*.md"))
+    cache = os.path.join(ResearchConfig.CACHE_DIR, "search_cache.sqlite")
+    return paths + [cache] if os.path.exists(cache) else paths
+
+
+def refresh_research_corpus(corpus: ResearchCorpus = None, force: bool = False) -> Dict[str, Any]:
+    """Build a new index version when any source file is newer than the current one (or when forced)"""
+    corpus = ResearchCorpus(corpus.root if corpus is not None else None)
+    index_file = os.path.join(corpus.index_dir, "vocab.json")
+    built_at = os.path.getmtime(index_file) if corpus.exists else 0.0
+    sources = corpus_sources()
+    # The cache's WAL file carries recent writes
+    newest = max((os.path.getmtime(p) for p in sources + [p + "-wal" for p in sources] if os.path.exists(p)),
+                 default=0.0)
+    if not force and corpus.exists and newest <= built_at:
+        return {"rebuilt": False}
+
+    def passages():
+        yield from iter_search_cache_passages()
+        yield from iter_dataset_passages()
+        yield from iter_report_passages()
+
+    stats = corpus.build(passages())
+    stats["rebuilt"] = True
+    return stats
+
+
+_shared_corpus: Optional[ResearchCorpus] = None
+_last_refresh = 0.0
+_refreshing = False
+_corpus_lock = threading.Lock()
+
+
+def get_research_corpus() -> ResearchCorpus:
+    """Process-wide corpus, refreshed from outputs/ in the background at most every CORPUS_REFRESH_SECONDS
+
+    Checked on each request, so long-lived processes (the app, batch runs) pick up the
+    literature and reports of studies they finished earlier. Requests never wait for a
+    rebuild: they search the current version until the new one is swapped in.
+    """
+    global _shared_corpus, _last_refresh, _refreshing
+    with _corpus_lock:
+        if _shared_corpus is None:
+            _shared_corpus = ResearchCorpus()
+        due = not _refreshing and (
+            not _last_refresh or time.monotonic() - _last_refresh >= ResearchConfig.CORPUS_REFRESH_SECONDS
+        )
+        if due:
+            _refreshing, _last_refresh = True, time.monotonic()
+        corpus = _shared_corpus
+    if due:
+        threading.Thread(target=_refresh_shared_corpus, name="research-corpus-refresh", daemon=True).start()
+    return corpus
+
+
+def _refresh_shared_corpus():
+    global _shared_corpus, _refreshing
+    try:
+        if refresh_research_corpus().get("rebuilt"):
+            fresh = ResearchCorpus()
+            with _corpus_lock:
+                _shared_corpus = fresh
+    except Exception:
+        # A stale or missing index only means fewer offline hits; web search still works
+        pass
+    finally:
+        with _corpus_lock:
+            _refreshing = False
+
+
+def create_research_corpus_tool():
+    from langchain.tools import Tool  # deferred: LangChain is slow to import and only agents need it
+    @traced("tool_call.research_corpus_search")
+    def corpus_wrapper(query: str) -> str:
+        try:
+            results = get_research_corpus().search(query)
+        except Exception as e:
+            return json.dumps({"error": f"Research corpus error: {str(e)}"}, indent=2)
+        if not results:
+            return json.dumps({"message": "No matching passages in the local research corpus."}, indent=2)
+        return json.dumps({"query": query, "results": results}, indent=2)
+
+    return Tool(
+        name="research_corpus_search",
+        description=(
+            "Search the local, offline corpus of previously collected research results and generated reports. "
+            "Use this before research_search; only search the web if it returns nothing relevant. "
+            "Returns JSON with the top matching passages (title, text, source, kind, score)."
+        ),
+        func=corpus_wrapper
+    )
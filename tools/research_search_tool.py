@@ -1,18 +1,58 @@
-import requests
 import json
-from langchain.tools import Tool
+import heapq
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from config.settings import ResearchConfig
-from typing import List, Dict
+from tools.http_client import PooledHTTPClient, get_http_client
+from tools.relevance import get_default_scorer
+from tools.search_cache import SearchResultCache, get_search_cache
+from utils.tracing import bind_context, traced
+from typing import List, Dict, Any, Optional
 
 class ResearchSearchTool:
-    def __init__(self):
+    def __init__(self, base_url: str = None, http_client: PooledHTTPClient = None,
+                 cache: Optional[SearchResultCache] = None, use_cache: bool = True):
         self.api_key = ResearchConfig.SERPER_API_KEY
-        self.base_url = "https://google.serper.dev/search"
+        # Point base_url at a local stub server to exercise the client offline
+        self.base_url = base_url or ResearchConfig.SERPER_BASE_URL
+        self.http_client = http_client or get_http_client()
+        self.cache = (cache or get_search_cache()) if use_cache else None
     
     def search_financial_research(self, query: str, focus: str = "academic") -> str:
         """Search for financial research and academic sources"""
+        result = self._search(query, focus)
+        result.pop("http", None)
+        return json.dumps(result, indent=2)
+    
+    def search_many(self, queries: List[str], focus: str = "academic", max_workers: int = None) -> Dict[str, Any]:
+        """Run several searches concurrently over the shared connection pool
+        
+        Returns each query's parsed results with its latency and attempt count, plus
+        latency percentiles for the batch.
+        """
+        max_workers = max_workers or ResearchConfig.SERVICE_CONCURRENCY.get("search", 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(bind_context(lambda q: self._search(q, focus)), queries))
+        
+        latencies = np.array([r["http"]["latency_ms"] for r in results if "http" in r], dtype=np.float64)
+        latency = {"queries": len(queries), "failed": sum(1 for r in results if "error" in r)}
+        if latencies.size:
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            latency.update({"p50_ms": round(float(p50), 2), "p90_ms": round(float(p90), 2), "p99_ms": round(float(p99), 2)})
+        return {"results": [{"query": q, **r} for q, r in zip(queries, results)], "latency": latency}
+    
+    def cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Hits, coalesced lookups, API calls and latency saved by the search cache"""
+        return self.cache.stats() if self.cache is not None else None
+    
+    def _search(self, query: str, focus: str) -> Dict[str, Any]:
+        if self.cache is not None and self.api_key:
+            return self.cache.get_or_fetch(query, focus, self._fetch)
+        return self._fetch(query, focus)
+    
+    def _fetch(self, query: str, focus: str) -> Dict[str, Any]:
         if not self.api_key:
-            return json.dumps({"error": "SERPER_API_KEY not set in environment variables"}, indent=2)
+            return {"error": "SERPER_API_KEY not set in environment variables"}
         
         try:
             research_query = f"{query} financial risk management research {focus}"
@@ -20,10 +60,8 @@ class ResearchSearchTool:
             payload = {"q": research_query, "num": 8, "gl": "us", "hl": "en"}
             headers = {"X-API-KEY": self.api_key, "Content-Type": "application/json"}
             
-            response = requests.post(self.base_url, json=payload, headers=headers)
-            response.raise_for_status()
-            
-            data = response.json()
+            response = self.http_client.post_json(self.base_url, payload, headers)
+            data = response.pop("body")
             research_results = []
             
             if "organic" in data:
@@ -36,41 +74,23 @@ class ResearchSearchTool:
                     })
             
             if not research_results:
-                return json.dumps({"message": "No relevant research results found."}, indent=2)
-            
-            research_results.sort(key=lambda x: x["relevance_score"], reverse=True)
+                return {"message": "No relevant research results found.", "http": response}
             
-            return json.dumps({
+            return {
                 "query": research_query,
                 "timestamp": __import__("datetime").datetime.now().isoformat(),
-                "results": research_results[:5]
-            }, indent=2)
+                "results": heapq.nlargest(5, research_results, key=lambda x: x["relevance_score"]),
+                "http": response
+            }
         
         except Exception as e:
-            return json.dumps({"error": f"Research search error: {str(e)}"}, indent=2)
+            return {"error": f"Research search error: {str(e)}"}
     
     def _calculate_relevance(self, result: Dict, query: str) -> float:
-        title = result.get("title", "").lower()
-        snippet = result.get("snippet", "").lower()
-        link = result.get("link", "").lower()
-        
-        research_keywords = [
-            "study", "analysis", "research", "journal", "academic", "university", 
-            "financial", "risk", "volatility", "portfolio", "investment"
-        ]
-        
-        score = 0
-        for keyword in research_keywords:
-            if keyword in title:
-                score += 3
-            if keyword in snippet:
-                score += 2
-            if keyword in link:
-                score += 1
-        
-        return score
+        return get_default_scorer().keyword_score(result)
 
 def create_research_search_tool():
+    from langchain.tools import Tool  # deferred: LangChain is slow to import and only agents need it
     search_tool = ResearchSearchTool()
     
     return Tool(
@@ -79,5 +99,5 @@ def create_research_search_tool():
             "Search for financial risk management research, academic papers, and market analysis. "
             "Returns JSON with query, timestamp, and top 5 most relevant results."
         ),
-        func=search_tool.search_financial_research
+        func=traced("tool_call.research_search")(search_tool.search_financial_research)
     )
@@ -0,0 +1,451 @@
+import os
+import json
+import uuid
+import atexit
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Dict, Any, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from config.settings import ResearchConfig
+
+_MAGIC = b"RPANEL1\n"
+_ALIGN = 64
+_NANOS_PER_DAY = 86_400 * 10 ** 9
+_CORRELATION_BLOCK = 512  # Columns per block in the masked correlation (bounds the N x block temporaries)
+_SHM_PREFIX = "rpanel_"
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def panel_layout(rows: int, cols: int, has_mask: bool, symbols: List[str],
+                 index_name: Optional[str] = None) -> Tuple[bytes, Dict[str, int]]:
+    """Header bytes and 64-byte aligned offsets of the values / dates / mask blocks in the binary format
+
+    Layout: magic, uint64 header length, JSON header, then float32 values (row-major), int64
+    dates (ns) and, when present, the bool mask. Blocks sit at fixed offsets so a file or shared
+    buffer can be viewed with np.frombuffer without copying.
+    """
+    header = {"rows": rows, "cols": cols, "has_mask": has_mask, "symbols": list(symbols), "index_name": index_name}
+    # Offsets depend on the header size and vice versa; reserve room for them first
+    header.update(values_offset=0, dates_offset=0, mask_offset=0, nbytes=0)
+    probe = json.dumps(header).encode("utf-8")
+    start = _aligned(len(_MAGIC) + 8 + len(probe) + 128)
+    offsets = {"values_offset": start}
+    offsets["dates_offset"] = _aligned(start + rows * cols * 4)
+    offsets["mask_offset"] = _aligned(offsets["dates_offset"] + rows * 8)
+    offsets["nbytes"] = offsets["mask_offset"] + (rows * cols if has_mask else 0)
+    header.update(offsets)
+    encoded = json.dumps(header).encode("utf-8")
+    return _MAGIC + len(encoded).to_bytes(8, "little") + encoded, offsets
+
+
+class ReturnPanel:
+    """Date x symbol daily returns as one contiguous float32 block with symbol and date indexes
+
+    Missing observations are NaN in values; mask (True = observed) is kept only when something
+    is missing. Storage is float32 to halve memory, but every reduction (means, variances,
+    correlations, VaR) upcasts to float64 first, so accumulated rounding stays at float64 level.
+    """
+
+    def __init__(self, values: np.ndarray, symbols: List[str], dates: pd.DatetimeIndex,
+                 mask: Optional[np.ndarray] = None):
+        self.values = np.ascontiguousarray(values, dtype=np.float32)
+        if self.values.ndim != 2 or self.values.shape != (len(dates), len(symbols)):
+            raise ValueError(f"values shape {self.values.shape} does not match {len(dates)} dates x {len(symbols)} symbols")
+        self.symbols = [str(s) for s in symbols]
+        self.dates = pd.DatetimeIndex(dates)
+        if mask is None:
+            observed = ~np.isnan(self.values)
+            mask = None if observed.all() else observed
+        self.mask = mask
+        self._positions = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    @classmethod
+    def from_histories(cls, histories: Dict[str, pd.DataFrame]) -> "ReturnPanel":
+        """Align close prices on calendar dates and convert them to simple daily returns
+
+        Several bars on one day keep the last valid close, as groupby(day).last() would; returns
+        are computed in float64 before being narrowed.
+        """
+        symbols, days, closes = [], [], []
+        index_name = None
+        day_cache: Dict[int, np.ndarray] = {}
+        for symbol, hist_data in histories.items():
+            index = hist_data.index
+            # Bulk downloads share one index across symbols; convert it once
+            day = day_cache.get(id(index))
+            if day is None:
+                local = index.tz_localize(None) if index.tz is not None else index
+                nanos = np.asarray(local, dtype="datetime64[ns]").view(np.int64)
+                day = day_cache.setdefault(id(index), nanos // _NANOS_PER_DAY * _NANOS_PER_DAY)
+            index_name = index_name or index.name
+            symbols.append(symbol)
+            days.append(day)
+            closes.append(hist_data['Close'].to_numpy(dtype=np.float64))
+        if not symbols:
+            return cls(np.empty((0, 0), dtype=np.float32), [], pd.DatetimeIndex([]))
+
+        calendar = np.unique(np.concatenate(list({id(d): d for d in days}.values())))
+        prices = np.full((len(calendar), len(symbols)), np.nan)
+        for j, (day, close) in enumerate(zip(days, closes)):
+            valid = ~np.isnan(close)
+            if not valid.all():
+                day, close = day[valid], close[valid]
+            if len(day) > 1 and not (day[1:] > day[:-1]).all():
+                # Several bars on a day: the first occurrence in reversed order is the last close
+                day, last = np.unique(day[::-1], return_index=True)
+                close = close[::-1][last]
+            prices[np.searchsorted(calendar, day), j] = close
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = prices[1:] / prices[:-1] - 1.0
+        return cls(returns, symbols, pd.DatetimeIndex(calendar[1:].view("datetime64[ns]"), name=index_name))
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "ReturnPanel":
+        return cls(frame.to_numpy(dtype=np.float32), list(frame.columns), pd.DatetimeIndex(frame.index))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.values.shape
+
+    @property
+    def empty(self) -> bool:
+        return self.values.size == 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes + 8 * len(self.dates) + (self.mask.nbytes if self.mask is not None else 0)
+
+    def column(self, symbol: str) -> np.ndarray:
+        """One symbol's observed returns (float32), missing days dropped"""
+        i = self._positions[symbol]
+        values = self.values[:, i]
+        return values if self.mask is None else values[self.mask[:, i]]
+
+    def select(self, symbols: List[str]) -> "ReturnPanel":
+        columns = [self._positions[s] for s in symbols]
+        mask = self.mask[:, columns] if self.mask is not None else None
+        return ReturnPanel(self.values[:, columns], symbols, self.dates, mask)
+
+    def matrix(self) -> np.ndarray:
+        """All values as a float64 matrix (NaN = missing) for precision-sensitive reductions"""
+        return self.values.astype(np.float64)
+
+    def aligned(self, window: Optional[int] = None) -> Tuple[np.ndarray, List[str], Any]:
+        """Trailing window of dates on which every symbol has a return, as a float64 matrix (rows = days)
+
+        Same rules as covariance.align_returns: symbols with no data in the window are dropped
+        first. Returns the matrix, its symbols and the last date used.
+        """
+        values = self.values[-window:] if window else self.values
+        dates = self.dates[-window:] if window else self.dates
+        if self.mask is None:
+            return values.astype(np.float64), list(self.symbols), dates[-1] if len(dates) else None
+        observed = self.mask[-window:] if window else self.mask
+        keep = observed.any(axis=0)
+        rows = observed[:, keep].all(axis=1)
+        end = dates[rows][-1] if rows.any() else None
+        return values[rows][:, keep].astype(np.float64), [s for s, k in zip(self.symbols, keep) if k], end
+
+    def correlation(self, min_periods: int = 1) -> np.ndarray:
+        """Pairwise-complete Pearson correlation, like DataFrame.corr, with float64 accumulators
+
+        Each pair uses the days both symbols were observed; pairs sharing fewer than min_periods
+        (or two) days are NaN. Sums are taken as masked matrix products in column blocks, so a
+        5000-symbol panel costs a few BLAS calls instead of 12.5 million pairwise loops.
+        """
+        n_rows, n_cols = self.values.shape
+        x = self.values.astype(np.float64)
+        if self.mask is None:
+            if n_rows < max(min_periods, 2):
+                return np.full((n_cols, n_cols), np.nan)
+            x -= x.mean(axis=0)
+            corr = x.T @ x
+            std = np.sqrt(np.diag(corr).copy())
+            with np.errstate(divide="ignore", invalid="ignore"):
+                corr /= std[:, None]
+                corr /= std[None, :]
+        else:
+            observed = self.mask.astype(np.float64)
+            # Centering on each column's mean leaves correlations unchanged and keeps the sums small
+            counts = self.mask.sum(axis=0)
+            means = np.divide(np.where(self.mask, x, 0.0).sum(axis=0), counts,
+                              out=np.zeros(n_cols), where=counts > 0)
+            x = np.where(self.mask, x - means, 0.0)
+            squares = x * x
+            corr = np.empty((n_cols, n_cols))
+            for start in range(0, n_cols, _CORRELATION_BLOCK):
+                block = slice(start, start + _CORRELATION_BLOCK)
+                n = observed.T @ observed[:, block]
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    sum_i = x.T @ observed[:, block]
+                    sum_j = observed.T @ x[:, block]
+                    var_i = squares.T @ observed[:, block] - sum_i * sum_i / n
+                    var_j = observed.T @ squares[:, block] - sum_j * sum_j / n
+                    cov = x.T @ x[:, block] - sum_i * sum_j / n
+                    cov /= np.sqrt(var_i * var_j)
+                cov[n < max(min_periods, 2)] = np.nan
+                corr[:, block] = cov
+        np.clip(corr, -1.0, 1.0, out=corr)
+        diagonal = np.diag(corr)
+        np.fill_diagonal(corr, np.where(np.isnan(diagonal), np.nan, 1.0))
+        return corr
+
+    def to_frame(self, dtype=np.float32) -> pd.DataFrame:
+        return pd.DataFrame(self.values.astype(dtype, copy=False), index=self.dates, columns=self.symbols)
+
+    def _date_ns(self) -> np.ndarray:
+        return np.asarray(self.dates, dtype="datetime64[ns]").view(np.int64)
+
+    def write_into(self, buffer) -> int:
+        """Serialize into a writable buffer of at least layout nbytes; returns the bytes used"""
+        header, offsets = panel_layout(*self.values.shape, self.mask is not None, self.symbols, self.dates.name)
+        view = memoryview(buffer).cast("B")
+        view[:len(header)] = header
+        rows, cols = self.values.shape
+        np.frombuffer(view, np.float32, rows * cols, offsets["values_offset"]).reshape(rows, cols)[:] = self.values
+        np.frombuffer(view, np.int64, rows, offsets["dates_offset"])[:] = self._date_ns()
+        if self.mask is not None:
+            np.frombuffer(view, np.bool_, rows * cols, offsets["mask_offset"]).reshape(rows, cols)[:] = self.mask
+        return offsets["nbytes"]
+
+    def serialized_size(self) -> int:
+        return panel_layout(*self.values.shape, self.mask is not None, self.symbols, self.dates.name)[1]["nbytes"]
+
+    def to_bytes(self) -> bytes:
+        buffer = bytearray(self.serialized_size())
+        self.write_into(buffer)
+        return bytes(buffer)
+
+    @classmethod
+    def from_buffer(cls, buffer) -> "ReturnPanel":
+        """View a serialized panel without copying its values (the buffer must outlive the panel)"""
+        view = memoryview(buffer).cast("B")
+        if bytes(view[:len(_MAGIC)]) != _MAGIC:
+            raise ValueError("Not a serialized ReturnPanel")
+        length = int.from_bytes(view[len(_MAGIC):len(_MAGIC) + 8], "little")
+        header = json.loads(bytes(view[len(_MAGIC) + 8:len(_MAGIC) + 8 + length]))
+        rows, cols = header["rows"], header["cols"]
+        values = np.frombuffer(view, np.float32, rows * cols, header["values_offset"]).reshape(rows, cols)
+        dates = pd.DatetimeIndex(np.frombuffer(view, np.int64, rows, header["dates_offset"]).view("datetime64[ns]"),
+                                 name=header["index_name"])
+        mask = None
+        if header["has_mask"]:
+            mask = np.frombuffer(view, np.bool_, rows * cols, header["mask_offset"]).reshape(rows, cols)
+        return cls(values, header["symbols"], dates, mask)
+
+    def save(self, path: str) -> str:
+        """Write the binary format; load() memory-maps it back"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "ReturnPanel":
+        return cls.from_buffer(np.memmap(path, dtype=np.uint8, mode="r"))
+
+
+_published: "OrderedDict[str, ReturnPanel]" = OrderedDict()
+_published_lock = threading.Lock()
+
+
+def publish_panel(panel: ReturnPanel) -> str:
+    """Register a panel in this process and return a handle the risk calculator tool accepts
+
+    Lets callers hand a large panel to the tool as {"panel": handle} instead of a JSON matrix.
+    The most recent RETURN_PANEL_MAX_PUBLISHED panels are kept.
+    """
+    handle = f"panel-{uuid.uuid4().hex[:16]}"
+    with _published_lock:
+        _published[handle] = panel
+        while len(_published) > ResearchConfig.RETURN_PANEL_MAX_PUBLISHED:
+            _published.popitem(last=False)
+    return handle
+
+
+def resolve_panel(reference: str) -> ReturnPanel:
+    """Panel for a handle from publish_panel or share_panel, or a path written by ReturnPanel.save"""
+    with _published_lock:
+        panel = _published.get(reference)
+    if panel is not None:
+        return panel
+    if reference.startswith(_SHM_PREFIX) or reference in _attached:
+        return attach_panel(reference)
+    if os.path.isfile(reference):
+        return ReturnPanel.load(reference)
+    raise KeyError(f"Unknown returns panel '{reference}'")
+
+
+class _SharedBlock(shared_memory.SharedMemory):
+    """SharedMemory that can be dropped while numpy views of it are alive (the mapping then closes with them)"""
+
+    def close(self):
+        try:
+            super().close()
+        except BufferError:
+            pass
+
+
+class SharedPanel:
+    """Serialized panel in a shared memory block or a memory-mapped file, owned by the process that made it
+
+    Other processes attach by handle (the block name or file path) and view the values without
+    copying. release() in the owner unlinks the storage; views other processes already hold
+    stay valid until they drop them, as with any unlinked shared memory or file.
+    """
+
+    def __init__(self, panel: ReturnPanel, mode: str = None):
+        mode = mode or ResearchConfig.RETURN_PANEL_SHARE_MODE
+        if mode not in ("shared_memory", "memmap"):
+            raise ValueError(f"Unknown panel share mode '{mode}', expected 'shared_memory' or 'memmap'")
+        size = panel.serialized_size()
+        self.owner_pid = os.getpid()
+        self._block = None
+        if mode == "shared_memory":
+            try:
+                self._block = _SharedBlock(name=f"{_SHM_PREFIX}{uuid.uuid4().hex[:16]}", create=True, size=size)
+            except OSError:
+                mode = "memmap"  # no (or too small) /dev/shm: fall back to a file
+        if self._block is not None:
+            panel.write_into(self._block.buf)
+            self.handle = self._block.name
+        else:
+            directory = os.path.abspath(os.path.join(ResearchConfig.DATASET_DIR, "panels"))
+            os.makedirs(directory, exist_ok=True)
+            self.handle = os.path.join(directory, f"{uuid.uuid4().hex[:16]}.rpanel")
+            panel.save(self.handle)
+        self.mode = mode
+        self.nbytes = size
+
+    def release(self):
+        """Close this process's mapping and, in the owner, remove the storage"""
+        if self._block is not None:
+            self._block.close()
+        if os.getpid() != self.owner_pid:
+            return  # forked children inherit the registry but never own the storage
+        if self._block is not None:
+            try:
+                self._block.unlink()
+            except FileNotFoundError:
+                pass
+        elif os.path.exists(self.handle):
+            os.remove(self.handle)
+
+
+_shared: "OrderedDict[str, SharedPanel]" = OrderedDict()
+_attached: Dict[str, Tuple[Any, ReturnPanel]] = {}
+_pins: Dict[str, int] = {}  # Open shared_panel() blocks per handle; pinned panels are never evicted
+_shared_lock = threading.Lock()
+
+
+def share_panel(panel: ReturnPanel, mode: str = None) -> str:
+    """Copy a panel once into shared memory (or a memmap file under DATASET_DIR/panels) for other processes
+
+    Returns a handle any process can pass to attach_panel or the risk calculator tool. This
+    process owns the storage until release_panel; beyond RETURN_PANEL_MAX_SHARED panels the
+    oldest one not in use by a shared_panel() block is released, and whatever is left is
+    released at interpreter exit.
+    """
+    return _share(panel, mode, pin=False)
+
+
+def _share(panel: ReturnPanel, mode: Optional[str], pin: bool) -> str:
+    shared = SharedPanel(panel, mode)
+    with _shared_lock:
+        _shared[shared.handle] = shared
+        if pin:
+            _pins[shared.handle] = 1
+        excess = len(_shared) - ResearchConfig.RETURN_PANEL_MAX_SHARED
+        idle = [h for h in _shared if h != shared.handle and not _pins.get(h)]
+        evicted = idle[:max(excess, 0)]
+    for handle in evicted:
+        release_panel(handle)
+    return shared.handle
+
+
+def _unpin(handle: str) -> int:
+    with _shared_lock:
+        count = _pins.get(handle, 1) - 1
+        if count > 0:
+            _pins[handle] = count
+        else:
+            _pins.pop(handle, None)
+        return count
+
+
+def attach_panel(handle: str) -> ReturnPanel:
+    """Read-only, zero-copy view of a shared panel; cached, so each process maps a handle once"""
+    with _shared_lock:
+        entry = _attached.get(handle)
+        if entry is not None:
+            return entry[1]
+        if handle.startswith(_SHM_PREFIX):
+            try:
+                block = _SharedBlock(name=handle)
+            except FileNotFoundError:
+                raise KeyError(f"Shared returns panel '{handle}' was released or never existed")
+            panel = ReturnPanel.from_buffer(block.buf)
+        elif os.path.isfile(handle):
+            block = None
+            panel = ReturnPanel.load(handle)
+        else:
+            raise KeyError(f"Unknown shared returns panel '{handle}'")
+        for array in (panel.values, panel.mask):
+            if array is not None:
+                array.flags.writeable = False
+        _attached[handle] = (block, panel)
+        return panel
+
+
+def release_panel(handle: str):
+    """Drop this process's view of a shared panel and, if this process shared it, free the storage"""
+    with _shared_lock:
+        shared = _shared.pop(handle, None)
+        block, _ = _attached.pop(handle, (None, None))
+    if block is not None:
+        block.close()  # arrays callers still hold keep the mapping until they are dropped
+    if shared is not None:
+        shared.release()
+
+
+@atexit.register
+def release_shared_panels():
+    """Release every panel this process shared or attached"""
+    with _shared_lock:
+        handles = list(_shared) + [h for h in _attached if h not in _shared]
+    for handle in handles:
+        release_panel(handle)
+
+
+@contextmanager
+def shared_panel(panel: Union[ReturnPanel, str], mode: str = None):
+    """Handle other processes can attach to for the duration of the block
+
+    A handle that is already cross-process (shared memory or a panel file) is passed through
+    and left alone; a panel, or an in-process publish_panel handle, is shared and released on exit.
+    Either way the handle is pinned while the block runs, so share_panel's eviction skips it.
+    """
+    if isinstance(panel, str):
+        if panel.startswith(_SHM_PREFIX) or (panel not in _published and os.path.isfile(panel)):
+            with _shared_lock:
+                _pins[panel] = _pins.get(panel, 0) + 1
+            try:
+                yield panel
+            finally:
+                _unpin(panel)
+            return
+        panel = resolve_panel(panel)
+    handle = _share(panel, mode, pin=True)
+    try:
+        yield handle
+    finally:
+        if _unpin(handle) == 0:
+            release_panel(handle)
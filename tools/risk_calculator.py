@@ -1,11 +1,74 @@
 import numpy as np
 import pandas as pd
-from scipy import stats
 import json
+import hashlib
 from datetime import datetime
-from langchain.tools import Tool
-from typing import List, Dict, Any
+from statistics import NormalDist
+from typing import List, Dict, Any, Optional, Tuple, Union
 from config.settings import ResearchConfig
+from tools.metrics_engine import RiskMetricsEngine
+from tools.monte_carlo import MonteCarloVaR
+from tools.covariance import get_covariance_engine, portfolio_volatility
+from tools.portfolio_optimizer import PortfolioOptimizer
+from tools.return_panel import ReturnPanel, resolve_panel, shared_panel
+from utils.process_pool import pool_map
+from utils.tracing import traced, current_span
+
+_STANDARD_NORMAL = NormalDist()
+
+
+def _normal_quantiles(probabilities: np.ndarray) -> np.ndarray:
+    """Standard normal quantiles; the stdlib inverse CDF saves importing scipy.stats (~1s) at startup"""
+    return np.array([_STANDARD_NORMAL.inv_cdf(float(p)) for p in probabilities])
+
+def _returns_matrix(returns: Union[ReturnPanel, np.ndarray, List],
+                    complete: bool = True) -> Tuple[np.ndarray, Optional[List[str]]]:
+    """float64 matrix plus the panel's symbols (None for plain arrays)
+
+    Panels are upcast here so every reduction accumulates in float64; with complete, only the
+    dates on which every symbol has a return are kept (as the covariance engine aligns them).
+    """
+    if isinstance(returns, ReturnPanel):
+        if complete:
+            matrix, symbols, _ = returns.aligned()
+            return matrix, symbols
+        return returns.matrix(), list(returns.symbols)
+    return np.asarray(returns, dtype=np.float64), None
+
+def _level_label(confidence: float) -> str:
+    """Percent label used in VaR result keys: 0.95 -> "95", 0.975 -> "97.5" (to 1e-4 percent, so float32
+    inputs still map to the usual keys; levels closer than that are rejected as duplicates)"""
+    return f"{round(float(confidence) * 100, 4):.10g}"
+
+def _confidence_level_error(confidence_levels: List[float]) -> Optional[str]:
+    """Error message for confidence levels outside (0, 1), e.g. 95 passed for 0.95, or repeated levels"""
+    try:
+        levels = np.asarray(confidence_levels, dtype=np.float64).ravel()
+    except (TypeError, ValueError):
+        levels = np.array([np.nan])
+    if not levels.size or not ((levels > 0.0) & (levels < 1.0)).all():
+        return (f"Confidence levels must be fractions between 0 and 1 (e.g. 0.95, not 95); "
+                f"got {list(confidence_levels)}")
+    labels = [_level_label(level) for level in levels]
+    if len(set(labels)) != len(labels):
+        return f"Confidence levels must be distinct; got {[f'{label}%' for label in labels]}"
+    return None
+
+def _var_entries(table: Dict[str, np.ndarray], column: int, confidence_levels: List[float]) -> Dict[str, float]:
+    """VaR_<level>%_historical / _parametric and CVaR_<level>% for one column of a _var_table result"""
+    entries = {}
+    for i, confidence in enumerate(confidence_levels):
+        label = _level_label(confidence)
+        entries[f"VaR_{label}%_historical"] = round(float(table["VaR_historical"][column, i]), 6)
+        entries[f"VaR_{label}%_parametric"] = round(float(table["VaR_parametric"][column, i]), 6)
+        entries[f"CVaR_{label}%"] = round(float(table["CVaR"][column, i]), 6)
+    return entries
+
+def _run_job(job: Dict[str, Any]) -> Any:
+    try:
+        return run_calculation(job)
+    except Exception as e:
+        return {"error": str(e)}
 
 class RiskCalculator:
     @staticmethod
@@ -16,29 +79,148 @@ class RiskCalculator:
         
         if len(returns) == 0:
             return {"error": "No returns provided for VaR calculation"}
+        level_error = _confidence_level_error(confidence_levels)
+        if level_error:
+            return {"error": level_error}
         
-        returns_array = np.array(returns)
-        var_results = {}
+        returns_array = np.asarray(returns, dtype=np.float64).reshape(-1, 1)
+        table = RiskCalculator._var_table(returns_array, confidence_levels)
+        return _var_entries(table, 0, confidence_levels)
+    
+    @staticmethod
+    def calculate_value_at_risk_panel(panel: ReturnPanel,
+                                      confidence_levels: List[float] = None) -> Dict[str, Dict[str, float]]:
+        """calculate_value_at_risk for every symbol of a panel, each over its own observed days
+        
+        Fully observed columns share one batched sort; only columns with gaps go one at a time.
+        """
+        if confidence_levels is None:
+            confidence_levels = ResearchConfig.CONFIDENCE_LEVELS
+        level_error = _confidence_level_error(confidence_levels)
+        if level_error:
+            return {"error": level_error}
+        complete = np.ones(len(panel.symbols), dtype=bool) if panel.mask is None else panel.mask.all(axis=0)
+        results = {}
+        if complete.any() and len(panel.dates):
+            table = RiskCalculator._var_table(panel.values[:, complete].astype(np.float64), confidence_levels)
+            for j, symbol in enumerate(s for s, c in zip(panel.symbols, complete) if c):
+                results[symbol] = _var_entries(table, j, confidence_levels)
+        for symbol in panel.symbols:
+            if symbol not in results:
+                results[symbol] = RiskCalculator.calculate_value_at_risk(panel.column(symbol), confidence_levels)
+        return {symbol: results[symbol] for symbol in panel.symbols}
+    
+    @staticmethod
+    def calculate_value_at_risk_batch(returns_matrix: np.ndarray, confidence_levels: List[float] = None,
+                                      weights: np.ndarray = None, labels: List[str] = None) -> Dict[str, Any]:
+        """Historical, parametric VaR and CVaR for every column of a returns matrix at many confidence levels
+        
+        With weights (one row per portfolio), each row is applied to the returns matrix first and
+        the results are per portfolio instead of per column. Result arrays are portfolios x levels.
+        """
+        if confidence_levels is None:
+            confidence_levels = ResearchConfig.CONFIDENCE_LEVELS
+        level_error = _confidence_level_error(confidence_levels)
+        if level_error:
+            return {"error": level_error}
         
-        for confidence in confidence_levels:
-            var_historical = np.percentile(returns_array, (1 - confidence) * 100)
-            mean_return = np.mean(returns_array)
-            std_return = np.std(returns_array)
-            var_parametric = mean_return + std_return * stats.norm.ppf(1 - confidence)
+        try:
+            returns_matrix, panel_symbols = _returns_matrix(returns_matrix)
+            if labels is None and weights is None:
+                labels = panel_symbols
+            if returns_matrix.ndim == 1:
+                returns_matrix = returns_matrix[:, None]
+            if returns_matrix.size == 0:
+                return {"error": "No returns provided for VaR calculation"}
+            if not np.isfinite(returns_matrix).all():
+                return {"error": "Returns matrix contains missing or non-finite values"}
+            
+            if weights is not None:
+                weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+                returns_matrix = returns_matrix @ weights.T
+            
+            if labels is not None and len(labels) != returns_matrix.shape[1]:
+                kind = "portfolios" if weights is not None else "columns"
+                return {"error": f"Got {len(labels)} labels for {returns_matrix.shape[1]} {kind}"}
+            table = RiskCalculator._var_table(returns_matrix, confidence_levels)
+            if labels is None:
+                prefix = "portfolio" if weights is not None else "series"
+                labels = [f"{prefix}_{i}" for i in range(returns_matrix.shape[1])]
             
-            # Conditional VaR (Expected Shortfall)
-            cvar = returns_array[returns_array <= var_historical].mean()
+            result = {"confidence_levels": list(confidence_levels), "labels": list(labels)}
+            result.update({name: np.round(values, 6).tolist() for name, values in table.items()})
+            return result
+        
+        except Exception as e:
+            return {"error": str(e)}
+    
+    @staticmethod
+    def calculate_monte_carlo_var(returns_matrix: np.ndarray, weights: np.ndarray = None,
+                                  confidence_levels: List[float] = None, n_paths: int = None,
+                                  method: str = "normal", seed: int = None,
+                                  workers: int = None, chunk_size: int = None) -> Dict[str, Any]:
+        """Monte Carlo VaR/CVaR from normal, Student-t or bootstrapped scenarios of the returns matrix"""
+        try:
+            returns_matrix, _ = _returns_matrix(returns_matrix)
+            if returns_matrix.ndim == 1:
+                returns_matrix = returns_matrix[:, None]
+            if returns_matrix.size == 0:
+                return {"error": "No returns provided for Monte Carlo VaR calculation"}
+            level_error = _confidence_level_error(confidence_levels or ResearchConfig.CONFIDENCE_LEVELS)
+            if level_error:
+                return {"error": level_error}
+            if weights is None or len(weights) == 0:
+                weights = np.full(returns_matrix.shape[1], 1.0 / returns_matrix.shape[1])
             
-            var_results[f"VaR_{int(confidence*100)}%_historical"] = round(var_historical, 6)
-            var_results[f"VaR_{int(confidence*100)}%_parametric"] = round(var_parametric, 6)
-            var_results[f"CVaR_{int(confidence*100)}%"] = round(cvar, 6)
+            simulation = MonteCarloVaR(returns_matrix, weights, method=method).run(
+                n_paths=n_paths, confidence_levels=confidence_levels, seed=seed,
+                chunk_size=chunk_size, workers=workers
+            )
+            return {
+                key: np.round(value, 6).tolist() if isinstance(value, np.ndarray) else value
+                for key, value in simulation.items()
+            }
+        
+        except Exception as e:
+            return {"error": str(e)}
+    
+    @staticmethod
+    def _var_table(returns_matrix: np.ndarray, confidence_levels: List[float]) -> Dict[str, np.ndarray]:
+        """VaR/CVaR arrays (columns x levels) from a single sort of each column"""
+        observations = returns_matrix.shape[0]
+        tail_probs = 1.0 - np.asarray(confidence_levels, dtype=np.float64)
+        ordered = np.sort(returns_matrix, axis=0)
+        
+        # Linear interpolation between order statistics, as np.percentile does
+        position = (observations - 1) * tail_probs
+        lower = np.floor(position).astype(int)
+        upper = np.ceil(position).astype(int)
+        fraction = (position - lower)[:, None]
+        var_historical = ordered[lower] + fraction * (ordered[upper] - ordered[lower])  # levels x columns
+        
+        mean_return = returns_matrix.mean(axis=0)
+        std_return = returns_matrix.std(axis=0)
+        var_parametric = mean_return[None, :] + std_return[None, :] * _normal_quantiles(tail_probs)[:, None]
+        
+        # Expected shortfall: mean of the k worst observations, k = count at or below VaR
+        cumulative = np.cumsum(ordered, axis=0)
+        columns = np.arange(returns_matrix.shape[1])
+        cvar = np.empty_like(var_historical)
+        for i in range(len(tail_probs)):
+            tail_count = np.maximum((ordered <= var_historical[i]).sum(axis=0), 1)
+            cvar[i] = cumulative[tail_count - 1, columns] / tail_count
         
-        return var_results
+        return {
+            "VaR_historical": var_historical.T,
+            "VaR_parametric": var_parametric.T,
+            "CVaR": cvar.T,
+        }
     
     @staticmethod
     def calculate_portfolio_metrics(weights: List[float], returns_matrix: np.ndarray) -> Dict[str, float]:
         """Calculate portfolio risk metrics for research"""
         try:
+            returns_matrix, _ = _returns_matrix(returns_matrix)
             if len(weights) == 0 or returns_matrix.size == 0:
                 return {"error": "Weights or returns matrix missing for portfolio calculation"}
             
@@ -62,31 +244,228 @@ class RiskCalculator:
         except Exception as e:
             return {"error": str(e)}
 
-def create_risk_calculator_tool():
-    def risk_wrapper(input_str: str) -> str:
+    @staticmethod
+    def calculate_asset_metrics(returns_matrix: np.ndarray, symbols: List[str] = None) -> Dict[str, Any]:
+        """Per-asset volatility, Sharpe, drawdown, skewness and kurtosis for every column of a returns matrix"""
         try:
-            data = json.loads(input_str)
-            calculation_type = data.get("calculation_type")
+            returns_matrix, panel_symbols = _returns_matrix(returns_matrix, complete=False)
+            symbols = symbols or panel_symbols
+            if returns_matrix.ndim == 1:
+                returns_matrix = returns_matrix[:, None]
+            if returns_matrix.size == 0:
+                return {"error": "Returns matrix missing for asset metrics calculation"}
+            
+            if symbols is None:
+                symbols = [f"asset_{i}" for i in range(returns_matrix.shape[1])]
+            if len(symbols) != returns_matrix.shape[1]:
+                return {"error": "Number of symbols does not match returns matrix columns"}
+            
+            table = RiskMetricsEngine.from_returns(returns_matrix, symbols)
+            return {
+                symbol: {metric: round(value, 6) for metric, value in table.row(symbol).items()}
+                for symbol in table.symbols
+            }
+        
+        except Exception as e:
+            return {"error": str(e)}
+
+    @staticmethod
+    def calculate_covariance(returns_matrix: np.ndarray, symbols: List[str] = None, method: str = None,
+                             window: int = None, weights: List[List[float]] = None) -> Dict[str, Any]:
+        """Covariance and correlation matrices (sample, EWMA or Ledoit-Wolf) plus sqrt(w'Σw) per weight vector"""
+        try:
+            returns_matrix, panel_symbols = _returns_matrix(returns_matrix, complete=False)
+            symbols = symbols or panel_symbols
+            if returns_matrix.ndim != 2 or returns_matrix.shape[0] < 2:
+                return {"error": "returns_matrix must have at least two rows (days) for covariance"}
+            if symbols is None:
+                symbols = [f"asset_{i}" for i in range(returns_matrix.shape[1])]
+            if len(symbols) != returns_matrix.shape[1]:
+                return {"error": "Number of symbols does not match returns matrix columns"}
+            
+            result = RiskCalculator._cached_covariance(returns_matrix, symbols, method, window)
+            output = {
+                "symbols": result["symbols"],
+                "method": result["method"],
+                "observations": result["observations"],
+                "shrinkage": result["shrinkage"],
+                "covariance": np.round(result["covariance"], 10).tolist(),
+                "correlation": np.round(result["correlation"], 6).tolist(),
+            }
+            if weights is not None:
+                weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+                if weights.shape[1] != len(result["symbols"]):
+                    return {"error": "Each weight vector needs one weight per symbol with complete data"}
+                output["portfolio_volatility_annualized"] = np.round(
+                    portfolio_volatility(result["covariance"], weights), 6
+                ).tolist()
+            return output
+        
+        except Exception as e:
+            return {"error": str(e)}
+
+    @staticmethod
+    def optimize_portfolio(returns_matrix: np.ndarray, symbols: List[str] = None, objective: str = "min_variance",
+                           long_only: bool = True, n_points: int = None, method: str = None, window: int = None,
+                           expected_returns: List[float] = None, include_weights: bool = True) -> Dict[str, Any]:
+        """Min-variance, max-Sharpe, risk-parity or efficient-frontier portfolios on the cached covariance
+        
+        Expected returns default to the mean daily return over the covariance window; explicit
+        expected_returns are annualized and follow the symbols order.
+        """
+        try:
+            returns_matrix, panel_symbols = _returns_matrix(returns_matrix, complete=False)
+            symbols = symbols or panel_symbols
+            if returns_matrix.ndim != 2 or returns_matrix.shape[0] < 2:
+                return {"error": "returns_matrix must have at least two rows (days) for optimization"}
+            if symbols is None:
+                symbols = [f"asset_{i}" for i in range(returns_matrix.shape[1])]
+            if len(symbols) != returns_matrix.shape[1]:
+                return {"error": "Number of symbols does not match returns matrix columns"}
             
-            if calculation_type == "VaR":
-                result = RiskCalculator.calculate_value_at_risk(data.get("returns", []))
-            elif calculation_type == "portfolio":
-                result = RiskCalculator.calculate_portfolio_metrics(
-                    data.get("weights", []), 
-                    np.array(data.get("returns_matrix", []))
-                )
+            result = RiskCalculator._cached_covariance(returns_matrix, symbols, method, window)
+            if expected_returns is not None:
+                if len(expected_returns) != len(symbols):
+                    return {"error": "expected_returns needs one value per symbol"}
+                lookup = dict(zip(symbols, expected_returns))
+                mu = np.array([lookup[s] for s in result["symbols"]], dtype=np.float64) / 252
             else:
-                result = {"error": "Unknown calculation type"}
+                frame = pd.DataFrame(returns_matrix, columns=symbols)[result["symbols"]]
+                mu = frame.dropna().iloc[-result["observations"]:].mean().to_numpy()
             
-            return json.dumps(result, indent=2)
+            optimizer = PortfolioOptimizer(result["covariance"], mu, result["symbols"], long_only=long_only)
+            output = optimizer.optimize(objective, n_points, include_weights)
+            output["covariance_method"] = result["method"]
+            output["observations"] = result["observations"]
+            return output
+        
+        except Exception as e:
+            return {"error": str(e)}
+
+    @staticmethod
+    @traced("risk.portfolio_jobs")
+    def run_portfolio_jobs(panel: Union[ReturnPanel, str], jobs: List[Dict[str, Any]],
+                           workers: int = None) -> Dict[str, Any]:
+        """Run risk_calculator payloads (per-portfolio VaR, optimization, ...) against one panel in parallel
+
+        The panel is shared once (shared memory or a memmap file) and each worker of the shared
+        process pool attaches to it zero-copy, so only the small job dicts and their results are
+        pickled. A job's own symbols narrow the panel; results keep the order of jobs.
+        """
+        if not panel:
+            return {"error": "jobs need a returns panel"}
+        workers = max(1, min(int(workers or ResearchConfig.RISK_JOB_MAX_WORKERS), len(jobs) or 1))
+        current_span().set(jobs=len(jobs), workers=workers)
+        if workers == 1:
+            results = [_run_job({**job, "panel": panel}) for job in jobs]
+        else:
+            # Each pool worker attaches the handle once (attach_panel caches it); workers=1 keeps
+            # Monte Carlo jobs simulating inline rather than fanning out again from inside the pool
+            with shared_panel(panel) as handle:
+                pooled = [{**job, "panel": handle, "workers": 1} for job in jobs]
+                results = list(pool_map(_run_job, pooled, workers))
+        return {"jobs": len(jobs), "workers": workers, "results": results}
+
+    @staticmethod
+    def _cached_covariance(returns_matrix: np.ndarray, symbols: List[str], method: str = None,
+                           window: int = None) -> Dict[str, Any]:
+        # Matrices arrive without dates, so the cache is keyed on their content instead
+        fingerprint = hashlib.sha1(returns_matrix.tobytes()).hexdigest()
+        return get_covariance_engine().compute(
+            pd.DataFrame(returns_matrix, columns=symbols), method, window or -1, as_of=fingerprint
+        )
+
+def _tool_returns(data: Dict[str, Any]) -> Union[ReturnPanel, np.ndarray]:
+    """Returns input of a tool call: a panel (object, handle or path; no JSON matrix), else the JSON matrix"""
+    if data.get("panel"):
+        panel = data["panel"] if isinstance(data["panel"], ReturnPanel) else resolve_panel(data["panel"])
+        return panel.select(data["symbols"]) if data.get("symbols") else panel
+    return np.array(data.get("returns_matrix", data.get("returns", [])), dtype=float)
+
+def run_calculation(data: Dict[str, Any]) -> Any:
+    """Dispatch one risk_calculator payload (the tool's JSON input, already parsed)"""
+    calculation_type = data.get("calculation_type")
+    if calculation_type == "VaR" and data.get("panel"):
+        return RiskCalculator.calculate_value_at_risk_panel(_tool_returns(data), data.get("confidence_levels"))
+    elif calculation_type == "VaR":
+        return RiskCalculator.calculate_value_at_risk(data.get("returns", []), data.get("confidence_levels"))
+    elif calculation_type == "VaR_batch":
+        return RiskCalculator.calculate_value_at_risk_batch(
+            _tool_returns(data),
+            data.get("confidence_levels"),
+            data.get("weights"),
+            data.get("labels")
+        )
+    elif calculation_type == "monte_carlo_VaR":
+        return RiskCalculator.calculate_monte_carlo_var(
+            _tool_returns(data),
+            data.get("weights"),
+            data.get("confidence_levels"),
+            data.get("n_paths"),
+            data.get("method", "normal"),
+            data.get("seed"),
+            data.get("workers")
+        )
+    elif calculation_type == "portfolio":
+        return RiskCalculator.calculate_portfolio_metrics(
+            data.get("weights", []), 
+            _tool_returns(data)
+        )
+    elif calculation_type == "covariance":
+        return RiskCalculator.calculate_covariance(
+            _tool_returns(data),
+            data.get("symbols"),
+            data.get("method"),
+            data.get("window"),
+            data.get("weights")
+        )
+    elif calculation_type == "optimize":
+        return RiskCalculator.optimize_portfolio(
+            _tool_returns(data),
+            data.get("symbols"),
+            data.get("objective", "min_variance"),
+            data.get("long_only", True),
+            data.get("n_points"),
+            data.get("method"),
+            data.get("window"),
+            data.get("expected_returns"),
+            data.get("include_weights", data.get("objective") != "frontier")
+        )
+    elif calculation_type == "asset_metrics":
+        return RiskCalculator.calculate_asset_metrics(
+            _tool_returns(data),
+            data.get("symbols")
+        )
+    elif calculation_type == "jobs":
+        return RiskCalculator.run_portfolio_jobs(data.get("panel"), data.get("jobs", []), data.get("workers"))
+    else:
+        return {"error": "Unknown calculation type"}
+
+def create_risk_calculator_tool():
+    from langchain.tools import Tool  # deferred: LangChain is slow to import and only agents need it
+    @traced("tool_call.risk_calculator")
+    def risk_wrapper(input_str: str) -> str:
+        try:
+            data = json.loads(input_str)
+            current_span().set(calculation_type=data.get("calculation_type"))
+            return json.dumps(run_calculation(data), indent=2)
         except Exception as e:
             return json.dumps({"error": str(e)}, indent=2)
     
     return Tool(
         name="risk_calculator",
         description=(
-            "Perform advanced financial risk calculations (VaR, CVaR, portfolio metrics). "
-            "Input: JSON with calculation_type ('VaR' or 'portfolio'), returns, and/or weights."
+            "Perform advanced financial risk calculations (VaR, CVaR, portfolio metrics, per-asset metrics, "
+            "covariance/correlation, portfolio optimization). Input: JSON with calculation_type ('VaR', "
+            "'VaR_batch', 'monte_carlo_VaR', 'portfolio', 'asset_metrics', 'covariance', 'optimize' or 'jobs'), "
+            "returns, returns_matrix (rows = days, columns = assets), symbols, confidence_levels and/or "
+            "weights ('VaR_batch', 'monte_carlo_VaR' and 'covariance' accept one weight vector per portfolio). "
+            "'monte_carlo_VaR' also takes n_paths, seed and method ('normal', 'student_t' or 'bootstrap'); "
+            "'covariance' and 'optimize' take method ('sample', 'ewma' or 'ledoit_wolf') and window; 'optimize' "
+            "takes objective ('min_variance', 'max_sharpe', 'risk_parity' or 'frontier'), long_only, n_points, "
+            "expected_returns (annualized) and include_weights. Instead of returns_matrix, panel may name a "
+            "published returns panel handle or saved panel file (optionally narrowed by symbols). 'jobs' runs a "
+            "list of these payloads (jobs, e.g. one per portfolio) against panel in parallel worker processes."
         ),
         func=risk_wrapper
     )
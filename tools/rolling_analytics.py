@@ -0,0 +1,307 @@
+import math
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from config.settings import ResearchConfig
+
+TRADING_DAYS = 252
+
+
+class _Moments:
+    """Running mean/variance of x and y and their co-moment, with Welford add/remove updates"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.m2_x = 0.0
+        self.m2_y = 0.0
+        self.c_xy = 0.0
+
+    def add(self, x: float, y: float):
+        self.n += 1
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.mean_x += dx / self.n
+        self.mean_y += dy / self.n
+        self.m2_x += dx * (x - self.mean_x)
+        self.m2_y += dy * (y - self.mean_y)
+        self.c_xy += dx * (y - self.mean_y)
+
+    def remove(self, x: float, y: float):
+        """Take out any one observation previously added (not only the oldest)"""
+        if self.n <= 1:
+            self.__init__()
+            return
+        n = self.n
+        mean_x = (n * self.mean_x - x) / (n - 1)
+        mean_y = (n * self.mean_y - y) / (n - 1)
+        self.m2_x -= (x - mean_x) * (x - self.mean_x)
+        self.m2_y -= (y - mean_y) * (y - self.mean_y)
+        self.c_xy -= (x - mean_x) * (y - self.mean_y)
+        self.mean_x, self.mean_y, self.n = mean_x, mean_y, n - 1
+
+
+class RollingMoments:
+    """Windowed mean/variance of x and covariance with y via Welford add/remove updates, O(1) per step
+
+    y may be None (no benchmark return for that bar): x statistics still include the bar, but
+    the covariance / beta moments are taken over the bars that have both.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self._x = _Moments()
+        self._pairs = _Moments()
+
+    @property
+    def n(self) -> int:
+        return self._x.n
+
+    @property
+    def mean_x(self) -> float:
+        return self._x.mean_x
+
+    def push(self, x: float, y: Optional[float] = None):
+        self.values.append((x, y))
+        self._add(x, y)
+        if len(self.values) > self.window:
+            self._remove(*self.values.popleft())
+
+    def replace_last(self, x: float, y: Optional[float] = None):
+        """Revise the most recent observation in place (the window keeps the same bars)"""
+        self._remove(*self.values[-1])
+        self.values[-1] = (x, y)
+        self._add(x, y)
+
+    def _add(self, x: float, y: Optional[float]):
+        self._x.add(x, 0.0)
+        if y is not None:
+            self._pairs.add(x, y)
+
+    def _remove(self, x: float, y: Optional[float]):
+        self._x.remove(x, 0.0)
+        if y is not None:
+            self._pairs.remove(x, y)
+
+    @property
+    def full(self) -> bool:
+        return self.n == self.window
+
+    def std_x(self) -> float:
+        return math.sqrt(max(self._x.m2_x, 0.0) / (self.n - 1)) if self.n > 1 else float("nan")
+
+    def beta(self) -> float:
+        return self._pairs.c_xy / self._pairs.m2_y if self._pairs.m2_y > 0 else float("nan")
+
+
+class RollingQuantile:
+    """Sorted window of values: O(log n) search per insert/remove, any quantile in O(1)"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.ordered: List[float] = []
+
+    def push(self, x: float):
+        self.values.append(x)
+        insort(self.ordered, x)
+        if len(self.values) > self.window:
+            del self.ordered[bisect_left(self.ordered, self.values.popleft())]
+
+    def replace_last(self, x: float):
+        del self.ordered[bisect_left(self.ordered, self.values[-1])]
+        insort(self.ordered, x)
+        self.values[-1] = x
+
+    def quantile(self, q: float) -> float:
+        """Linearly interpolated quantile, matching np.percentile"""
+        if not self.ordered:
+            return float("nan")
+        position = (len(self.ordered) - 1) * q
+        lower = math.floor(position)
+        upper = min(lower + 1, len(self.ordered) - 1)
+        return self.ordered[lower] + (position - lower) * (self.ordered[upper] - self.ordered[lower])
+
+
+class RollingDrawdown:
+    """Drawdown from the trailing window peak and its worst value over the window, via monotonic deques
+
+    Each push records what it dropped from the deques, so the latest bar can be revised.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.step = 0
+        self.peaks = deque()      # (step, price), prices decreasing
+        self.troughs = deque()    # (step, drawdown), drawdowns increasing
+        self._undo = None
+
+    def push(self, price: float) -> float:
+        self.step += 1
+        oldest = self.step - self.window
+        dropped = {"peaks": [], "peaks_expired": [], "troughs": [], "troughs_expired": []}
+
+        while self.peaks and self.peaks[-1][1] <= price:
+            dropped["peaks"].append(self.peaks.pop())
+        self.peaks.append((self.step, price))
+        while self.peaks[0][0] <= oldest:
+            dropped["peaks_expired"].append(self.peaks.popleft())
+
+        drawdown = price / self.peaks[0][1] - 1.0
+        while self.troughs and self.troughs[-1][1] >= drawdown:
+            dropped["troughs"].append(self.troughs.pop())
+        self.troughs.append((self.step, drawdown))
+        while self.troughs[0][0] <= oldest:
+            dropped["troughs_expired"].append(self.troughs.popleft())
+        self._undo = dropped
+        return drawdown
+
+    def replace_last(self, price: float) -> float:
+        """Undo the latest push, then push the revised price for the same step"""
+        if self._undo is None:
+            return self.push(price)
+        for name in ("peaks", "troughs"):
+            entries = getattr(self, name)
+            entries.pop()
+            entries.extend(reversed(self._undo[name]))
+            entries.extendleft(self._undo[f"{name}_expired"])
+        self.step -= 1
+        return self.push(price)
+
+    def max_drawdown(self) -> float:
+        return self.troughs[0][1] if self.troughs else float("nan")
+
+
+class RollingWindowTracker:
+    """Volatility, Sharpe, beta, historical VaR and drawdown over one fixed window of daily returns"""
+
+    def __init__(self, window: int, confidence_levels: List[float] = None, risk_free_rate: float = None):
+        self.window = window
+        self.confidence_levels = confidence_levels or ResearchConfig.CONFIDENCE_LEVELS
+        self.daily_rf = (ResearchConfig.RISK_FREE_RATE if risk_free_rate is None else risk_free_rate) / TRADING_DAYS
+        self.moments = RollingMoments(window)
+        self.quantiles = RollingQuantile(window)
+        self.drawdown = RollingDrawdown(window)
+
+    def push(self, ret: float, price: float, benchmark_ret: Optional[float] = None):
+        self.moments.push(ret, benchmark_ret)
+        self.quantiles.push(ret)
+        self.drawdown.push(price)
+
+    def replace_last(self, ret: float, price: float, benchmark_ret: Optional[float] = None):
+        self.moments.replace_last(ret, benchmark_ret)
+        self.quantiles.replace_last(ret)
+        self.drawdown.replace_last(price)
+
+    def snapshot(self, with_beta: bool = False) -> Dict[str, float]:
+        suffix = f"{self.window}d"
+        if not self.moments.full:
+            metrics = {f"volatility_{suffix}": float("nan"), f"sharpe_{suffix}": float("nan"),
+                       f"max_drawdown_{suffix}": float("nan")}
+            metrics.update({f"var_{int(c * 100)}_{suffix}": float("nan") for c in self.confidence_levels})
+            if with_beta:
+                metrics[f"beta_{suffix}"] = float("nan")
+            return metrics
+
+        std = self.moments.std_x()
+        sharpe = (self.moments.mean_x - self.daily_rf) / std * math.sqrt(TRADING_DAYS) if std > 0 else 0.0
+        metrics = {
+            f"volatility_{suffix}": std * math.sqrt(TRADING_DAYS),
+            f"sharpe_{suffix}": sharpe,
+            f"max_drawdown_{suffix}": self.drawdown.max_drawdown(),
+        }
+        for confidence in self.confidence_levels:
+            metrics[f"var_{int(confidence * 100)}_{suffix}"] = self.quantiles.quantile(1 - confidence)
+        if with_beta:
+            metrics[f"beta_{suffix}"] = self.moments.beta()
+        return metrics
+
+
+class RollingRiskTracker:
+    """Incrementally maintained rolling risk metrics for one symbol across several windows"""
+
+    def __init__(self, windows: List[int] = None, confidence_levels: List[float] = None):
+        self.windows = windows or ResearchConfig.ROLLING_WINDOWS
+        self.trackers = [RollingWindowTracker(w, confidence_levels) for w in self.windows]
+        self.last_price: Optional[float] = None
+        self.last_benchmark: Optional[float] = None
+        self.previous_price: Optional[float] = None
+        self.previous_benchmark: Optional[float] = None
+        self.has_benchmark = False
+
+    def update(self, price: float, benchmark_price: Optional[float] = None,
+               replace_last: bool = False) -> Dict[str, float]:
+        """Append one bar and return the refreshed metrics for every window
+
+        With replace_last, the price revises the latest bar instead (an intraday refresh of the
+        current session): its return is recomputed from the bar before and swapped into every window.
+        """
+        if benchmark_price is not None:
+            self.has_benchmark = True
+
+        revise = replace_last and self.last_price is not None
+        base_price = self.previous_price if revise else self.last_price
+        base_benchmark = self.previous_benchmark if revise else self.last_benchmark
+        if base_price is not None:
+            ret = price / base_price - 1.0
+            benchmark_ret = None
+            if benchmark_price is not None and base_benchmark is not None:
+                benchmark_ret = benchmark_price / base_benchmark - 1.0
+            for tracker in self.trackers:
+                if revise:
+                    tracker.replace_last(ret, price, benchmark_ret)
+                else:
+                    tracker.push(ret, price, benchmark_ret)
+
+        if not revise:
+            self.previous_price, self.previous_benchmark = self.last_price, self.last_benchmark
+        self.last_price = price
+        self.last_benchmark = benchmark_price
+        return self.snapshot()
+
+    def snapshot(self) -> Dict[str, float]:
+        metrics = {}
+        for tracker in self.trackers:
+            metrics.update(tracker.snapshot(with_beta=self.has_benchmark))
+        return metrics
+
+
+class RollingRiskMonitor:
+    """One RollingRiskTracker per symbol, advanced bar by bar for intraday or daily refreshes"""
+
+    def __init__(self, windows: List[int] = None, confidence_levels: List[float] = None):
+        self.windows = windows
+        self.confidence_levels = confidence_levels
+        self.trackers: Dict[str, RollingRiskTracker] = {}
+
+    def update(self, prices: Dict[str, float], benchmark_price: Optional[float] = None,
+               replace_last: bool = False) -> Dict[str, Dict[str, float]]:
+        """Advance each symbol by one bar, or with replace_last revise each symbol's latest bar"""
+        results = {}
+        for symbol, price in prices.items():
+            if price is None or not np.isfinite(price):
+                continue
+            tracker = self.trackers.get(symbol)
+            if tracker is None:
+                tracker = self.trackers[symbol] = RollingRiskTracker(self.windows, self.confidence_levels)
+            results[symbol] = tracker.update(price, benchmark_price, replace_last)
+        return results
+
+
+def compute_rolling_metrics(prices: pd.Series, benchmark: Optional[pd.Series] = None,
+                            windows: List[int] = None, confidence_levels: List[float] = None) -> pd.DataFrame:
+    """Rolling metric time series for one price history in a single O(T) pass"""
+    prices = prices.dropna()
+    bench_values = [None] * len(prices)
+    if benchmark is not None:
+        aligned = benchmark.reindex(prices.index).ffill().to_numpy(dtype=np.float64)
+        bench_values = [float(b) if np.isfinite(b) else None for b in aligned]
+
+    tracker = RollingRiskTracker(windows, confidence_levels)
+    rows = [tracker.update(float(price), bench)
+            for price, bench in zip(prices.to_numpy(dtype=np.float64), bench_values)]
+    return pd.DataFrame(rows, index=prices.index)
@@ -0,0 +1,143 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Optional
+from config.settings import ResearchConfig
+from utils.sqlite_cache import SQLiteKVCache
+from utils.tracing import record_cache_lookup
+
+_NON_WORD = re.compile(r"[^\w\s.&-]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold, drop punctuation and collapse whitespace so near-identical queries share an entry"""
+    return _WHITESPACE.sub(" ", _NON_WORD.sub(" ", query.lower())).strip()
+
+
+class SearchResultCache:
+    """Persistent cache for research search results with in-flight request coalescing
+
+    Successful results are stored in SQLite keyed on the normalized query and focus. While a
+    query is being fetched, identical concurrent lookups wait on the same future instead of
+    issuing their own network call.
+    """
+
+    def __init__(self, path: str = None, ttl_hours: float = None, max_entries: int = None):
+        ttl_hours = ResearchConfig.SEARCH_CACHE_TTL_HOURS if ttl_hours is None else ttl_hours
+        self.store = SQLiteKVCache(
+            path or os.path.join(ResearchConfig.CACHE_DIR, "search_cache.sqlite"),
+            ttl_seconds=ttl_hours * 3600 if ttl_hours else None,
+            max_entries=max_entries or ResearchConfig.SEARCH_CACHE_MAX_ENTRIES,
+        )
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.latency_saved_ms = 0.0
+
+    @staticmethod
+    def make_key(query: str, focus: str) -> str:
+        payload = json.dumps({"query": normalize_query(query), "focus": normalize_query(focus)}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_or_fetch(self, query: str, focus: str,
+                     fetch: Callable[[str, str], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return a cached result, join an identical in-flight fetch, or call fetch(query, focus)
+
+        The returned dict's "http" entry records whether it was a cache "hit", "coalesced"
+        or "miss", and for misses the network latency and attempt count.
+        """
+        key = self.make_key(query, focus)
+        start = time.perf_counter()
+
+        cached = self.store.get(key)
+        if cached is not None:
+            entry = json.loads(cached)
+            with self._lock:
+                self.hits += 1
+                self.latency_saved_ms += entry["latency_ms"]
+            return self._annotate(entry["result"], "hit", start)
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            result = future.result()
+            with self._lock:
+                self.latency_saved_ms += result.get("http", {}).get("latency_ms", 0.0)
+            return self._annotate(result, "coalesced", start)
+
+        record_cache_lookup("search", "miss")
+        try:
+            result = fetch(query, focus)
+            # Store before leaving the in-flight map, so no lookup can miss both and fetch again.
+            # Errors are not cached so a transient failure is retried on the next lookup
+            if "error" not in result:
+                stored = {k: v for k, v in result.items() if k != "http"}
+                latency_ms = result.get("http", {}).get("latency_ms", 0.0)
+                self.store.set(key, json.dumps({"result": stored, "latency_ms": latency_ms}))
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+        http = dict(result.get("http", {}), cache="miss")
+        return {**result, "http": http}
+
+    @staticmethod
+    def _annotate(result: Dict[str, Any], status: str, start: float) -> Dict[str, Any]:
+        record_cache_lookup("search", status)
+        elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+        return {**result, "http": {"latency_ms": elapsed_ms, "attempts": 0, "cache": status}}
+
+    def clear(self):
+        self.store.clear()
+        with self._lock:
+            self.hits = self.misses = self.coalesced = 0
+            self.latency_saved_ms = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookups served from cache or coalesced, i.e. API calls and network latency avoided"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            saved = self.hits + self.coalesced
+            return {
+                "entries": len(self.store),
+                "lookups": lookups,
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+                "hit_rate": round(saved / lookups, 4) if lookups else 0.0,
+                "api_calls_saved": saved,
+                "latency_saved_ms": round(self.latency_saved_ms, 2),
+            }
+
+
+_shared_cache: Optional[SearchResultCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[SearchResultCache]:
+    """Process-wide search cache, or None when SEARCH_CACHE_ENABLED is off"""
+    global _shared_cache
+    if not ResearchConfig.SEARCH_CACHE_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = SearchResultCache()
+        return _shared_cache
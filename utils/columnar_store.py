@@ -0,0 +1,225 @@
+import os
+import json
+import shutil
+import importlib.util
+from typing import Dict, Any, List, Union
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+from config.settings import ResearchConfig
+from tools.return_panel import ReturnPanel
+
+# pyarrow is optional (we fall back to .npy columns); check for it without paying for the import
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+META_FILE = "meta.json"
+
+
+def default_format() -> str:
+    fmt = ResearchConfig.COLUMNAR_FORMAT
+    return "npy" if fmt == "parquet" and not HAS_PYARROW else fmt
+
+
+def write_frame(frame: pd.DataFrame, path: str, fmt: str = None) -> str:
+    """Write a table as Parquet (``path``.parquet) or a directory of .npy columns (``path``/)
+
+    Text columns are kept as strings; mixed columns (numbers alongside 'N/A') become float
+    with NaN. Returns the written path.
+    """
+    fmt = fmt or default_format()
+    frame = _normalize_columns(frame)
+    if fmt == "parquet":
+        if not HAS_PYARROW:
+            raise ImportError("Parquet output needs pyarrow: pip install pyarrow")
+        target = path + ".parquet"
+        frame.to_parquet(target, compression="zstd")
+        return target
+    if fmt != "npy":
+        raise ValueError(f"Unknown columnar format '{fmt}', expected 'parquet' or 'npy'")
+
+    # Build next to the target and swap in, so readers never see a half-written directory
+    staging = path + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    is_dates = isinstance(frame.index, pd.DatetimeIndex)
+    index = frame.index.tz_localize(None) if is_dates and frame.index.tz is not None else frame.index
+    # Dates are stored as int64 nanoseconds whatever resolution the index uses
+    np.save(os.path.join(staging, "index.npy"),
+            index.to_numpy(dtype="datetime64[ns]").view(np.int64) if is_dates else index.astype(str).to_numpy(dtype=str))
+    columns = [str(c) for c in frame.columns]
+    for i, column in enumerate(frame.columns):
+        values = frame[column]
+        array = values.to_numpy() if is_numeric_dtype(values) else values.to_numpy(dtype=str)
+        np.save(os.path.join(staging, f"c{i}.npy"), array)
+    with open(os.path.join(staging, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"columns": columns, "index": "datetime" if is_dates else "label",
+                   "index_name": frame.index.name, "rows": len(frame)}, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+    return path
+
+
+def _normalize_columns(frame: pd.DataFrame) -> pd.DataFrame:
+    frame = frame.copy()
+    frame.columns = [str(c) for c in frame.columns]
+    for column in frame.columns:
+        values = frame[column]
+        if is_numeric_dtype(values):
+            continue
+        present = values.dropna()
+        if len(present) and all(isinstance(v, str) for v in present):
+            frame[column] = values.fillna("").astype(str)
+        else:
+            frame[column] = pd.to_numeric(values, errors="coerce")
+    return frame
+
+
+class ColumnarFrame:
+    """Lazy handle on a stored table: columns and index are read up front, values on demand
+
+    The .npy layout is memory-mapped so a read copies only the selected columns and rows;
+    Parquet reads only the selected column chunks.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.format = "parquet" if path.endswith(".parquet") else "npy"
+        if self.format == "parquet":
+            if not HAS_PYARROW:
+                raise ImportError("Reading Parquet needs pyarrow: pip install pyarrow")
+            import pyarrow.parquet as pq
+            schema = pq.read_schema(path)
+            index_columns = set(_parquet_index_columns(schema))
+            self.columns = [name for name in schema.names if name not in index_columns]
+        else:
+            with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+                self.meta = json.load(f)
+            self.columns = self.meta["columns"]
+        self._positions = {column: i for i, column in enumerate(self.columns)}
+        self._index = None
+
+    @property
+    def index(self) -> pd.Index:
+        if self._index is None:
+            if self.format == "parquet":
+                self._index = pd.read_parquet(self.path, columns=[]).index
+            else:
+                raw = np.load(os.path.join(self.path, "index.npy"), mmap_mode="r")
+                if self.meta["index"] == "datetime":
+                    self._index = pd.DatetimeIndex(np.array(raw).astype("datetime64[ns]"), name=self.meta["index_name"])
+                else:
+                    self._index = pd.Index(np.array(raw), name=self.meta["index_name"])
+        return self._index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, key: Union[str, List[str]]) -> Union[pd.Series, pd.DataFrame]:
+        if isinstance(key, str):
+            return self.read([key])[key]
+        return self.read(list(key))
+
+    def read(self, columns: List[str] = None, start: Any = None, end: Any = None,
+             rows: List[Any] = None) -> pd.DataFrame:
+        """Selected columns (default all), optionally limited to a date range or index labels"""
+        columns = self.columns if columns is None else [str(c) for c in columns]
+        missing = [c for c in columns if c not in self._positions]
+        if missing:
+            raise KeyError(f"Columns not stored in {self.path}: {missing}")
+
+        index = self.index
+        if rows is not None:
+            positions = index.get_indexer(rows)
+            positions = positions[positions >= 0]
+        else:
+            first = index.searchsorted(pd.Timestamp(start)) if start is not None else 0
+            last = index.searchsorted(pd.Timestamp(end), side="right") if end is not None else len(index)
+            positions = slice(first, last)
+
+        if self.format == "parquet":
+            frame = pd.read_parquet(self.path, columns=columns, memory_map=True)
+            return frame.iloc[positions]
+        data = {
+            column: np.array(np.load(os.path.join(self.path, f"c{self._positions[column]}.npy"),
+                                     mmap_mode="r")[positions])
+            for column in columns
+        }
+        return pd.DataFrame(data, index=index[positions], columns=columns)
+
+
+def _parquet_index_columns(schema) -> List[str]:
+    pandas_meta = schema.pandas_metadata or {}
+    return [c for c in pandas_meta.get("index_columns", []) if isinstance(c, str)]
+
+
+def open_frame(path: str) -> ColumnarFrame:
+    return ColumnarFrame(path)
+
+
+def market_metrics_frame(market_data: Dict[str, Any]) -> pd.DataFrame:
+    """Flatten per-symbol research records (basic_info, risk_metrics, ...) into a symbols x metrics table"""
+    records = {s: r for s, r in market_data.items() if isinstance(r, dict) and "error" not in r}
+    if not records:
+        return pd.DataFrame()
+    frame = pd.json_normalize(list(records.values()))
+    frame.index = pd.Index(list(records), name="symbol")
+    return frame
+
+
+def per_symbol_risk_frame(per_symbol_risk: Dict[str, Dict[str, float]]) -> pd.DataFrame:
+    frame = pd.DataFrame.from_dict(
+        {s: r for s, r in per_symbol_risk.items() if "error" not in r}, orient="index"
+    )
+    frame.index.name = "symbol"
+    return frame
+
+
+def save_study(study_results: Dict[str, Any], study_id: str, returns_panel: Union[ReturnPanel, pd.DataFrame] = None,
+               market_data: Dict[str, Any] = None, root: str = None, fmt: str = None) -> str:
+    """Write a study as small JSON metadata plus columnar tables under DATASET_DIR/study_<id>/
+
+    The returns panel, market metrics and per-symbol VaR go to columnar files referenced from
+    study.json under "tables"; the raw agent research output is referenced through
+    data_research_path instead of being written a second time. Returns the study.json path.
+    """
+    directory = os.path.join(root or ResearchConfig.DATASET_DIR, f"study_{study_id}")
+    os.makedirs(directory, exist_ok=True)
+
+    tables = {}
+    frames = {
+        "returns": returns_panel.to_frame() if isinstance(returns_panel, ReturnPanel) else returns_panel,
+        "market_metrics": market_metrics_frame(market_data) if market_data else None,
+        "per_symbol_risk": per_symbol_risk_frame(study_results["per_symbol_risk"])
+        if study_results.get("per_symbol_risk") else None,
+    }
+    for name, frame in frames.items():
+        if frame is not None and not frame.empty:
+            path = write_frame(frame, os.path.join(directory, name), fmt)
+            tables[name] = os.path.relpath(path, directory)
+
+    metadata = {k: v for k, v in study_results.items() if k != "per_symbol_risk"}
+    if study_results.get("data_research_path"):
+        metadata.pop("data_research", None)
+    metadata["tables"] = tables
+
+    path = os.path.join(directory, "study.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2, default=str)
+    return path
+
+
+def load_study(path: str, load_research: bool = False) -> Dict[str, Any]:
+    """Read study.json; entries under "tables" become lazy ColumnarFrame handles
+
+    With load_research, the agent research output is read back from data_research_path.
+    """
+    with open(path, encoding="utf-8") as f:
+        study = json.load(f)
+    directory = os.path.dirname(path)
+    study["tables"] = {name: ColumnarFrame(os.path.join(directory, rel))
+                       for name, rel in study.get("tables", {}).items()}
+    research_path = study.get("data_research_path")
+    if load_research and "data_research" not in study and research_path and os.path.exists(research_path):
+        with open(research_path, encoding="utf-8") as f:
+            study["data_research"] = json.load(f)
+    return study
@@ -1,15 +1,13 @@
-import os
 import json
 import pandas as pd
-import streamlit as st
 from datetime import datetime
 from typing import Dict, Any, List
+from config.settings import ResearchConfig
+from utils.columnar_store import write_frame
 
 def ensure_directories():
     """Create necessary output directories"""
-    dirs = ["outputs/research_reports", "outputs/datasets", "outputs/visualizations"]
-    for directory in dirs:
-        os.makedirs(directory, exist_ok=True)
+    ResearchConfig.ensure_directories()
 
 def save_research_data(data: Dict[Any, Any], filename: str) -> str:
     """Save research data with timestamp and return full file path"""
@@ -18,10 +16,11 @@ def save_research_data(data: Dict[Any, Any], filename: str) -> str:
     filepath = f"outputs/datasets/{timestamp}_{filename}"
     
     if isinstance(data, pd.DataFrame):
-        filepath = filepath + ".csv"
-        data.to_csv(filepath, index=False)
+        # Tables go to the columnar store (Parquet or .npy columns) rather than CSV
+        filepath = write_frame(data, filepath)
     else:
-        filepath = filepath + ".json"
+        if not filepath.endswith(".json"):
+            filepath = filepath + ".json"
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, default=str)
     
@@ -34,6 +33,7 @@ def get_research_timestamp() -> str:
 def display_research_data(data: Dict[Any, Any], title: str = "Research Data"):
     """Optional Streamlit display for quick inspection"""
     try:
+        import streamlit as st  # only the app renders data; keep it out of CLI and batch imports
         st.subheader(title)
         if isinstance(data, pd.DataFrame):
             st.dataframe(data)
@@ -0,0 +1,167 @@
+import os
+import re
+import json
+import hashlib
+import warnings
+import threading
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from langchain_core.caches import BaseCache
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+from config.settings import ResearchConfig
+from utils.sqlite_cache import SQLiteKVCache
+from utils.research_digest import estimate_tokens
+from utils.tracing import record_cache_lookup, record_llm_usage
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace (including escaped newlines in serialized chat messages) so cosmetic
+    indentation differences map to the same cache entry"""
+    return _WHITESPACE.sub(" ", prompt.replace("\\n", " ")).strip()
+
+
+class LLMResponseCache(BaseCache):
+    """Content-addressed LangChain cache backed by SQLite
+
+    Entries are keyed on a SHA-256 of the model configuration string (model name, temperature,
+    stop sequences) and the normalized prompt. Pass an instance as ``cache=`` to any chat
+    model, including fakes, to share responses across runs.
+    """
+
+    def __init__(self, path: str = None, ttl_hours: float = None, max_entries: int = None):
+        ttl_hours = ResearchConfig.LLM_CACHE_TTL_HOURS if ttl_hours is None else ttl_hours
+        self.store = SQLiteKVCache(
+            path or os.path.join(ResearchConfig.CACHE_DIR, "llm_cache.sqlite"),
+            ttl_seconds=ttl_hours * 3600 if ttl_hours else None,
+            max_entries=max_entries or ResearchConfig.LLM_CACHE_MAX_ENTRIES,
+        )
+
+    @staticmethod
+    def make_key(prompt: str, llm_string: str) -> str:
+        payload = json.dumps({"llm": llm_string, "prompt": normalize_prompt(prompt)}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        value = self.store.get(self.make_key(prompt, llm_string))
+        if value is None:
+            record_cache_lookup("llm", "miss")
+            return None
+        try:
+            with warnings.catch_warnings():
+                # langchain_core.load is flagged beta; the payloads are our own dumps() output
+                warnings.simplefilter("ignore")
+                generations = [loads(generation) for generation in json.loads(value)]
+        except Exception:
+            record_cache_lookup("llm", "miss")
+            return None
+        record_cache_lookup("llm", "hit")
+        # Marked so LLMUsageCallback doesn't count the stored usage as new tokens
+        for generation in generations:
+            generation.generation_info = {**(generation.generation_info or {}), "cache_hit": True}
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        self.store.set(self.make_key(prompt, llm_string), json.dumps([dumps(g) for g in return_val]))
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.store.stats()
+
+
+class LLMUsageCallback(BaseCallbackHandler):
+    """Reports each model call's token usage to the tracing metrics and the current span
+
+    Uses the provider's usage_metadata when present and estimates from text otherwise (e.g.
+    fake models); responses served from LLMResponseCache are skipped.
+    """
+
+    def __init__(self):
+        self._prompts: Dict[Any, Tuple[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id, **kwargs):
+        text = " ".join(str(getattr(m, "content", m)) for batch in messages for m in batch)
+        self._start(serialized, run_id, text)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id, **kwargs):
+        self._start(serialized, run_id, " ".join(prompts))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            model, estimated_in = self._prompts.pop(run_id, ("unknown", 0))
+        for generations in response.generations:
+            for generation in generations:
+                if (generation.generation_info or {}).get("cache_hit"):
+                    continue
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                if usage:
+                    record_llm_usage(usage.get("input_tokens", 0), usage.get("output_tokens", 0), model)
+                else:
+                    record_llm_usage(estimated_in, estimate_tokens(generation.text), model, estimated=True)
+
+    def on_llm_error(self, error: BaseException, *, run_id, **kwargs):
+        with self._lock:
+            self._prompts.pop(run_id, None)
+
+    def _start(self, serialized: Dict[str, Any], run_id, text: str):
+        serialized = serialized or {}
+        model = (serialized.get("kwargs") or {}).get("model") or serialized.get("name") or "unknown"
+        with self._lock:
+            self._prompts[run_id] = (str(model), estimate_tokens(text))
+
+
+_usage_callback = LLMUsageCallback()
+
+
+def track_usage(llm):
+    """Attach the shared LLMUsageCallback to a chat model (idempotent); returns the model"""
+    callbacks = getattr(llm, "callbacks", None)
+    if callbacks is None or isinstance(callbacks, list):
+        if not any(isinstance(c, LLMUsageCallback) for c in callbacks or []):
+            llm.callbacks = [*(callbacks or []), _usage_callback]
+    return llm
+
+
+_shared_cache: Optional[LLMResponseCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Process-wide cache shared by all agents, or None when LLM_CACHE_ENABLED is off"""
+    global _shared_cache
+    if not ResearchConfig.LLM_CACHE_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMResponseCache()
+        return _shared_cache
+
+
+
+def create_chat_model(model_name: str = "gemini-2.5-flash", temperature: float = 0.1):
+    """Default Gemini chat model wired to the shared response cache
+
+    langchain_google_genai takes over a second to import, so it is loaded only when an agent
+    actually needs the real model (injected fakes never pay for it).
+    """
+    ResearchConfig.validate(["GOOGLE_API_KEY"])
+    try:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+    except Exception as e:
+        raise ImportError(
+            "Could not import 'langchain_google_genai'. Install with: "
+            "'pip install -U langchain-google-genai'\n"
+            "Original error: " + str(e)
+        ) from e
+    return ChatGoogleGenerativeAI(
+        model=model_name,
+        google_api_key=ResearchConfig.GOOGLE_API_KEY,
+        temperature=temperature,
+        cache=get_llm_cache(),
+        callbacks=[_usage_callback],
+    )
@@ -0,0 +1,59 @@
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Iterable, Iterator, Optional
+from config.settings import ResearchConfig
+
+_shared_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def process_context():
+    """forkserver where available, else spawn: never fork, since callers run in threaded processes
+    (agent executors, the async limiter, batch studies) and a fork can copy a held lock into the child"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Process-wide CPU worker pool (PROCESS_POOL_WORKERS processes), created on first use
+
+    Workers start once and are reused by every Monte Carlo run and risk job fan-out; a pool
+    broken by a crashed worker is replaced on the next call.
+    """
+    global _shared_pool
+    with _pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ProcessPoolExecutor(max_workers=ResearchConfig.PROCESS_POOL_WORKERS,
+                                               mp_context=process_context())
+        return _shared_pool
+
+
+def pool_map(func: Callable, tasks: Iterable, workers: int) -> Iterator[Any]:
+    """Results of func over tasks, in order, from the shared pool with at most workers in flight"""
+    pool = get_process_pool()
+    tasks = iter(tasks)
+    pending = deque()
+    try:
+        for task in tasks:
+            pending.append(pool.submit(func, task))
+            if len(pending) >= workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    except BrokenProcessPool:
+        shutdown_process_pool()
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def shutdown_process_pool():
+    global _shared_pool
+    with _pool_lock:
+        pool, _shared_pool = _shared_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,282 @@
+import json
+import math
+from typing import Dict, Any, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from config.settings import ResearchConfig
+from tools.return_panel import ReturnPanel
+
+# (label, path into a fetch_stock_data record, decimals)
+DIGEST_METRICS = [
+    ("vol", ("risk_metrics", "annualized_volatility"), 3),
+    ("sharpe", ("risk_metrics", "sharpe_ratio"), 2),
+    ("mdd", ("risk_metrics", "max_drawdown"), 3),
+    ("beta", ("risk_metrics", "beta"), 2),
+    ("ret", ("performance_metrics", "total_return_2y"), 1),
+    ("skew", ("statistical_data", "skewness"), 2),
+    ("kurt", ("statistical_data", "kurtosis"), 2),
+]
+
+# (title, metric, True = largest first)
+OUTLIER_RANKINGS = [
+    ("Highest volatility", "vol", True),
+    ("Deepest drawdown", "mdd", False),
+    ("Weakest Sharpe", "sharpe", False),
+    ("Highest beta", "beta", True),
+    ("Fattest tails (kurtosis)", "kurt", True),
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) used for budgeting prompts"""
+    return math.ceil(len(text) / 4)
+
+
+def truncate_to_tokens(text: str, token_budget: int) -> str:
+    """Trim text to roughly token_budget tokens"""
+    limit = token_budget * 4
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+def format_symbol_list(symbols: List[str], limit: int = 20) -> str:
+    """Comma-separated symbols, elided past limit so prompts don't grow with the universe"""
+    if len(symbols) <= limit:
+        return ", ".join(symbols)
+    return f"{', '.join(symbols[:limit])} (+{len(symbols) - limit} more, {len(symbols)} total)"
+
+
+def extract_market_data(research_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Recover per-symbol records from the financial data tool calls in the agent's intermediate steps"""
+    market_data = {}
+    for step in research_data.get("intermediate_steps", []) or []:
+        try:
+            action, observation = step
+            if getattr(action, "tool", None) != "financial_data_research":
+                continue
+            parsed = json.loads(observation)
+        except (TypeError, ValueError):
+            continue
+        if isinstance(parsed, dict):
+            market_data.update({k: v for k, v in parsed.items() if isinstance(v, dict)})
+    return market_data
+
+
+def extract_search_highlights(research_data: Dict[str, Any]) -> List[str]:
+    """Titles of the research search results the agent collected"""
+    titles = []
+    for step in research_data.get("intermediate_steps", []) or []:
+        try:
+            action, observation = step
+            if getattr(action, "tool", None) != "research_search":
+                continue
+            parsed = json.loads(observation)
+        except (TypeError, ValueError):
+            continue
+        for result in parsed.get("results", []) if isinstance(parsed, dict) else []:
+            if result.get("title") and result["title"] not in titles:
+                titles.append(result["title"])
+    return titles
+
+
+class ResearchDigest:
+    """Deterministic, fixed-size numeric summary of a study's research data for LLM prompts
+
+    Sections are added in priority order (universe stats, ranked outliers, sector aggregates,
+    correlation clusters, per-symbol rows by risk, research narrative) until the token budget
+    is spent, so prompt size stays roughly flat as the symbol universe grows.
+    """
+
+    def __init__(self, token_budget: int = None, top_k: int = None):
+        self.token_budget = token_budget or ResearchConfig.DIGEST_TOKEN_BUDGET
+        self.top_k = top_k or ResearchConfig.DIGEST_TOP_K
+
+    def build(self, research_data: Dict[str, Any], symbols: List[str],
+              market_data: Optional[Dict[str, Any]] = None,
+              returns: Optional[Union[ReturnPanel, pd.DataFrame]] = None) -> str:
+        market_data = market_data or extract_market_data(research_data)
+        table, sectors, failed = self._metrics_frame(market_data, symbols)
+
+        sections = [
+            self._universe_section(symbols, table, failed),
+            self._outlier_section(table),
+            self._sector_section(table, sectors),
+            self._cluster_section(returns),
+        ]
+
+        parts, used = [], 0
+        for section in sections:
+            if not section:
+                continue
+            cost = estimate_tokens(section)
+            if used + cost <= self.token_budget:
+                parts.append(section)
+                used += cost
+
+        highlights = extract_search_highlights(research_data)[:self.top_k]
+        sources = "RESEARCH SOURCES:\n" + "\n".join(f"- {title}" for title in highlights) if highlights else ""
+        narrative = str(research_data.get("research_output") or "").strip()
+
+        # Keep room for the sources and (a quarter of the budget for) the narrative before
+        # spending the rest on per-symbol rows
+        reserved = estimate_tokens(sources) + min(estimate_tokens(narrative), self.token_budget // 4)
+        rows = self._symbol_rows(table, self.token_budget - used - reserved)
+        if rows:
+            parts.append(rows)
+            used += estimate_tokens(rows)
+
+        if sources and used + estimate_tokens(sources) <= self.token_budget:
+            parts.append(sources)
+            used += estimate_tokens(sources)
+
+        remaining = self.token_budget - used - estimate_tokens("AGENT FINDINGS:\n")
+        if narrative and remaining > 50:
+            parts.append("AGENT FINDINGS:\n" + truncate_to_tokens(narrative, remaining))
+
+        return "\n\n".join(parts)
+
+    def _metrics_frame(self, market_data: Dict[str, Any],
+                       symbols: List[str]) -> Tuple[pd.DataFrame, pd.Series, List[str]]:
+        rows, sectors, failed = {}, {}, []
+        for symbol in symbols:
+            record = market_data.get(symbol)
+            if not isinstance(record, dict) or "error" in record:
+                failed.append(symbol)
+                continue
+            row = {}
+            for label, (group, key), _ in DIGEST_METRICS:
+                value = record.get(group, {}).get(key)
+                row[label] = float(value) if isinstance(value, (int, float)) else np.nan
+            rows[symbol] = row
+            sectors[symbol] = record.get("basic_info", {}).get("sector", "Unknown") or "Unknown"
+
+        columns = [label for label, _, _ in DIGEST_METRICS]
+        table = pd.DataFrame.from_dict(rows, orient="index", columns=columns) if rows else pd.DataFrame(columns=columns)
+        return table, pd.Series(sectors, dtype=object), failed
+
+    def _universe_section(self, symbols: List[str], table: pd.DataFrame, failed: List[str]) -> str:
+        lines = [f"UNIVERSE: {len(symbols)} symbols, {len(table)} with data"]
+        if failed:
+            shown = ", ".join(failed[:self.top_k])
+            more = f" (+{len(failed) - self.top_k} more)" if len(failed) > self.top_k else ""
+            lines.append(f"No data: {shown}{more}")
+        if not table.empty:
+            stats = []
+            for label, _, decimals in DIGEST_METRICS:
+                column = table[label].dropna()
+                if column.empty:
+                    continue
+                stats.append(f"{label} median={column.median():.{decimals}f} "
+                             f"p10={column.quantile(0.1):.{decimals}f} p90={column.quantile(0.9):.{decimals}f}")
+            lines.extend(stats)
+        return "\n".join(lines)
+
+    def _outlier_section(self, table: pd.DataFrame) -> str:
+        if table.empty:
+            return ""
+        decimals = {label: d for label, _, d in DIGEST_METRICS}
+        lines = ["TOP RISK OUTLIERS:"]
+        for title, metric, descending in OUTLIER_RANKINGS:
+            column = table[metric].dropna()
+            if column.empty:
+                continue
+            ranked = column.nlargest(self.top_k) if descending else column.nsmallest(self.top_k)
+            entries = ", ".join(f"{symbol} {value:.{decimals[metric]}f}" for symbol, value in ranked.items())
+            lines.append(f"{title}: {entries}")
+        return "\n".join(lines)
+
+    def _sector_section(self, table: pd.DataFrame, sectors: pd.Series) -> str:
+        if table.empty:
+            return ""
+        grouped = table.groupby(sectors.reindex(table.index))
+        summary = grouped.agg(n=("vol", "size"), vol=("vol", "mean"), sharpe=("sharpe", "mean"), mdd=("mdd", "mean"))
+        summary = summary.sort_values(["n", "vol"], ascending=False).head(ResearchConfig.DIGEST_MAX_SECTORS)
+        lines = ["SECTORS (n, mean vol, mean sharpe, mean mdd):"]
+        for sector, row in summary.iterrows():
+            lines.append(f"{sector}: n={int(row['n'])} vol={row['vol']:.3f} sharpe={row['sharpe']:.2f} mdd={row['mdd']:.3f}")
+        return "\n".join(lines)
+
+    def _cluster_section(self, returns: Optional[Union[ReturnPanel, pd.DataFrame]]) -> str:
+        if returns is None or returns.shape[1] < 2:
+            return ""
+        clusters, corr = correlation_clusters(returns, ResearchConfig.DIGEST_CORRELATION_THRESHOLD)
+        lines = [f"CORRELATION (avg pairwise={_mean_offdiag(corr):.2f}):"]
+        diversification = _diversification_line(returns)
+        if diversification:
+            lines.append(diversification)
+        for members in clusters[:ResearchConfig.DIGEST_MAX_CLUSTERS]:
+            inner = corr.loc[members, members].to_numpy()
+            shown = ", ".join(members[:self.top_k])
+            more = f" +{len(members) - self.top_k}" if len(members) > self.top_k else ""
+            lines.append(f"Cluster of {len(members)} (avg corr {_mean_offdiag(inner):.2f}): {shown}{more}")
+        if not clusters:
+            lines.append(f"No clusters above {ResearchConfig.DIGEST_CORRELATION_THRESHOLD:.2f}")
+        return "\n".join(lines)
+
+    def _symbol_rows(self, table: pd.DataFrame, budget: int) -> str:
+        """Per-symbol metric rows ordered by volatility, as many as fit in the remaining budget"""
+        if table.empty or budget <= 0:
+            return ""
+        header = "PER-SYMBOL (" + " ".join(label for label, _, _ in DIGEST_METRICS) + "):"
+        lines, used = [header], estimate_tokens(header)
+        for symbol, row in table.sort_values("vol", ascending=False).iterrows():
+            values = " ".join("na" if pd.isna(row[label]) else f"{row[label]:.{d}f}" for label, _, d in DIGEST_METRICS)
+            line = f"{symbol} {values}"
+            if used + estimate_tokens(line) + 1 > budget:
+                break
+            lines.append(line)
+            used += estimate_tokens(line) + 1
+        return "\n".join(lines) if len(lines) > 1 else ""
+
+
+def correlation_clusters(returns: Union[ReturnPanel, pd.DataFrame],
+                         threshold: float) -> Tuple[List[List[str]], pd.DataFrame]:
+    """Average-linkage clusters of symbols whose correlations mostly exceed threshold, largest first"""
+    from scipy.cluster.hierarchy import linkage, fcluster
+    from scipy.spatial.distance import squareform
+
+    if isinstance(returns, pd.DataFrame):
+        returns = ReturnPanel.from_frame(returns)
+    corr = pd.DataFrame(returns.correlation(min_periods=20), index=returns.symbols,
+                        columns=returns.symbols).fillna(0.0)
+    distance = np.clip(1.0 - corr.to_numpy(), 0.0, 2.0)
+    np.fill_diagonal(distance, 0.0)
+    labels = fcluster(linkage(squareform(distance, checks=False), method="average"),
+                      t=1.0 - threshold, criterion="distance")
+
+    groups: Dict[int, List[str]] = {}
+    for symbol, label in zip(corr.columns, labels):
+        groups.setdefault(label, []).append(symbol)
+    clusters = sorted((g for g in groups.values() if len(g) > 1), key=len, reverse=True)
+    return clusters, corr
+
+
+def _diversification_line(returns: Union[ReturnPanel, pd.DataFrame]) -> str:
+    """Equal-weight portfolio volatility from the shrunk covariance versus the average asset volatility"""
+    from tools.covariance import get_covariance_engine, portfolio_volatility
+    try:
+        result = get_covariance_engine().compute(returns)
+    except ValueError:
+        return ""
+    cov = result["covariance"]
+    n = cov.shape[0]
+    portfolio_vol = float(portfolio_volatility(cov, np.full(n, 1.0 / n))[0])
+    avg_vol = float(np.sqrt(np.diag(cov)).mean() * np.sqrt(252))
+    ratio = avg_vol / portfolio_vol if portfolio_vol > 0 else float("nan")
+    return (f"Equal-weight portfolio vol={portfolio_vol:.3f} vs avg asset vol={avg_vol:.3f} "
+            f"(diversification ratio {ratio:.2f}, {result['method']}, {result['observations']} days)")
+
+
+def _mean_offdiag(matrix) -> float:
+    values = np.asarray(matrix, dtype=np.float64)
+    n = values.shape[0]
+    if n < 2:
+        return float("nan")
+    return float((values.sum() - np.trace(values)) / (n * (n - 1)))
+
+
+def build_research_digest(research_data: Dict[str, Any], symbols: List[str],
+                          market_data: Optional[Dict[str, Any]] = None,
+                          returns: Optional[Union[ReturnPanel, pd.DataFrame]] = None,
+                          token_budget: int = None) -> str:
+    """Convenience wrapper around ResearchDigest.build"""
+    return ResearchDigest(token_budget=token_budget).build(research_data, symbols, market_data, returns)
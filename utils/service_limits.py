@@ -0,0 +1,38 @@
+import asyncio
+import functools
+from typing import Any, Callable, Dict
+from config.settings import ResearchConfig
+from utils.tracing import bind_context
+
+
+class ServiceLimiter:
+    """Bounded concurrency per external service (LLM, market data, search) for async pipelines
+
+    Blocking client calls run in the default thread pool while holding the service's
+    semaphore, so at most SERVICE_CONCURRENCY[service] requests are in flight at once.
+    Semaphores are created lazily so they bind to the running event loop.
+    """
+
+    def __init__(self, limits: Dict[str, int] = None):
+        self.limits = dict(ResearchConfig.SERVICE_CONCURRENCY)
+        self.limits.update(limits or {})
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.in_flight: Dict[str, int] = {}
+        self.peak_in_flight: Dict[str, int] = {}
+
+    def semaphore(self, service: str) -> asyncio.Semaphore:
+        if service not in self._semaphores:
+            self._semaphores[service] = asyncio.Semaphore(self.limits.get(service, 1))
+        return self._semaphores[service]
+
+    async def run(self, service: str, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking call in a worker thread under the service's semaphore"""
+        async with self.semaphore(service):
+            self.in_flight[service] = self.in_flight.get(service, 0) + 1
+            self.peak_in_flight[service] = max(self.peak_in_flight.get(service, 0), self.in_flight[service])
+            try:
+                loop = asyncio.get_running_loop()
+                # bind_context keeps the caller's trace span current in the worker thread
+                return await loop.run_in_executor(None, functools.partial(bind_context(func), *args, **kwargs))
+            finally:
+                self.in_flight[service] -= 1
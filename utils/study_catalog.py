@@ -0,0 +1,234 @@
+import os
+import glob
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+import numpy as np
+from config.settings import ResearchConfig
+from utils.columnar_store import load_study
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS studies ("
+    "study_id TEXT PRIMARY KEY, study_name TEXT, research_focus TEXT, execution_mode TEXT, "
+    "created_at REAL NOT NULL, study_date TEXT NOT NULL, symbol_count INTEGER, total_seconds REAL, "
+    "study_path TEXT, report_path TEXT, data_research_path TEXT, metrics TEXT)",
+    "CREATE TABLE IF NOT EXISTS study_symbols ("
+    "symbol TEXT NOT NULL, study_id TEXT NOT NULL, created_at REAL NOT NULL, "
+    "PRIMARY KEY (symbol, created_at, study_id)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS idx_studies_created ON studies(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_studies_date ON studies(study_date)",
+    "CREATE INDEX IF NOT EXISTS idx_study_symbols_study ON study_symbols(study_id)",
+)
+_COLUMNS = ("study_id", "study_name", "research_focus", "execution_mode", "created_at", "study_date",
+            "symbol_count", "total_seconds", "study_path", "report_path", "data_research_path", "metrics")
+
+
+def key_metrics(market_data: Dict[str, Any] = None, per_symbol_risk: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Headline numbers kept in the catalog: average volatility/Sharpe, worst drawdown and VaR"""
+    metrics = {}
+    records = [r for r in (market_data or {}).values() if isinstance(r, dict) and "error" not in r]
+    if records:
+        risk = [r.get("risk_metrics", {}) for r in records]
+        metrics["symbols_with_data"] = len(records)
+        metrics["avg_annualized_volatility"] = round(float(np.mean([r["annualized_volatility"] for r in risk])), 4)
+        metrics["avg_sharpe_ratio"] = round(float(np.mean([r["sharpe_ratio"] for r in risk])), 4)
+        metrics["worst_max_drawdown"] = round(float(min(r["max_drawdown"] for r in risk)), 4)
+    var_95 = [r["VaR_95%_historical"] for r in (per_symbol_risk or {}).values() if "VaR_95%_historical" in r]
+    if var_95:
+        metrics["worst_var_95_historical"] = round(float(min(var_95)), 6)
+    return metrics
+
+
+def stored_key_metrics(study: Dict[str, Any]) -> Dict[str, Any]:
+    """key_metrics for a study read back from disk: from its market_metrics / per_symbol_risk tables,
+    or the inline per_symbol_risk of legacy complete-study JSON"""
+    tables = study.get("tables", {})
+    market_data, per_symbol_risk = None, study.get("per_symbol_risk")
+    if "market_metrics" in tables:
+        risk_columns = [c for c in tables["market_metrics"].columns if c.startswith("risk_metrics.")]
+        frame = tables["market_metrics"].read(risk_columns)
+        market_data = {
+            symbol: {"risk_metrics": {c.split(".", 1)[1]: v for c, v in row.items()}}
+            for symbol, row in frame.to_dict(orient="index").items()
+        }
+    if "per_symbol_risk" in tables:
+        per_symbol_risk = tables["per_symbol_risk"].read().to_dict(orient="index")
+    return key_metrics(market_data, per_symbol_risk)
+
+
+class StudyCatalog:
+    """SQLite index of completed studies: metadata, file locations and key metrics
+
+    Symbols live in their own table keyed on (symbol, created_at), so "latest studies of AAPL"
+    is an index range scan instead of a directory glob.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(ResearchConfig.CACHE_DIR, "study_catalog.sqlite")
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+
+    def register(self, study_results: Dict[str, Any], study_path: str = None,
+                 metrics: Dict[str, Any] = None, created_at: float = None) -> str:
+        """Add or replace a completed study; returns its study_id"""
+        meta = study_results["study_metadata"]
+        symbols = list(dict.fromkeys(meta.get("symbols", [])))
+        created_at = created_at or time.time()
+        report = study_results.get("research_report", {}).get("metadata", {})
+        row = (
+            meta["study_id"], meta.get("study_name"), meta.get("research_focus"),
+            meta.get("execution_mode", "sequential"), created_at,
+            datetime.fromtimestamp(created_at).strftime("%Y-%m-%d"), len(symbols),
+            study_results.get("performance", {}).get("total_seconds"),
+            study_path, report.get("filepath"), study_results.get("data_research_path"),
+            json.dumps(metrics or {}),
+        )
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM study_symbols WHERE study_id = ?", (meta["study_id"],))
+            self._conn.execute(f"INSERT OR REPLACE INTO studies ({', '.join(_COLUMNS)}) "
+                               f"VALUES ({', '.join('?' * len(_COLUMNS))})", row)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO study_symbols (symbol, study_id, created_at) VALUES (?, ?, ?)",
+                [(symbol, meta["study_id"], created_at) for symbol in symbols]
+            )
+        return meta["study_id"]
+
+    def list(self, symbol: str = None, since: str = None, until: str = None, text: str = None,
+             limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest studies first, optionally filtered by symbol, date range (YYYY-MM-DD) and name/focus text"""
+        clauses, params = [], []
+        if symbol:
+            source = "study_symbols AS ss JOIN studies AS s ON s.study_id = ss.study_id"
+            clauses.append("ss.symbol = ?")
+            params.append(symbol.upper())
+            order = "ss.created_at"
+        else:
+            source, order = "studies AS s", "s.created_at"
+        if since:
+            clauses.append("s.study_date >= ?")
+            params.append(since)
+        if until:
+            clauses.append("s.study_date <= ?")
+            params.append(until)
+        if text:
+            clauses.append("(s.study_name LIKE ? OR s.research_focus LIKE ?)")
+            params += [f"%{text}%"] * 2
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = f"SELECT s.* FROM {source}{where} ORDER BY {order} DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, (*params, limit)).fetchall()
+            return [self._row(row) for row in rows]
+
+    def get(self, study_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM studies WHERE study_id = ?", (study_id,)).fetchone()
+            return self._row(row) if row is not None else None
+
+    def load(self, study_id: str, load_research: bool = False) -> Optional[Dict[str, Any]]:
+        """Reload a past study from disk (tables stay lazy); None if unknown or its files are gone"""
+        entry = self.get(study_id)
+        if entry is None or not entry["study_path"] or not os.path.exists(entry["study_path"]):
+            return None
+        if os.path.basename(entry["study_path"]) == "study.json":
+            return load_study(entry["study_path"], load_research)
+        with open(entry["study_path"], encoding="utf-8") as f:
+            return json.load(f)
+
+    def remove(self, study_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM study_symbols WHERE study_id = ?", (study_id,))
+            self._conn.execute("DELETE FROM studies WHERE study_id = ?", (study_id,))
+
+    def rebuild(self, dataset_dir: str = None) -> int:
+        """Index studies on disk that the catalog doesn't know yet (study_*/study.json and legacy
+        complete_study JSON files); entries already registered keep their metrics and timestamps"""
+        dataset_dir = dataset_dir or ResearchConfig.DATASET_DIR
+        paths = glob.glob(os.path.join(dataset_dir, "study_*", "study.json"))
+        paths += glob.glob(os.path.join(dataset_dir, "*complete_study_*.json*"))
+        with self._lock:
+            known = {row[0] for row in self._conn.execute("SELECT study_id FROM studies")}
+        count = 0
+        for path in paths:
+            try:
+                if os.path.basename(path) == "study.json":
+                    study = load_study(path)
+                else:
+                    with open(path, encoding="utf-8") as f:
+                        study = json.load(f)
+                if "study_metadata" not in study or study["study_metadata"]["study_id"] in known:
+                    continue
+                self.register(study, path, stored_key_metrics(study), created_at=os.path.getmtime(path))
+                count += 1
+            except (OSError, ValueError, KeyError, ImportError):
+                continue
+        return count
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM studies").fetchone()[0]
+
+    def _row(self, row: sqlite3.Row) -> Dict[str, Any]:
+        entry = dict(row)
+        entry["metrics"] = json.loads(entry["metrics"] or "{}")
+        entry["symbols"] = [r[0] for r in self._conn.execute(
+            "SELECT symbol FROM study_symbols WHERE study_id = ? ORDER BY symbol", (entry["study_id"],)
+        )]
+        return entry
+
+
+_shared_catalog: Optional[StudyCatalog] = None
+
+
+def get_study_catalog() -> StudyCatalog:
+    """Process-wide catalog shared by the orchestrator, the batch runner and the app"""
+    global _shared_catalog
+    if _shared_catalog is None:
+        _shared_catalog = StudyCatalog()
+    return _shared_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List and inspect past research studies")
+    commands = parser.add_subparsers(dest="command", required=True)
+    listing = commands.add_parser("list", help="List studies, newest first")
+    listing.add_argument("--symbol")
+    listing.add_argument("--since", help="YYYY-MM-DD")
+    listing.add_argument("--until", help="YYYY-MM-DD")
+    listing.add_argument("--text", help="Match study name or research focus")
+    listing.add_argument("--limit", type=int, default=20)
+    show = commands.add_parser("show", help="Print one study's catalog entry")
+    show.add_argument("study_id")
+    commands.add_parser("rebuild", help=f"Index studies already saved under {ResearchConfig.DATASET_DIR}")
+    args = parser.parse_args()
+
+    catalog = get_study_catalog()
+    if args.command == "rebuild":
+        print(f"Indexed {catalog.rebuild()} studies ({len(catalog)} in catalog)")
+    elif args.command == "show":
+        entry = catalog.get(args.study_id)
+        print(json.dumps(entry, indent=2) if entry else f"Unknown study: {args.study_id}")
+    else:
+        entries = catalog.list(args.symbol, args.since, args.until, args.text, args.limit)
+        for entry in entries:
+            symbols = ", ".join(entry["symbols"][:6]) + (" ..." if entry["symbol_count"] > 6 else "")
+            seconds = f"{entry['total_seconds']:.1f}s" if entry["total_seconds"] is not None else "-"
+            print(f"{entry['study_id']:<22} {entry['study_date']}  {seconds:>8}  "
+                  f"{(entry['study_name'] or '')[:40]:<40}  {symbols}")
+        if not entries:
+            print("No matching studies")
+
+
+if __name__ == "__main__":
+    main()
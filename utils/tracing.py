@@ -0,0 +1,517 @@
+import os
+import re
+import json
+import time
+import uuid
+import pstats
+import argparse
+import cProfile
+import functools
+import threading
+import contextvars
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from config.settings import ResearchConfig
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+_CACHE_RESULT_ATTRIBUTES = {"hit": "cache_hits", "miss": "cache_misses", "coalesced": "cache_coalesced",
+                            "stale": "cache_stale"}
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed unit of work: wall and CPU time, descriptive attributes and additive counters
+
+    Counters (bytes, tokens, cache hits, ...) land on the innermost open span only, so they can
+    be summed over a trace. CPU time is process CPU while the span was open, so spans that
+    overlap in time share it.
+    """
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.counters: Dict[str, float] = {}
+        self.status = "ok"
+        self.start_time = time.time()
+        self.wall_seconds: Optional[float] = None
+        self.cpu_seconds: Optional[float] = None
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._lock = threading.Lock()
+
+    def set(self, **attributes):
+        with self._lock:
+            self.attributes.update(attributes)
+
+    def add(self, key: str, amount: float = 1):
+        """Increment a counter attribute; safe to call from worker threads"""
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def end(self):
+        self.wall_seconds = time.perf_counter() - self._start
+        self.cpu_seconds = time.process_time() - self._cpu_start
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            attributes, counters = dict(self.attributes), dict(self.counters)
+        return {
+            "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+            "name": self.name, "start_time": round(self.start_time, 6),
+            "wall_seconds": round(self.wall_seconds, 6) if self.wall_seconds is not None else None,
+            "cpu_seconds": round(self.cpu_seconds, 6) if self.cpu_seconds is not None else None,
+            "status": self.status, "attributes": attributes, "counters": counters,
+        }
+
+
+class MetricsRegistry:
+    """In-process counters, gauges and histograms rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._types: Dict[str, str] = {}
+        self._help: Dict[str, str] = {}
+        self._values: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, Dict[str, Any]]] = {}
+
+    def inc(self, name: str, amount: float = 1.0, help: str = None, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._declare(name, "counter", help)
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def set_gauge(self, name: str, value: float, help: str = None, **labels):
+        with self._lock:
+            self._declare(name, "gauge", help)
+            self._values.setdefault(name, {})[_label_key(labels)] = float(value)
+
+    def observe(self, name: str, value: float, help: str = None, buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+                **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._declare(name, "histogram", help)
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(histogram["buckets"]):
+                if value <= bound:
+                    histogram["counts"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._values.get(name, {}).get(_label_key(labels), 0.0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain-dict copy: counters/gauges by label string, histograms as count/sum"""
+        with self._lock:
+            snapshot = {name: {_label_text(key): value for key, value in series.items()}
+                        for name, series in self._values.items()}
+            for name, series in self._histograms.items():
+                snapshot[name] = {_label_text(key): {"count": h["count"], "sum": round(h["sum"], 6)}
+                                  for key, h in series.items()}
+        return snapshot
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name in sorted(self._types):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {self._types[name]}")
+                for key, value in sorted(self._values.get(name, {}).items()):
+                    lines.append(f"{name}{_label_text(key)} {_number(value)}")
+                for key, histogram in sorted(self._histograms.get(name, {}).items()):
+                    for bound, count in zip(histogram["buckets"], histogram["counts"]):
+                        lines.append(f"{name}_bucket{_label_text(key + (('le', _number(bound)),))} {count}")
+                    lines.append(f"{name}_bucket{_label_text(key + (('le', '+Inf'),))} {histogram['count']}")
+                    lines.append(f"{name}_sum{_label_text(key)} {_number(histogram['sum'])}")
+                    lines.append(f"{name}_count{_label_text(key)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> str:
+        """Write the text exposition atomically (e.g. for node_exporter's textfile collector)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        staging = f"{path}.{os.getpid()}.tmp"
+        with open(staging, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(staging, path)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._types.clear()
+            self._help.clear()
+            self._values.clear()
+            self._histograms.clear()
+
+    def _declare(self, name: str, kind: str, help: Optional[str]):
+        declared = self._types.setdefault(name, kind)
+        if declared != kind:
+            raise ValueError(f"Metric {name} is a {declared}, not a {kind}")
+        if help and name not in self._help:
+            self._help[name] = help
+
+
+def _label_key(labels: Dict[str, Any]) -> Tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _label_text(key: Tuple) -> str:
+    if not key:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in key)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(key, escaped)) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _PhaseProfiler:
+    """cProfile and/or tracemalloc capture for one span (TRACE_PROFILE)
+
+    cProfile only sees the thread that opened the span, and only one span is profiled at a
+    time. tracemalloc's peak is process-wide: it is reset only when no other span is measuring
+    memory, and a span that overlapped another reports memory_peak_shared=True, since its
+    peak may include the other span's allocations.
+    """
+
+    _cpu_lock = threading.Lock()
+    _cpu_busy = False
+    _memory_lock = threading.Lock()
+    _memory_users = 0
+    _memory_starts = 0
+
+    def __init__(self, mode: str, directory: str):
+        self.mode = mode
+        self.directory = directory
+        self.profiler: Optional[cProfile.Profile] = None
+        self.snapshot = None
+        self.memory_base = 0
+        self.memory_shared = False
+        self.memory_starts = 0
+
+    def start(self, span: Span):
+        # Memory first and CPU last (and the reverse on stop) so neither capture measures the other
+        if self.mode in ("memory", "all"):
+            with _PhaseProfiler._memory_lock:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                self.memory_shared = _PhaseProfiler._memory_users > 0
+                if not self.memory_shared:
+                    # Resetting under another span would erase the peak it has seen so far
+                    tracemalloc.reset_peak()
+                _PhaseProfiler._memory_users += 1
+                _PhaseProfiler._memory_starts += 1
+                self.memory_starts = _PhaseProfiler._memory_starts
+                self.memory_base = tracemalloc.get_traced_memory()[0]
+            self.snapshot = _own_code_filtered(tracemalloc.take_snapshot())
+        if self.mode in ("cpu", "all"):
+            with _PhaseProfiler._cpu_lock:
+                if not _PhaseProfiler._cpu_busy:
+                    _PhaseProfiler._cpu_busy = True
+                    self.profiler = cProfile.Profile()
+            if self.profiler is not None:
+                self.profiler.enable()
+            else:
+                span.set(cpu_profile="skipped: another phase is being profiled")
+
+    def stop(self, span: Span):
+        if self.profiler is not None:
+            self.profiler.disable()
+            with _PhaseProfiler._cpu_lock:
+                _PhaseProfiler._cpu_busy = False
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{span.trace_id}_{_slug(span.name)}_{span.span_id}.prof")
+            self.profiler.dump_stats(path)
+            stats = pstats.Stats(self.profiler)
+            ranked = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:10]
+            span.set(cpu_profile=path, cpu_hotspots=[
+                {"function": f"{os.path.basename(file)}:{line}({func})", "calls": calls,
+                 "cumulative_seconds": round(cumulative, 4)}
+                for (file, line, func), (_, calls, _, cumulative, _) in ranked
+            ])
+        if self.snapshot is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            top = _own_code_filtered(tracemalloc.take_snapshot()).compare_to(self.snapshot, "lineno")[:5]
+            with _PhaseProfiler._memory_lock:
+                shared = (self.memory_shared or _PhaseProfiler._memory_users > 1
+                          or _PhaseProfiler._memory_starts != self.memory_starts)
+            span.set(memory_peak_bytes=max(peak - self.memory_base, 0), memory_peak_shared=shared,
+                     memory_retained_bytes=current - self.memory_base,
+                     memory_hotspots=[{"where": f"{os.path.basename(stat.traceback[0].filename)}:"
+                                                f"{stat.traceback[0].lineno}",
+                                       "size_diff_bytes": stat.size_diff} for stat in top])
+            with _PhaseProfiler._memory_lock:
+                _PhaseProfiler._memory_users -= 1
+                if _PhaseProfiler._memory_users == 0:
+                    tracemalloc.stop()
+
+
+def _own_code_filtered(snapshot: "tracemalloc.Snapshot") -> "tracemalloc.Snapshot":
+    """Drop allocations made by the profilers themselves"""
+    return snapshot.filter_traces([tracemalloc.Filter(False, module.__file__)
+                                   for module in (tracemalloc, cProfile, pstats)] +
+                                  [tracemalloc.Filter(False, __file__)])
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+
+
+class Tracer:
+    """Creates nested spans, exports finished ones as JSON lines and feeds span metrics
+
+    The current span travels in a context variable, so it follows asyncio tasks; use
+    bind_context() to carry it into thread pools.
+    """
+
+    def __init__(self, path: str = None, export: bool = None, profile: str = None,
+                 registry: MetricsRegistry = None, max_spans: int = None):
+        self.path = path or os.path.join(ResearchConfig.TRACE_DIR, "spans.jsonl")
+        self.export = ResearchConfig.TRACE_EXPORT_ENABLED if export is None else export
+        self.profile = ResearchConfig.TRACE_PROFILE if profile is None else profile
+        if self.profile not in ("", "cpu", "memory", "all"):
+            raise ValueError(f"Unknown TRACE_PROFILE '{self.profile}', expected 'cpu', 'memory' or 'all'")
+        self.registry = registry or get_metrics()
+        self.finished = deque(maxlen=max_spans or ResearchConfig.TRACE_MAX_SPANS_IN_MEMORY)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, profile: bool = False, **attributes):
+        """Open a child of the current span (or a new trace); profile=True marks a phase for TRACE_PROFILE"""
+        parent = _current_span.get()
+        span = Span(name, parent.trace_id if parent else uuid.uuid4().hex, parent.span_id if parent else None,
+                    attributes)
+        token = _current_span.set(span)
+        profiler = None
+        if profile and self.profile:
+            profiler = _PhaseProfiler(self.profile, os.path.join(os.path.dirname(self.path), "profiles"))
+            profiler.start(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set(error=f"{type(e).__name__}: {str(e)[:200]}")
+            raise
+        finally:
+            if profiler is not None:
+                profiler.stop(span)
+            span.end()
+            _current_span.reset(token)
+            self._finish(span)
+
+    def spans(self, trace_id: str = None) -> List[Dict[str, Any]]:
+        """Finished spans still held in memory, optionally for one trace"""
+        with self._lock:
+            return [s for s in self.finished if trace_id is None or s["trace_id"] == trace_id]
+
+    def _finish(self, span: Span):
+        record = span.to_dict()
+        self.registry.observe("span_duration_seconds", span.wall_seconds, "Wall time of traced spans", span=span.name)
+        self.registry.inc("span_cpu_seconds_total", span.cpu_seconds, "Process CPU time while spans were open",
+                          span=span.name)
+        if span.status != "ok":
+            self.registry.inc("span_errors_total", 1, "Spans that ended with an exception", span=span.name)
+        with self._lock:
+            self.finished.append(record)
+            if self.export:
+                try:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record, default=str) + "\n")
+                except OSError:
+                    # Tracing must never fail the work it observes
+                    pass
+
+
+_shared_registry: Optional[MetricsRegistry] = None
+_shared_tracer: Optional[Tracer] = None
+_shared_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Process-wide metrics registry"""
+    global _shared_registry
+    with _shared_lock:
+        if _shared_registry is None:
+            _shared_registry = MetricsRegistry()
+        return _shared_registry
+
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer configured from TRACE_* settings"""
+    global _shared_tracer
+    registry = get_metrics()
+    with _shared_lock:
+        if _shared_tracer is None:
+            _shared_tracer = Tracer(registry=registry)
+        return _shared_tracer
+
+
+def span(name: str, profile: bool = False, **attributes):
+    return get_tracer().span(name, profile, **attributes)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def traced(name: str = None):
+    """Decorator: run the function inside a span named ``name`` (default module.qualname)"""
+    def decorate(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def bind_context(func: Callable) -> Callable:
+    """Wrap func so it runs with the caller's context (current span) on whichever thread calls it"""
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return run
+
+
+def record_cache_lookup(cache: str, result: str, count: int = 1):
+    """Count cache lookups ("hit", "miss", "coalesced" or "stale") in the metrics and the current span"""
+    if count <= 0:
+        return
+    get_metrics().inc("cache_lookups_total", count, "Cache lookups by cache and result", cache=cache, result=result)
+    active = _current_span.get()
+    if active is not None:
+        active.add(f"{cache}_{_CACHE_RESULT_ATTRIBUTES.get(result, result)}", count)
+
+
+def record_llm_usage(tokens_in: int, tokens_out: int, model: str = "unknown", estimated: bool = False):
+    """Tokens of one model call that actually reached the model (cache hits are not billed)"""
+    registry = get_metrics()
+    registry.inc("llm_calls_total", 1, "Chat model calls that reached the model", model=model)
+    registry.inc("llm_tokens_total", tokens_in, "Chat model tokens", model=model, direction="in")
+    registry.inc("llm_tokens_total", tokens_out, "Chat model tokens", model=model, direction="out")
+    active = _current_span.get()
+    if active is not None:
+        active.add("llm_calls")
+        active.add("tokens_in", tokens_in)
+        active.add("tokens_out", tokens_out)
+        if estimated:
+            active.set(tokens_estimated=True)
+
+
+def record_bytes(source: str, size: int):
+    """Bytes received from an external service"""
+    get_metrics().inc("bytes_fetched_total", size, "Bytes received from external services", source=source)
+    active = _current_span.get()
+    if active is not None:
+        active.add("bytes_fetched", size)
+
+
+def record_latency(operation: str, seconds: float, **labels):
+    get_metrics().observe("request_duration_seconds", seconds, "Latency of external requests",
+                          operation=operation, **labels)
+
+
+def load_spans(path: str = None) -> List[Dict[str, Any]]:
+    path = path or os.path.join(ResearchConfig.TRACE_DIR, "spans.jsonl")
+    spans = []
+    if not os.path.exists(path):
+        return spans
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except ValueError:
+                continue
+    return spans
+
+
+def format_trace(spans: List[Dict[str, Any]]) -> str:
+    """Indented span tree with wall/CPU time and counters, children in start order"""
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    ids = {s["span_id"] for s in spans}
+    for s in sorted(spans, key=lambda s: s["start_time"]):
+        children.setdefault(s["parent_id"] if s["parent_id"] in ids else None, []).append(s)
+    hidden = {"cpu_hotspots", "memory_hotspots", "cpu_profile"}
+
+    lines = []
+
+    def walk(parent_id: Optional[str], depth: int):
+        for s in children.get(parent_id, []):
+            fields = {**s["attributes"], **s.get("counters", {})}
+            extras = " ".join(f"{k}={v}" for k, v in fields.items() if k not in hidden)
+            status = "" if s["status"] == "ok" else f" [{s['status']}]"
+            lines.append(f"{'  ' * depth}{s['name']:<{max(40 - 2 * depth, 10)}} {s['wall_seconds']:>8.3f}s wall "
+                         f"{s['cpu_seconds']:>8.3f}s cpu{status}  {extras}".rstrip())
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+def trace_totals(trace_id: str) -> Dict[str, float]:
+    """Counters summed over the finished spans of one trace still held in memory"""
+    totals: Dict[str, float] = {}
+    for record in get_tracer().spans(trace_id):
+        for key, value in record["counters"].items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def summarize_spans(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Totals per span name, slowest total wall time first"""
+    totals: Dict[str, Dict[str, Any]] = {}
+    for s in spans:
+        entry = totals.setdefault(s["name"], {"name": s["name"], "count": 0, "wall_seconds": 0.0,
+                                              "cpu_seconds": 0.0, "max_wall_seconds": 0.0})
+        entry["count"] += 1
+        entry["wall_seconds"] += s["wall_seconds"] or 0.0
+        entry["cpu_seconds"] += s["cpu_seconds"] or 0.0
+        entry["max_wall_seconds"] = max(entry["max_wall_seconds"], s["wall_seconds"] or 0.0)
+    return sorted(totals.values(), key=lambda e: e["wall_seconds"], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect exported trace spans")
+    parser.add_argument("--path", help="spans.jsonl (default TRACE_DIR/spans.jsonl)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    tree = commands.add_parser("tree", help="Span tree of one trace (default: the latest)")
+    tree.add_argument("trace_id", nargs="?")
+    commands.add_parser("summary", help="Time per span name across all traces")
+    args = parser.parse_args()
+
+    spans = load_spans(args.path)
+    if not spans:
+        print("No spans recorded")
+    elif args.command == "tree":
+        trace_id = args.trace_id or max(spans, key=lambda s: s["start_time"])["trace_id"]
+        print(f"trace {trace_id}")
+        print(format_trace([s for s in spans if s["trace_id"] == trace_id]))
+    else:
+        for entry in summarize_spans(spans):
+            print(f"{entry['name']:<40} {entry['count']:>6}x  {entry['wall_seconds']:>9.3f}s wall  "
+                  f"{entry['cpu_seconds']:>9.3f}s cpu  max {entry['max_wall_seconds']:.3f}s")
+
+
+if __name__ == "__main__":
+    main()